@@ -1,23 +1,141 @@
+import asyncio
 import json
 import base64
-from openai import OpenAI
+import random
+import time
 from config import Config
+from response_cache import ResponseCache
+from image_payload import PayloadOptimizer
+from context_index import select_context
+from findings_stream import FindingsParser
+from tracing import annotate, span, trace_iter
+
+def _retryable_errors():
+    # Transient API failures worth another attempt; anything else fails the group straight away
+    import openai
+    return (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+def _usage(response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
 
 class AIAnalyzer:
-    def __init__(self, api_key, model_name):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key, model_name, use_cache=None, optimize_images=None, base_url=None):
+        self.api_key = api_key
+        # None = the official endpoint; set for proxies, gateways or the benchmark stub server
+        self.base_url = base_url or Config.OPENAI_BASE_URL
+        self._client = None
         self.model_name = model_name
+        if use_cache is None:
+            use_cache = Config.AI_CACHE_ENABLED
+        self.cache = ResponseCache() if use_cache else None
+        self.last_cache_hit = False
+        if optimize_images is None:
+            optimize_images = Config.AI_IMAGE_OPTIMIZE
+        self.optimizer = PayloadOptimizer() if optimize_images else None
+        self.last_payload_stats = {}
+
+    @property
+    def client(self):
+        # openai is imported on first use, so cache hits and local-only runs never pay for it
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def analyze(self, ref_parts, art_parts, checklist, errors, filename, on_finding=None):
+        """
+        ref_parts / art_parts may be lists or lazy page streams (FileProcessor.stream);
+        each page is base64-encoded as it arrives so raw bytes are released early.
+        With AI_STREAM, on_finding(finding) is called for each finding as soon as it has arrived.
+        """
+        if art_parts is None:
+            return {"findings": []}
 
-    def analyze(self, ref_parts, art_parts, checklist, errors, filename):
-        if not art_parts:
+        if self.optimizer:
+            self.optimizer.reset_stats()
+        ref_content = list(self._image_content(ref_parts)) if ref_parts else []
+        request = self._build_request(ref_content, art_parts, checklist, errors, filename)
+        if self.optimizer:
+            self.last_payload_stats = dict(self.optimizer.stats)
+        if request is None:
             return {"findings": []}
 
-        # Context Construction
-        checklist_txt = "\n".join([f"- {r['requirement']}" for r in checklist[:25]])
-        errors_txt = "\n".join([f"- {e['issue description']}" for e in errors[:8]]) # Increased context
+        try:
+            return self._complete(request, on_finding)
+        except Exception as e:
+            return {"findings": [{"check": "AI Processing", "status": "FAIL", "observation": str(e)}]}
+
+    def analyze_files(self, ref_parts, art_parts, checklist, errors, pages_per_request=None, on_result=None,
+                      on_finding=None):
+        """
+        Concurrent mode: one request per candidate file (or per group of pages_per_request pages),
+        run under AI_CONCURRENCY / AI_REQUESTS_PER_MINUTE with retries, then merged.
+        Each merged finding carries the "file" it came from, and the "pages" its request covered
+        unless the model named a single "page". "incomplete" maps each file to the pages of
+        requests that failed or were cut short, whose findings are not the whole story.
+        on_result(file, label, result) is called on the calling thread as each request completes,
+        and on_finding(file, label, finding) as each finding arrives (per token chunk with AI_STREAM).
+        """
+        if self.optimizer:
+            self.optimizer.reset_stats()
+        ref_content = list(self._image_content(ref_parts)) if ref_parts else []
+        groups = self._group_pages(art_parts, pages_per_request or Config.AI_PAGES_PER_REQUEST)
+
+        results = asyncio.run(self._analyze_groups(ref_content, groups, checklist, errors, on_result, on_finding))
+        if self.optimizer:
+            self.last_payload_stats = dict(self.optimizer.stats)
+
+        findings = []
+        incomplete = {}
+        for (file_name, label, result), pages in results:
+            if result.get('partial') or result.get('failed'):
+                incomplete.setdefault(file_name, set()).update(pages)
+            for finding in result.get('findings', []):
+                finding = dict(finding, file=file_name)
+                if not finding.get('page'):
+                    finding['pages'] = pages
+                if len(results) > 1:
+                    finding['check'] = f"[{label}] {finding.get('check')}"
+                findings.append(finding)
+        return {"findings": findings, "incomplete": incomplete}
+
+    def _build_request(self, ref_content, art_parts, checklist, errors, filename):
+        with span("build_payload", file=filename) as s:
+            request = self._compose_request(ref_content, art_parts, checklist, errors, filename)
+            if request is not None:
+                content = request["messages"][-1]["content"]
+                urls = [item["image_url"]["url"] for item in content if item["type"] == "image_url"]
+                s.set(images=len(urls), bytes=sum(len(u) for u in urls))
+            return request
+
+    def _compose_request(self, ref_content, art_parts, checklist, errors, filename):
+        # Candidate images first: whether they carry reference crops decides the comparison prompt
+        page_text = {}
+        candidate_content = list(trace_iter("encode_images", self._image_content(self._collect_text(art_parts, page_text))))
+        if not candidate_content:
+            return None
+        has_crops = any(item["type"] == "text" for item in candidate_content)
+
+        # Context Construction: the rules and past errors most relevant to this candidate's text
+        query = filename + "\n" + "\n".join(page_text.values())
+        rules, past_errors = select_context(checklist, errors, query)
+        annotate(rules=len(rules), errors=len(past_errors))
+        checklist_txt = "\n".join([f"- {r['requirement']}" for r in rules])
+        errors_txt = "\n".join([f"- {e}" for e in past_errors])
 
         # Dynamic Prompting based on Golden Sample
-        if ref_parts:
+        if has_crops:
+            comparison_instruction = """
+            4. GOLDEN SAMPLE COMPARISON (CRITICAL):
+            Local pixel comparison found changed regions. Each region is shown as a REFERENCE crop (Golden Sample)
+            followed by the matching CANDIDATE crop (Proof). Pages not shown already match the Golden Sample.
+            - Describe what changed in each region and whether it is an error.
+            - Flag any deviation in Logo Color, Layout, Font, or Warning Label placement.
+            """
+        elif ref_content:
             comparison_instruction = """
             4. GOLDEN SAMPLE COMPARISON (CRITICAL):
             I have provided REFERENCE images (Golden Sample) and CANDIDATE images (Proof).
@@ -30,7 +148,7 @@ class AIAnalyzer:
 
         user_prompt = f"""
         Perform a Quality Assurance inspection on file: {filename}.
-        
+
         1. CHECKLIST (Verify these exist):
         {checklist_txt}
 
@@ -43,7 +161,7 @@ class AIAnalyzer:
         - Text should not be cut off by the edge.
 
         {comparison_instruction}
-        
+
         Return findings in JSON.
         """
 
@@ -54,28 +172,210 @@ class AIAnalyzer:
         content_payload = [{"type": "text", "text": user_prompt}]
 
         # Add Reference Images (if any)
-        if ref_parts:
+        if ref_content:
             content_payload.append({"type": "text", "text": "--- REFERENCE IMAGES (GOLDEN SAMPLE) ---"})
-            for img in ref_parts:
-                b64 = base64.b64encode(img['data']).decode('utf-8')
-                content_payload.append({"type": "image_url", "image_url": {"url": f"data:{img['mime_type']};base64,{b64}"}})
+            content_payload.extend(ref_content)
 
         # Add Candidate Images
         content_payload.append({"type": "text", "text": "--- CANDIDATE IMAGES (TO INSPECT) ---"})
-        for img in art_parts:
-            b64 = base64.b64encode(img['data']).decode('utf-8')
-            content_payload.append({"type": "image_url", "image_url": {"url": f"data:{img['mime_type']};base64,{b64}"}})
+        content_payload.extend(candidate_content)
 
         messages.append({"role": "user", "content": content_payload})
 
+        return dict(
+            model=self.model_name,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=2500,
+            response_format={ "type": "json_object" }
+        )
+
+    def _complete(self, request, on_finding=None):
+        # Identical payloads (same images, prompt, model) replay from the response cache
+        self.last_cache_hit = False
+        emit = on_finding or (lambda finding: None)
+        with span("openai", model=self.model_name) as s:
+            key = None
+            if self.cache:
+                key = ResponseCache.request_key(request)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.last_cache_hit = True
+                    s.set(cache_hit=True)
+                    _emit_all(cached, emit)
+                    return cached
+
+            s.set(cache_hit=False)
+            if Config.AI_STREAM:
+                parser = FindingsParser()
+                try:
+                    stream = self.client.chat.completions.create(**request, stream=True,
+                                                                 stream_options={"include_usage": True})
+                    for chunk in stream:
+                        self._consume_chunk(chunk, parser, s, emit)
+                except Exception as e:
+                    if not parser.findings: raise
+                    return parser.result(error=str(e))
+                result = parser.result()
+            else:
+                response = self.client.chat.completions.create(**request)
+                s.set(**_usage(response))
+                result = json.loads(response.choices[0].message.content)
+                _emit_all(result, emit)
+
+            if self.cache and not result.get('partial'):
+                self.cache.put(key, result)
+            return result
+
+    def _consume_chunk(self, chunk, parser, s, emit):
+        # The final chunk carries usage and no choices
+        if getattr(chunk, "usage", None):
+            s.set(**_usage(chunk))
+        for choice in chunk.choices:
+            found = parser.feed(choice.delta.content or "")
+            if found and len(found) == len(parser.findings):
+                s.set(first_finding_ms=round((time.perf_counter() - parser.started) * 1000, 2))
+            for finding in found:
+                emit(finding)
+
+    async def _analyze_groups(self, ref_content, groups, checklist, errors, on_result=None, on_finding=None):
+        from openai import AsyncOpenAI
+        limiter = _RateLimiter(Config.AI_REQUESTS_PER_MINUTE)
+        slots = asyncio.Semaphore(Config.AI_CONCURRENCY)
+        tasks, group_pages = [], []
+
+        async with AsyncOpenAI(api_key=self.api_key, base_url=self.base_url) as client:
+            while True:
+                # Take a slot before pulling the next group, so only AI_CONCURRENCY payloads are ever held.
+                # Rendering and encoding run off the event loop to keep in-flight requests moving.
+                await slots.acquire()
+                group = await asyncio.to_thread(next, groups, None)
+                if group is None:
+                    slots.release()
+                    break
+                file_name, label, parts = group
+                group_pages.append(sorted({p['page'] for p in parts if p.get('page')}))
+                request = await asyncio.to_thread(self._build_request, ref_content, parts, checklist, errors, label)
+                emit = (lambda finding, f=file_name, l=label: on_finding(f, l, finding)) if on_finding else (lambda finding: None)
+                task = asyncio.create_task(self._send_group(client, request, limiter, slots, file_name, label, emit))
+                if on_result:
+                    task.add_done_callback(lambda t: t.cancelled() or on_result(*t.result()))
+                tasks.append(task)
+
+            return list(zip(await asyncio.gather(*tasks), group_pages))
+
+    async def _send_group(self, client, request, limiter, slots, file_name, label, emit):
+        retryable = _retryable_errors()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=2500,
-                response_format={ "type": "json_object" }
-            )
-            return json.loads(response.choices[0].message.content)
+            if request is None:
+                return file_name, label, {"findings": []}
+
+            with span("openai", model=self.model_name, file=label) as s:
+                key = ResponseCache.request_key(request) if self.cache else None
+                cached = self.cache.get(key) if self.cache else None
+                if cached is not None:
+                    s.set(cache_hit=True)
+                    _emit_all(cached, emit)
+                    return file_name, label, cached
+
+                delay = Config.AI_RETRY_BASE_DELAY
+                for attempt in range(Config.AI_MAX_RETRIES + 1):
+                    await limiter.wait()
+                    parser = FindingsParser()
+                    try:
+                        s.set(cache_hit=False, attempts=attempt + 1)
+                        if Config.AI_STREAM:
+                            stream = await client.chat.completions.create(**request, stream=True,
+                                                                          stream_options={"include_usage": True})
+                            async for chunk in stream:
+                                self._consume_chunk(chunk, parser, s, emit)
+                            result = parser.result()
+                        else:
+                            response = await client.chat.completions.create(**request)
+                            s.set(**_usage(response))
+                            result = json.loads(response.choices[0].message.content)
+                            _emit_all(result, emit)
+                        break
+                    except Exception as e:
+                        # Once findings have been handed on, keep them rather than retry and repeat them
+                        if parser.findings:
+                            result = parser.result(error=str(e))
+                            break
+                        if not isinstance(e, retryable) or attempt == Config.AI_MAX_RETRIES: raise
+                        # Exponential backoff with jitter so parallel groups don't retry in lockstep
+                        await asyncio.sleep(delay * (1 + random.random()))
+                        delay *= 2
+
+                if self.cache and not result.get('partial'):
+                    self.cache.put(key, result)
+                return file_name, label, result
+
         except Exception as e:
-            return {"findings": [{"check": "AI Processing", "status": "FAIL", "observation": str(e)}]}
+            return file_name, label, {"findings": [{"check": "AI Processing", "status": "FAIL", "observation": str(e)}],
+                                      "failed": True}
+        finally:
+            slots.release()
+
+    def _group_pages(self, parts, pages_per_request):
+        """Yields (file, label, pages) for consecutive pages of the same file, split every pages_per_request pages."""
+        current, pages = None, []
+
+        def flush():
+            label = current
+            if pages_per_request:
+                first, last = pages[0].get('page', 1), pages[-1].get('page', 1)
+                label = f"{current} p{first}" if first == last else f"{current} p{first}-{last}"
+            return current, label, pages
+
+        for part in parts:
+            name = part.get('file', '')
+            if pages and (name != current or (pages_per_request and len(pages) >= pages_per_request)):
+                yield flush()
+                pages = []
+            current = name
+            pages.append(part)
+        if pages:
+            yield flush()
+
+    def _collect_text(self, parts, page_text):
+        # Crops of one page share its text; keep it once per page
+        for part in parts:
+            page_text.setdefault((part.get('file'), part.get('page')), part.get('text', ''))
+            yield part
+
+    def _image_content(self, parts):
+        if self.optimizer:
+            parts = self.optimizer.prepare(parts)
+        for img in parts:
+            # Changed-region crops from PixelDiff travel with their reference crop
+            if img.get('reference'):
+                yield {"type": "text", "text": f"--- REGION {img.get('region')} of {img.get('file', '')} page {img.get('page')}: REFERENCE, then CANDIDATE ---"}
+                yield self._image_item(img['reference'])
+            yield self._image_item(img)
+
+    def _image_item(self, img):
+        b64 = base64.b64encode(img['data']).decode('utf-8')
+        return {"type": "image_url", "image_url": {"url": f"data:{img['mime_type']};base64,{b64}"}}
+
+
+def _emit_all(result, emit):
+    # Cached and non-streamed responses hand their findings on all at once
+    for finding in result.get('findings', []):
+        emit(finding)
+
+
+class _RateLimiter:
+    """Spaces request starts evenly to stay under a requests-per-minute budget."""
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval: return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,203 @@
+"""
+Headless batch verification.
+
+    python batch_verify.py PROOF_DIR [--reference GOLDEN.pdf] [--json report.json] [--csv report.csv]
+
+Walks PROOF_DIR for artwork files, verifies each one on a process pool with the same
+ChecklistManager / FileProcessor / AIAnalyzer / ArtworkValidator pipeline as the dashboard,
+and writes machine-readable reports plus throughput stats. The AI step runs when
+OPENAI_API_KEY is set (skip it with --no-ai). Exits 1 if any check FAILed.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from config import Config
+from checklist_manager import ChecklistManager
+from file_processor import FileProcessor, LocalFile, _pool_context
+from history_store import HistoryStore
+from pipeline import local_checks
+from text_index import WordIndex
+from tracing import Tracer, span, summarize, to_jsonl
+from validator import ArtworkValidator, extract_sku
+
+# --- Worker state: set once per pool process by _init_worker ---
+_job = {}
+
+def _init_worker(rules, errors, api_key, ref_parts, dpi, gtin_map=None):
+    _job.update(rules=rules, errors=errors, api_key=api_key, ref_parts=ref_parts, dpi=dpi, gtin_map=gtin_map)
+
+def render_references(paths, dpi):
+    """Renders the golden samples once, up front; returns (parts, errors)."""
+    processor = FileProcessor(dpi=dpi)
+    _, parts, _ = processor.process_files([LocalFile(p) for p in paths])
+    return parts, processor.errors
+
+def verify_file(path):
+    """Verifies one proof; returns a JSON-serializable result with its timing spans."""
+    tracer = Tracer()
+    with tracer.activate(), span("verify", file=path):
+        result = _verify(path)
+    result["trace"] = tracer.records()
+    result["timings"] = summarize(result["trace"])
+    return result
+
+def _verify(path):
+    start = time.perf_counter()
+    # One render process per file: the batch pool already occupies every core
+    processor = FileProcessor(dpi=_job["dpi"], workers=1)
+    local = LocalFile(path)
+    text, parts, _ = processor.process_file(local)
+    if processor.errors:
+        return {"file": path, "error": processor.errors[0][1], "summary": {"pass": 0, "fail": 1, "warn": 0}}
+
+    # Drained here so the local findings are complete with or without the AI step
+    local_findings = []
+    ai_ref, ai_art = local_checks(_job["ref_parts"], parts, local_findings)
+    ai_art = list(ai_art)
+
+    ai_results = None
+    if _job["api_key"] and ai_art:
+        from ai_analyzer import AIAnalyzer
+        ai = AIAnalyzer(_job["api_key"], Config.MODEL_NAME)
+        ai_results = ai.analyze(ai_ref, ai_art, _job["rules"], _job["errors"], local.name)
+
+    # Real filename, so the SKU check can match it against the artwork text
+    report = ArtworkValidator(_job["rules"], _job["errors"], _job["gtin_map"]).validate(text, local.name, ai_results, local_findings,
+                                                                   index=WordIndex.from_pages(parts))
+    return {
+        "file": path,
+        "file_hash": parts[0]["file_hash"] if parts else None,
+        "pages": len(parts),
+        "seconds": round(time.perf_counter() - start, 3),
+        "summary": report["summary"],
+        "checks": [c.to_dict() for c in report["checks"]],
+    }
+
+def find_files(folder, recursive):
+    exts = tuple(f".{e}" for e in Config.ALLOWED_EXTENSIONS)
+    if recursive:
+        found = [os.path.join(root, n) for root, _, names in os.walk(folder) for n in names]
+    else:
+        found = [os.path.join(folder, n) for n in os.listdir(folder)]
+    return sorted(p for p in found if os.path.isfile(p) and p.lower().endswith(exts))
+
+def write_csv(path, results):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file", "check", "status", "observation"])
+        for r in results:
+            if r.get("error"):
+                writer.writerow([r["file"], "Processing", "FAIL", r["error"]])
+            for c in r.get("checks", []):
+                writer.writerow([r["file"], c.get("name"), c.get("status"), c.get("observation")])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify a folder of artwork proofs without the dashboard.")
+    parser.add_argument("folder", help="Folder of proofs (pdf/jpg/png)")
+    parser.add_argument("--reference", nargs="*", default=[], help="Golden sample file(s)")
+    parser.add_argument("--checklist", default=Config.CHECKLIST_FILE)
+    parser.add_argument("--tracker", default=Config.ERROR_TRACKER_FILE)
+    parser.add_argument("--gtin-map", default=Config.GTIN_MAP_FILE, help="SKU to GTIN/UPC sheet (optional)")
+    parser.add_argument("--brand", default="Vive Health")
+    parser.add_argument("--json", dest="json_out", default="batch_report.json", help="JSON report path")
+    parser.add_argument("--csv", dest="csv_out", help="Optional CSV report (one row per check)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dpi", type=int, default=Config.RENDER_DPI)
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--no-ai", action="store_true", help="Run local checks only")
+    parser.add_argument("--trace", dest="trace_out", help="Optional JSON-lines export of every timing span")
+    parser.add_argument("--no-history", action="store_true", help="Don't record runs in the history database")
+    args = parser.parse_args(argv)
+
+    files = find_files(args.folder, args.recursive)
+    if not files:
+        print(f"No artwork files found in {args.folder}", file=sys.stderr)
+        return 0
+
+    cm = ChecklistManager()
+    rules = cm.load_checklist(args.checklist, args.brand)
+    errors = cm.get_common_errors(args.tracker) if os.path.exists(args.tracker) else []
+    gtin_map = cm.load_gtin_map(args.gtin_map) if os.path.exists(args.gtin_map) else {}
+    if not rules:
+        print(f"Could not load checklist: {args.checklist}", file=sys.stderr)
+        return 2
+
+    api_key = None if args.no_ai else os.environ.get("OPENAI_API_KEY")
+    if not args.no_ai and not api_key:
+        print("OPENAI_API_KEY not set; running local checks only.", file=sys.stderr)
+
+    ref_parts = []
+    if args.reference:
+        ref_parts, ref_errors = render_references(args.reference, args.dpi)
+        for name, err in ref_errors:
+            print(f"Could not read reference {name}: {err}", file=sys.stderr)
+        if not ref_errors and not ref_parts:
+            print("Reference file(s) have no pages", file=sys.stderr)
+        if ref_errors or not ref_parts:
+            return 2
+
+    started = datetime.now()
+    start = time.perf_counter()
+    results = []
+    trace = []
+    # The history writer is a live thread: workers must not be forked from this process
+    history = None if args.no_history else HistoryStore()
+    initargs = (rules, errors, api_key, ref_parts, args.dpi, gtin_map)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=initargs,
+                             mp_context=_pool_context()) as pool:
+        futures = {pool.submit(verify_file, p): p for p in files}
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"file": futures[future], "error": str(e), "summary": {"pass": 0, "fail": 1, "warn": 0}}
+            trace.extend(dict(r, file=result["file"]) for r in result.pop("trace", []))
+            results.append(result)
+            if history:
+                name = os.path.basename(result["file"])
+                history.record({"summary": result["summary"], "checks": result.get("checks", [])},
+                               files=[(name, result.get("file_hash"))], model=Config.MODEL_NAME if api_key else None,
+                               sku=extract_sku(name), seconds=result.get("seconds"), timings=result.get("timings"))
+            s = result["summary"]
+            print(f"[{i}/{len(files)}] {os.path.basename(result['file'])}: "
+                  f"{s['pass']} pass / {s['fail']} fail / {s['warn']} warn")
+    elapsed = time.perf_counter() - start
+    if history:
+        history.flush()
+
+    results.sort(key=lambda r: r["file"])
+    pages = sum(r.get("pages", 0) for r in results)
+    stats = {
+        "files": len(results),
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "files_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else None,
+        "pages_per_second": round(pages / elapsed, 2) if elapsed else None,
+        "workers": args.workers,
+        "ai": bool(api_key),
+        "failed_files": sum(1 for r in results if r["summary"]["fail"]),
+        "errors": sum(1 for r in results if r.get("error")),
+        "stages": summarize(trace),
+    }
+
+    with open(args.json_out, "w", encoding="utf-8") as f:
+        json.dump({"started": started.isoformat(timespec="seconds"), "stats": stats, "results": results}, f, indent=2)
+    if args.csv_out:
+        write_csv(args.csv_out, results)
+    if args.trace_out:
+        with open(args.trace_out, "w", encoding="utf-8") as f:
+            f.write(to_jsonl(trace))
+
+    print(f"\n{stats['files']} files / {pages} pages in {stats['seconds']}s "
+          f"({stats['files_per_minute']} files/min). {stats['failed_files']} with failures.")
+    print(f"Report: {args.json_out}" + "".join(f", {p}" for p in (args.csv_out, args.trace_out) if p))
+    return 1 if stats["failed_files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
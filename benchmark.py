@@ -0,0 +1,370 @@
+"""
+Reproducible performance benchmark.
+
+    python benchmark.py [--files 3] [--pages 12] [--repeat 5] [--latency 0.25] [--out benchmark_results.jsonl]
+
+Generates synthetic proofs (multi-page PDFs plus a PNG), a checklist and an error tracker shaped
+like the real workbooks, and starts a local stub of the chat-completions endpoint with
+configurable latency (streamed as server-sent events when the request asks for it).
+ChecklistManager, FileProcessor, AIAnalyzer and ArtworkValidator are timed on their own and end
+to end (the dashboard's pipeline), along with the time until the first AI finding reaches the
+caller. Each stage reports throughput, p50/p95 latency and peak Python heap; bytes per rule,
+finding and page are reported for the slotted models next to plain dicts. One JSON line per
+run is appended to --out so numbers can be tracked over time.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+WORDS = ("cushion", "support", "wheelchair", "latex", "free", "warning", "keep", "away", "from", "heat",
+         "instructions", "clean", "with", "damp", "cloth", "adjustable", "strap", "medical", "device", "use")
+
+# --- Synthetic inputs ---
+
+def make_pdf(path, pages, lines, seed=0, sku="DMD1001BLK"):
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_text((48, 60), f"{sku}  Made in China  UPC 036000291452  page {n + 1}", fontsize=11)
+        for i in range(lines):
+            text = " ".join(rng.choice(WORDS) for _ in range(10))
+            page.insert_text((48, 90 + i * 14), text, fontsize=9)
+        # Brand-colour panel and a barcode-like stripe block for the local checks
+        page.draw_rect(fitz.Rect(380, 60, 540, 120), color=None, fill=(0.17, 0.8, 0.83))
+        x = 380
+        for _ in range(30):
+            width = rng.choice((1, 2, 3))
+            page.draw_rect(fitz.Rect(x, 700, x + width, 760), color=None, fill=(0, 0, 0))
+            x += width + rng.choice((1, 2, 3))
+    doc.save(path)
+    doc.close()
+
+def make_image(path, width, height, seed=0):
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((width // 2, 20, width - 20, height // 4), fill=(44, 204, 211))
+    for i in range(40):
+        y = 40 + i * (height - 80) // 40
+        draw.text((20, y), " ".join(rng.choice(WORDS) for _ in range(6)), fill="black")
+    img.save(path, format="PNG")
+
+def make_checklist(path, rows, seed=0):
+    """Header-less sheet of bullet items, one column per section, like Artwork Checklist.xlsx."""
+    import pandas as pd
+    rng = random.Random(seed)
+    sections = ["Packaging", "Compliance", "Branding", "Specs"]
+    columns = {}
+    for s, section in enumerate(sections):
+        items = [f"{section.upper()} CHECKLIST"]
+        for i in range(rows // len(sections)):
+            items.append(f"- Verify {' '.join(rng.choice(WORDS) for _ in range(5))} ({section.lower()} {s}.{i})")
+        columns[s] = items
+    width = max(len(v) for v in columns.values())
+    pd.DataFrame({k: v + [None] * (width - len(v)) for k, v in columns.items()}).to_excel(path, header=False, index=False)
+
+def make_tracker(path, rows, seed=0):
+    import pandas as pd
+    rng = random.Random(seed)
+    categories = ["Barcode", "Artwork", "Color", "Dimensions", "Origin"]
+    pd.DataFrame({
+        "SKU": [f"DMD{1000 + i % 50}BLK" for i in range(rows)],
+        "Issue Description": [f"{' '.join(rng.choice(WORDS) for _ in range(8))} #{i % (rows // 2 or 1)}" for i in range(rows)],
+        "Issue Category": [rng.choice(categories) for _ in range(rows)],
+    }).to_excel(path, index=False)
+
+# --- Stub chat-completions server ---
+
+class _StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    findings = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body or b"{}")
+        content = json.dumps({"findings": self.findings})
+        if request.get("stream"):
+            return self._stream(request, body, content)
+        time.sleep(self.latency)
+        reply = json.dumps({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(body) + len(content)) // 4},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def _stream(self, request, body, content):
+        # Server-sent events, ~16 characters per chunk, spread evenly over the configured latency
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def event(choices, usage=None):
+            chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": request.get("model", "stub"), "choices": choices}
+            if usage:
+                chunk["usage"] = usage
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        for i, piece in enumerate(pieces):
+            time.sleep(self.latency / len(pieces))
+            delta = {"content": piece} if i else {"role": "assistant", "content": piece}
+            event([{"index": 0, "delta": delta, "finish_reason": None}])
+        event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            event([], {"prompt_tokens": len(body) // 4, "completion_tokens": len(content) // 4,
+                       "total_tokens": (len(body) + len(content)) // 4})
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+def start_stub(latency, findings):
+    """Starts the stub on a free local port; returns (server, base_url)."""
+    handler = type("StubHandler", (_StubHandler,), {"latency": latency, "findings": findings})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+# --- Measurement ---
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    pos = (len(values) - 1) * q
+    lo, hi = int(pos), min(int(pos) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+def measure(name, fn, repeat, units, unit_name, setup=None):
+    """Times `repeat` runs, then one extra run under tracemalloc for the peak heap."""
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    if setup: setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50 = percentile(times, 0.5)
+    return {
+        "stage": name,
+        "runs": repeat,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(percentile(times, 0.95) * 1000, 2),
+        "mean_ms": round(sum(times) / len(times) * 1000, 2),
+        "throughput": round(units / p50, 2) if p50 else None,
+        "unit": f"{unit_name}/s",
+        "peak_heap_mb": round(peak / 2 ** 20, 2),
+    }
+
+def time_to_first_finding(name, analyze, repeat, units, unit_name):
+    """Like measure(), but times how long the first finding takes to reach the caller."""
+    times = []
+    for _ in range(repeat):
+        first = []
+        start = time.perf_counter()
+        analyze(lambda *args: first or first.append(time.perf_counter() - start))
+        if first:
+            times.append(first[0])
+    if not times:
+        return {"stage": name, "runs": repeat, "p50_ms": None, "p95_ms": None, "unit": f"{unit_name}/s"}
+    p50 = percentile(times, 0.5)
+    return {
+        "stage": name,
+        "runs": repeat,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(percentile(times, 0.95) * 1000, 2),
+        "mean_ms": round(sum(times) / len(times) * 1000, 2),
+        "throughput": round(units / p50, 2) if p50 else None,
+        "unit": f"{unit_name}/s",
+        "peak_heap_mb": None,
+    }
+
+def bytes_per_item(items):
+    """Container size per item (own slots or hash table, plus any extra dict); shared values excluded."""
+    if not items:
+        return None
+    total = sum(sys.getsizeof(i) + (sys.getsizeof(i.extra) if getattr(i, "extra", None) else 0) for i in items)
+    return round(total / len(items), 1)
+
+def model_memory(rules, checks, parts):
+    """Per-item overhead of the slotted models next to the plain dicts they replaced."""
+    return {
+        "rule_bytes": bytes_per_item(rules),
+        "rule_dict_bytes": bytes_per_item([r.to_dict() for r in rules]),
+        "finding_bytes": bytes_per_item(checks),
+        "finding_dict_bytes": bytes_per_item([c.to_dict() for c in checks]),
+        "page_bytes": bytes_per_item(parts),
+        "page_dict_bytes": bytes_per_item([p.to_dict() for p in parts]),
+    }
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(usage[0] * scale / 2 ** 20, 1), "children": round(usage[1] * scale / 2 ** 20, 1)}
+
+# --- Pipeline ---
+
+def run_pipeline(art_files, ref_files, rules, errors, base_url):
+    """The dashboard's verification flow (main.py), minus Streamlit."""
+    from ai_analyzer import AIAnalyzer
+    from file_processor import FileProcessor
+    from pipeline import local_checks
+    from validator import ArtworkValidator
+
+    processor = FileProcessor(use_cache=False)
+    ref_pages = list(processor.iter_pages(ref_files)) if ref_files else []
+    art_stream = processor.stream(art_files)
+
+    local_findings = []
+    ai_ref, ai_art = local_checks(ref_pages, art_stream, local_findings)
+
+    ai = AIAnalyzer("bench", Config.MODEL_NAME, use_cache=False, base_url=base_url)
+    ai_results = ai.analyze_files(ai_ref, ai_art, rules, errors)
+    return ArtworkValidator(rules, errors).validate(art_stream.text, "Batch", ai_results, local_findings,
+                                                    index=art_stream.index)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the verification pipeline on synthetic inputs.")
+    parser.add_argument("--files", type=int, default=3, help="Synthetic PDF proofs")
+    parser.add_argument("--pages", type=int, default=12, help="Pages per PDF")
+    parser.add_argument("--lines", type=int, default=40, help="Text lines per page")
+    parser.add_argument("--image-size", type=int, nargs=2, default=(2400, 3200), metavar=("W", "H"))
+    parser.add_argument("--rules", type=int, default=120, help="Checklist items")
+    parser.add_argument("--errors", type=int, default=400, help="Error tracker rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.25, help="Stub chat-completions latency (s)")
+    parser.add_argument("--findings", type=int, default=8, help="Findings per stub response")
+    parser.add_argument("--dpi", type=int, default=Config.RENDER_DPI)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.jsonl", help="JSON-lines history file to append to")
+    args = parser.parse_args(argv)
+
+    from checklist_manager import ChecklistManager, _PARSED_CACHE
+    from ai_analyzer import AIAnalyzer
+    from file_processor import FileProcessor, LocalFile
+    from text_index import WordIndex
+    from validator import ArtworkValidator
+
+    # Fair, repeatable runs: no caches between repeats, no client-side rate limit
+    Config.AI_CACHE_ENABLED = False
+    Config.RENDER_CACHE_ENABLED = False
+    Config.AI_REQUESTS_PER_MINUTE = 0
+    Config.RENDER_DPI = args.dpi
+
+    workdir = tempfile.mkdtemp(prefix="artwork-bench-")
+    print(f"Generating inputs in {workdir} ...")
+    pdfs = []
+    for i in range(args.files):
+        path = os.path.join(workdir, f"DMD{1001 + i}BLK_proof.pdf")
+        make_pdf(path, args.pages, args.lines, seed=args.seed + i, sku=f"DMD{1001 + i}BLK")
+        pdfs.append(path)
+    reference = os.path.join(workdir, "DMD1001BLK_golden.pdf")
+    make_pdf(reference, args.pages, args.lines, seed=args.seed, sku="DMD1001BLK")
+    image = os.path.join(workdir, "DMD2001BLK_label.png")
+    make_image(image, *args.image_size, seed=args.seed)
+    checklist = os.path.join(workdir, "checklist.xlsx")
+    make_checklist(checklist, args.rules, seed=args.seed)
+    tracker = os.path.join(workdir, "tracker.xlsx")
+    make_tracker(tracker, args.errors, seed=args.seed)
+
+    findings = [{"check": f"Stub Finding {i + 1}", "status": "PASS", "observation": "Synthetic response. " * 8}
+                for i in range(args.findings)]
+    server, base_url = start_stub(args.latency, findings)
+
+    cm = ChecklistManager()
+    rules = cm.load_checklist(checklist, "Vive Health")
+    errors = cm.get_common_errors(tracker)
+    art_files = [LocalFile(p) for p in pdfs + [image]]
+    total_pages = args.files * args.pages + 1
+    processor = FileProcessor(use_cache=False)
+    text, parts, _ = processor.process_files(art_files)
+    index = WordIndex.from_pages(parts)
+    ai = AIAnalyzer("bench", Config.MODEL_NAME, use_cache=False, base_url=base_url)
+    ai_results = ai.analyze_files([], parts, rules, errors)
+
+    print(f"{len(rules)} rules, {len(errors)} tracker rows, {total_pages} pages; stub latency {args.latency}s\n")
+    stages = [
+        measure("checklist_cold", lambda: (cm.load_checklist(checklist, "Vive Health"), cm.get_common_errors(tracker)),
+                args.repeat, len(rules), "rules", setup=_PARSED_CACHE.clear),
+        measure("checklist_warm", lambda: (cm.load_checklist(checklist, "Vive Health"), cm.get_common_errors(tracker)),
+                args.repeat, len(rules), "rules"),
+        measure("file_processor", lambda: FileProcessor(use_cache=False).process_files(art_files),
+                args.repeat, total_pages, "pages"),
+        measure("ai_analyzer", lambda: ai.analyze_files([], parts, rules, errors),
+                args.repeat, len(art_files), "requests"),
+        time_to_first_finding("ai_first_finding",
+                              lambda on_finding: ai.analyze_files([], parts, rules, errors, on_finding=on_finding),
+                              args.repeat, len(art_files), "requests"),
+        measure("validator", lambda: ArtworkValidator(rules, errors).validate(text, "Batch", ai_results, [], index=index),
+                args.repeat, total_pages, "pages"),
+        measure("end_to_end", lambda: run_pipeline(art_files, [LocalFile(reference)], rules, errors, base_url),
+                args.repeat, total_pages, "pages"),
+    ]
+    server.shutdown()
+    report = ArtworkValidator(rules, errors).validate(text, "Batch", ai_results, [], index=index)
+    memory = model_memory(rules, report["checks"], parts)
+
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'throughput':>26}{'peak MB':>10}")
+    for s in stages:
+        print(f"{s['stage']:<16}{s['p50_ms']!s:>10}{s['p95_ms']!s:>10}{s['throughput']!s:>14} {s['unit']:<11}{s['peak_heap_mb']!s:>10}")
+    print(f"\nbytes per item (slotted vs dict): rule {memory['rule_bytes']} vs {memory['rule_dict_bytes']}, "
+          f"finding {memory['finding_bytes']} vs {memory['finding_dict_bytes']}, "
+          f"page {memory['page_bytes']} vs {memory['page_dict_bytes']}")
+    rss = max_rss_mb()
+    if rss:
+        print(f"\nmax RSS: {rss['self']} MB (render workers: {rss['children']} MB)")
+
+    record = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "stages": stages,
+        "memory": memory,
+        "max_rss_mb": rss,
+    }
+    with open(args.out, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Small thread-safe LRU map shared by every session of the server process."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_build(self, key, builder):
+        # Build outside the lock so a slow workbook parse doesn't block other sessions
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = builder()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def source_key(source):
+    """
+    Stable identity for a file source.
+    Paths use (path, mtime, size); uploaded files use a SHA-256 of their content.
+    """
+    if hasattr(source, 'read'):
+        pos = source.tell() if hasattr(source, 'tell') else 0
+        data = source.getvalue() if hasattr(source, 'getvalue') else source.read()
+        if hasattr(source, 'seek'):
+            source.seek(pos)
+        return ("upload", getattr(source, 'name', ''), hashlib.sha256(data).hexdigest())
+
+    path = os.path.abspath(str(source))
+    st = os.stat(path)
+    return ("path", path, st.st_mtime_ns, st.st_size)
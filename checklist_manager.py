@@ -1,6 +1,9 @@
-import pandas as pd
-import streamlit as st
 from config import Config
+from cache import LRUCache, source_key
+from models import Rule
+
+# Process-wide: shared by every Streamlit session and rerun on this server
+_PARSED_CACHE = LRUCache(max_entries=Config.WORKBOOK_CACHE_SIZE)
 
 class ChecklistManager:
     def __init__(self):
@@ -9,84 +12,129 @@ class ChecklistManager:
     def load_checklist(self, file_path, brand_name):
         try:
             if not file_path: return []
-            
-            # Handle UploadedFile object vs String path
-            if hasattr(file_path, 'read'):
-                if file_path.name.endswith('.xlsx'):
-                    df = pd.read_excel(file_path, header=None)
-                else:
-                    df = pd.read_csv(file_path, header=None)
-            else:
-                if str(file_path).endswith('.xlsx'):
-                    df = pd.read_excel(file_path, header=None)
-                else:
-                    df = pd.read_csv(file_path, header=None)
-            
-            rules = []
-            rule_id = 0
-            
-            for col in df.columns:
-                for item in df[col].dropna():
-                    item_str = str(item).strip()
-                    if item_str.startswith('-') or item_str.startswith('•') or len(item_str) > 5:
-                        clean = item_str.lstrip('- •').strip()
-                        if len(clean) < 3 or "CHECKLIST" in clean.upper(): continue
-
-                        cat = "General"
-                        lower = clean.lower()
-                        if any(x in lower for x in ['udi', 'qr', 'barcode', 'upc', 'legal']): cat = "Compliance"
-                        elif any(x in lower for x in ['dim', 'fit', 'size', 'mm', 'cm']): cat = "Specs"
-                        elif any(x in lower for x in ['logo', 'color', 'font', 'brand']): cat = "Branding"
-                        elif 'china' in lower: cat = "Origin"
-                        
-                        tip = None
-                        for k, v in Config.RISK_TIPS.items():
-                            if k in lower: tip = v; break
-                                
-                        rules.append({"id": f"r_{rule_id}", "requirement": clean, "category": cat, "tip": tip})
-                        rule_id += 1
-            
-            # Unique only
-            return [dict(t) for t in {tuple(d.items()) for d in rules}]
-
+            key = ("checklist", brand_name) + source_key(file_path)
+            rules = _PARSED_CACHE.get_or_build(key, lambda: self._parse_checklist(file_path))
+            # Hand out copies so callers can't mutate the shared entry
+            return [r.copy() for r in rules]
         except Exception as e:
             return []
 
+    def _parse_checklist(self, file_path):
+        import pandas as pd  # Lazy: only paid on a cache miss
+        # Handle UploadedFile object vs String path
+        if hasattr(file_path, 'read'):
+            if file_path.name.endswith('.xlsx'):
+                df = pd.read_excel(file_path, header=None)
+            else:
+                df = pd.read_csv(file_path, header=None)
+        else:
+            if str(file_path).endswith('.xlsx'):
+                df = pd.read_excel(file_path, header=None)
+            else:
+                df = pd.read_csv(file_path, header=None)
+
+        rules = []
+        rule_id = 0
+
+        for col in df.columns:
+            for item in df[col].dropna():
+                item_str = str(item).strip()
+                if item_str.startswith('-') or item_str.startswith('•') or len(item_str) > 5:
+                    clean = item_str.lstrip('- •').strip()
+                    if len(clean) < 3 or "CHECKLIST" in clean.upper(): continue
+
+                    cat = "General"
+                    lower = clean.lower()
+                    if any(x in lower for x in ['udi', 'qr', 'barcode', 'upc', 'legal']): cat = "Compliance"
+                    elif any(x in lower for x in ['dim', 'fit', 'size', 'mm', 'cm']): cat = "Specs"
+                    elif any(x in lower for x in ['logo', 'color', 'font', 'brand']): cat = "Branding"
+                    elif 'china' in lower: cat = "Origin"
+
+                    tip = None
+                    for k, v in Config.RISK_TIPS.items():
+                        if k in lower: tip = v; break
+
+                    rules.append(Rule(id=f"r_{rule_id}", requirement=clean, category=cat, tip=tip))
+                    rule_id += 1
+
+        # Unique only, in sheet order (stable across runs and processes)
+        return list(dict.fromkeys(rules))
+
     def get_common_errors(self, tracker_path):
         try:
-            df = self._load_df(tracker_path)
-            if df is None: return []
-            
-            cols = [c.lower() for c in df.columns]
-            df.columns = cols
-            
-            # Fuzzy column matching
-            desc = next((c for c in cols if 'description' in c), None)
-            cat = next((c for c in cols if 'category' in c), None)
-            
-            if desc and cat:
-                return df[[desc, cat]].rename(columns={desc: 'issue description', cat: 'issue category'}).dropna().to_dict('records')
-            return []
+            key = ("errors",) + source_key(tracker_path)
+            errors = _PARSED_CACHE.get_or_build(key, lambda: self._parse_errors(tracker_path))
+            return [dict(e) for e in errors]
         except:
             return []
 
+    def _parse_errors(self, tracker_path):
+        df = self._load_df(tracker_path)
+        if df is None: return []
+
+        cols = [c.lower() for c in df.columns]
+        df.columns = cols
+
+        # Fuzzy column matching
+        desc = next((c for c in cols if 'description' in c), None)
+        cat = next((c for c in cols if 'category' in c), None)
+
+        if desc and cat:
+            return df[[desc, cat]].rename(columns={desc: 'issue description', cat: 'issue category'}).dropna().to_dict('records')
+        return []
+
     def get_error_stats(self, tracker_path):
         """Returns a dictionary of {Category: Count} for visualization"""
         try:
-            df = self._load_df(tracker_path)
-            if df is None: return {}
-            
-            cols = [c.lower() for c in df.columns]
-            df.columns = cols
-            
-            cat_col = next((c for c in cols if 'category' in c), None)
-            if cat_col:
-                return df[cat_col].value_counts().to_dict()
-            return {}
+            key = ("error_stats",) + source_key(tracker_path)
+            return dict(_PARSED_CACHE.get_or_build(key, lambda: self._parse_error_stats(tracker_path)))
         except:
             return {}
 
+    def _parse_error_stats(self, tracker_path):
+        df = self._load_df(tracker_path)
+        if df is None: return {}
+
+        cols = [c.lower() for c in df.columns]
+        df.columns = cols
+
+        cat_col = next((c for c in cols if 'category' in c), None)
+        if cat_col:
+            return df[cat_col].value_counts().to_dict()
+        return {}
+
+    def load_gtin_map(self, map_path):
+        """Returns {SKU: GTIN} from a sheet with a SKU column and a GTIN/UPC/EAN column."""
+        try:
+            if not map_path: return {}
+            key = ("gtin_map",) + source_key(map_path)
+            return dict(_PARSED_CACHE.get_or_build(key, lambda: self._parse_gtin_map(map_path)))
+        except Exception:
+            return {}
+
+    def _parse_gtin_map(self, map_path):
+        df = self._load_df(map_path)
+        if df is None: return {}
+
+        cols = [str(c).lower() for c in df.columns]
+        df.columns = cols
+
+        sku = next((c for c in cols if 'sku' in c), None)
+        gtin = next((c for c in cols if any(x in c for x in ('gtin', 'upc', 'ean'))), None)
+        if not (sku and gtin):
+            return {}
+        # Read as text: spreadsheets hand barcodes back as floats
+        pairs = df[[sku, gtin]].dropna()
+        return {str(s).strip().upper(): str(g).strip().split('.')[0] for s, g in pairs.itertuples(index=False)}
+
     def _load_df(self, path):
+        # Tracker stats and error lists read the same sheet; parse it once per file version
+        key = ("df",) + source_key(path)
+        df = _PARSED_CACHE.get_or_build(key, lambda: self._read_df(path))
+        return df.copy() if df is not None else None
+
+    def _read_df(self, path):
+        import pandas as pd
         if hasattr(path, 'read'):
             return pd.read_excel(path) if path.name.endswith('.xlsx') else pd.read_csv(path)
         if str(path).endswith('.xlsx'):
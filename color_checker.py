@@ -0,0 +1,128 @@
+import io
+import numpy as np
+from PIL import Image
+from config import Config
+from page_check import PageCheck
+from pixel_diff import changed_boxes
+
+def srgb_to_lab(rgb):
+    """sRGB (..., 3) in 0-255 to CIE Lab (D65), vectorized."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    c = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    m = np.array([[0.4124564, 0.3575761, 0.1804375],
+                  [0.2126729, 0.7151522, 0.0721750],
+                  [0.0193339, 0.1191920, 0.9503041]])
+    xyz = c @ m.T / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+def delta_e2000(lab1, lab2):
+    """CIEDE2000 colour difference, broadcast over (..., 3) Lab arrays."""
+    L1, a1, b1 = np.moveaxis(np.asarray(lab1, dtype=np.float64), -1, 0)
+    L2, a2, b2 = np.moveaxis(np.asarray(lab2, dtype=np.float64), -1, 0)
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_bar ** 7 / (c_bar ** 7 + 25.0 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    d_lp = L2 - L1
+    d_cp = c2p - c1p
+    chroma0 = (c1p * c2p) == 0
+    dh = h2p - h1p
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(chroma0, 0, dh)
+    d_hp = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dh) / 2)
+
+    l_bar = (L1 + L2) / 2
+    cp_bar = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(np.abs(h1p - h2p) <= 180, h_sum / 2,
+                     np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2))
+    h_bar = np.where(chroma0, h_sum, h_bar)
+
+    t = (1 - 0.17 * np.cos(np.radians(h_bar - 30)) + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6)) - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    d_theta = 30 * np.exp(-((h_bar - 275) / 25) ** 2)
+    r_c = 2 * np.sqrt(cp_bar ** 7 / (cp_bar ** 7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (l_bar - 50) ** 2 / np.sqrt(20 + (l_bar - 50) ** 2)
+    s_c = 1 + 0.045 * cp_bar
+    s_h = 1 + 0.015 * cp_bar * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+
+    return np.sqrt((d_lp / s_l) ** 2 + (d_cp / s_c) ** 2 + (d_hp / s_h) ** 2
+                   + r_t * (d_cp / s_c) * (d_hp / s_h))
+
+def hex_to_rgb(value):
+    value = value.lstrip("#")
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+class ColorChecker(PageCheck):
+    """
+    Local brand-colour compliance (e.g. logo Teal 319C).
+    ΔE2000 is precomputed once per brand colour over a 6-bit-per-channel RGB lattice (262k colours),
+    so a page costs one quantize + table lookup per pixel. Pixels within search_radius of a brand
+    colour are grouped into clusters; a cluster fails when its median ΔE exceeds the tolerance.
+    """
+    BITS = 6  # Lattice quantization adds < ~1 ΔE00 of error
+
+    _lut_cache = {}
+
+    def __init__(self, brand_colors=None, tolerance=None, search_radius=None, min_region_px=None):
+        self.brand_colors = brand_colors or Config.BRAND_COLORS
+        self.tolerance = tolerance or Config.COLOR_DELTA_E_TOLERANCE
+        self.search_radius = search_radius or Config.COLOR_SEARCH_RADIUS
+        self.min_region_px = min_region_px or Config.COLOR_MIN_REGION_PX
+
+    @classmethod
+    def _lut(cls, hex_color):
+        # ΔE2000 from every lattice colour to the brand colour, shared process-wide
+        if hex_color not in cls._lut_cache:
+            levels = (np.arange(1 << cls.BITS) << (8 - cls.BITS)) + (1 << (7 - cls.BITS))
+            r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+            lattice = srgb_to_lab(np.stack([r, g, b], axis=-1).reshape(-1, 3))
+            ref = srgb_to_lab(np.array(hex_to_rgb(hex_color)))
+            cls._lut_cache[hex_color] = delta_e2000(lattice, ref).astype(np.float32)
+        return cls._lut_cache[hex_color]
+
+    def check_page(self, part):
+        """Returns findings for one page image part (one per brand colour present on the page)."""
+        rgb = np.asarray(Image.open(io.BytesIO(part['data'])).convert("RGB"))
+        shift = 8 - self.BITS
+        q = rgb >> shift
+        index = (q[..., 0].astype(np.int32) << (2 * self.BITS)) | (q[..., 1].astype(np.int32) << self.BITS) | q[..., 2]
+
+        findings = []
+        page = part.get('page', 1)
+        for name, hex_color in self.brand_colors.items():
+            de = self._lut(hex_color)[index]
+            near = de < self.search_radius
+            if np.count_nonzero(near) < self.min_region_px:
+                continue
+
+            regions = []
+            for box in changed_boxes(near, cell=8, ratio=0.25):
+                x0, y0, x1, y1 = box
+                values = de[y0:y1, x0:x1][near[y0:y1, x0:x1]]
+                if values.size < self.min_region_px: continue
+                regions.append((box, float(np.median(values))))
+            if not regions:
+                continue
+
+            bad = [(box, d) for box, d in regions if d > self.tolerance]
+            check = f"Brand Color {name} ({part.get('file', '')} p{page})"
+            if bad:
+                worst = max(d for _, d in bad)
+                findings.append({"check": check, "status": "FAIL", "file": part.get('file'), "page": page,
+                                 "boxes": [box for box, _ in bad],
+                                 "observation": f"{len(bad)} of {len(regions)} {name} region(s) off-brand "
+                                                f"(worst ΔE2000 {worst:.1f} > {self.tolerance})."})
+            else:
+                best = max(d for _, d in regions)
+                findings.append({"check": check, "status": "PASS", "file": part.get('file'), "page": page,
+                                 "observation": f"{len(regions)} {name} region(s) within tolerance "
+                                                f"(max ΔE2000 {best:.1f})."})
+        return findings
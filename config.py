@@ -1,5 +1,3 @@
-import streamlit as st
-
 class Config:
     PAGE_TITLE = "Artwork Verification Pro"
     PAGE_ICON = "🛡️"
@@ -7,13 +5,106 @@ class Config:
     
     # AI Configuration
     MODEL_NAME = "gpt-4o"
+    OPENAI_BASE_URL = None              # None = api.openai.com; override for gateways / local stubs
+
+    # Local golden-sample pixel comparison (runs before the AI; matching pages skip it)
+    PIXEL_DIFF_ENABLED = True
+    PIXEL_DIFF_TOLERANCE = 40           # Grey-level difference (0-255) that counts as a changed pixel
+    PIXEL_DIFF_CELL = 16                # Pooling block size in pixels
+    PIXEL_DIFF_CELL_RATIO = 0.02        # Fraction of changed pixels that marks a block as changed
+    PIXEL_DIFF_MAX_SHIFT = 12           # Max page misregistration (px) searched during alignment
+    PIXEL_DIFF_PHASH_TOLERANCE = 6      # Hamming distance (of 63 bits) still considered the same page
+    PIXEL_DIFF_MAX_REGIONS = 8          # More changed regions than this sends the whole page
+    PIXEL_DIFF_CROP_PAD = 24            # Context pixels around each cropped region
+
+    # Local golden-sample text comparison (per page, per text block)
+    TEXT_DIFF_ENABLED = True
+    TEXT_DIFF_MAX_CHANGES = 12          # Changes listed in a finding's observation
+    TEXT_DIFF_CRITICAL_WORDS = ("WARNING", "CAUTION", "CONTRAINDICATIONS", "STERILE", "LATEX",
+                                "RX", "ONLY", "MADE", "ORIGIN", "SINGLE", "USE")  # Changes to these (or any number) FAIL
+
+    # Local brand-colour compliance (ΔE2000 against brand references)
+    COLOR_CHECK_ENABLED = True
+    BRAND_COLORS = {"Teal 319C": "#2CCCD3"}
+    COLOR_DELTA_E_TOLERANCE = 5.0       # Max median ΔE2000 for a brand-colour region to pass
+    COLOR_SEARCH_RADIUS = 20.0          # Pixels within this ΔE2000 count as an attempt at the brand colour
+    COLOR_MIN_REGION_PX = 64            # Ignore specks / anti-aliasing smaller than this
+
+    # Local barcode quiet-zone and edge-clearance checks
+    LAYOUT_CHECK_ENABLED = True
+    BARCODE_QUIET_ZONE_MM = 2.5         # Minimum blank margin either side of the bars
+    BARCODE_MIN_BARS = 20               # Fewer bars than this is not treated as a barcode
+    BARCODE_MIN_HEIGHT_MODULES = 15     # Bars shorter than this many narrowest-bar widths are text, not a symbol
+    BARCODE_MIN_BAR_SPAN = 0.8          # Bars must run over this fraction of the symbol height
+    SAFETY_MARGIN_PT = 9                # Text closer than this to the page edge (1/8") is flagged
+
+    # AI response cache (keyed on a digest of the full request payload)
+    AI_CACHE_ENABLED = True
+    AI_CACHE_PATH = ".cache/ai_responses.sqlite3"
+    AI_CACHE_TTL = 7 * 24 * 3600       # Seconds; 0 disables expiry
+    AI_CACHE_MAX_ENTRIES = 5000
+
+    # Vision payload preparation
+    AI_IMAGE_OPTIMIZE = True
+    AI_IMAGE_MAX_SIDE = 2048            # Model fits images into 2048x2048...
+    AI_IMAGE_SHORT_SIDE = 768           # ...then scales the shortest side to 768
+    AI_IMAGE_TILE_ASPECT = 2.0          # Longer dielines get split into strips of at most this aspect
+    AI_IMAGE_FORMAT = "JPEG"            # JPEG or WEBP
+    AI_IMAGE_QUALITY = 90
+    AI_IMAGE_PASSTHROUGH_BYTES = 150 * 1024  # Smaller images that already fit are sent as-is
+
+    # Concurrent per-file analysis
+    AI_CONCURRENCY = 4                  # Requests in flight at once
+    AI_REQUESTS_PER_MINUTE = 60         # 0 = unlimited
+    AI_PAGES_PER_REQUEST = 0            # 0 = one request per file
+    AI_MAX_RETRIES = 3
+    AI_RETRY_BASE_DELAY = 1.0           # Seconds; doubles on every retry
+    AI_STREAM = True                    # Stream completions; findings are handed on as each one arrives
+
+    # Timing spans (render, payload, OpenAI, validate) shown in the report's timing panel
+    TRACE_ENABLED = True
+
+    # Prompt context: BM25-ranked checklist rules / past errors (count cap + approx. token budget)
+    AI_CONTEXT_MAX_RULES = 25
+    AI_CONTEXT_RULE_TOKENS = 600
+    AI_CONTEXT_MAX_ERRORS = 8
+    AI_CONTEXT_ERROR_TOKENS = 250
     
     # File Upload Settings (For Artwork)
     ALLOWED_EXTENSIONS = ["pdf", "jpg", "jpeg", "png"]
+
+    # PDF Rendering
+    RENDER_DPI = 72             # PyMuPDF default; raise for fine print and barcodes
+    RENDER_WORKERS = None       # None = one per CPU core
+    PARALLEL_MIN_PAGES = 4      # Shorter documents render in-process (pool startup isn't worth it)
+    MAX_INFLIGHT_BYTES = 256 * 1024 * 1024  # Rendered page bytes allowed to queue ahead of the consumer
+    PAGE_BYTES_ESTIMATE = 2 * 1024 * 1024   # Initial guess per PNG page until real sizes are known
+
+    WORD_INDEX_CELL_PT = 72     # Spatial grid cell for positional word queries (1 inch)
+
+    # Rendered-page disk cache (keyed by file SHA-256 + render settings)
+    RENDER_CACHE_ENABLED = True
+    RENDER_CACHE_DIR = ".cache/renders"
+    RENDER_CACHE_MAX_BYTES = 1024 * 1024 * 1024
     
     # Exact filenames you provided
     CHECKLIST_FILE = "Artwork Checklist.xlsx"
     ERROR_TRACKER_FILE = "Artwork Error Tracker (1).xlsx"
+    GTIN_MAP_FILE = "SKU GTIN Map.csv"  # Optional: SKU and GTIN/UPC columns
+
+    # Durable run history (SQLite, WAL; written by a background thread)
+    HISTORY_DB_PATH = ".cache/history.sqlite3"
+    HISTORY_DEFAULT_DAYS = 90
+
+    # Dashboard findings view
+    RESULTS_PAGE_SIZE = 50
+    REPORT_HTML_CACHE_SIZE = 64
+
+    # Re-verify only the pages that changed since the previous revision of the same document
+    INCREMENTAL_ENABLED = True
+
+    # Parsed checklist/tracker entries kept in memory per server process
+    WORKBOOK_CACHE_SIZE = 16
 
     # System Prompt
     SYSTEM_PROMPT = """
@@ -37,6 +128,8 @@ class Config:
     }
 
 def load_css():
+    # Imported here so the processing core can import Config without Streamlit
+    import streamlit as st
     st.markdown("""
         <style>
         .stApp { background-color: #f8f9fa; }
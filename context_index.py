@@ -0,0 +1,91 @@
+import math
+import re
+from config import Config
+from cache import LRUCache
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Built indexes shared by every session; keyed on the documents themselves
+_INDEX_CACHE = LRUCache(max_entries=Config.WORKBOOK_CACHE_SIZE)
+
+def tokenize(text):
+    return [w for w in _WORD.findall(str(text).lower()) if len(w) > 1]
+
+def estimate_tokens(text):
+    # ~4 characters per token, plus the "- " bullet and newline
+    return len(text) // 4 + 2
+
+
+class ContextIndex:
+    """
+    BM25 index over short documents (checklist requirements, error descriptions).
+    Postings are precomputed once per distinct document list, so a query only touches
+    the documents that share a term with it.
+    """
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.lengths = []
+        self.postings = {}  # term -> [(doc id, term frequency)]
+        for i, doc in enumerate(docs):
+            terms = tokenize(doc)
+            self.lengths.append(len(terms))
+            counts = {}
+            for t in terms:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                self.postings.setdefault(t, []).append((i, tf))
+
+        n = len(docs)
+        self.avg_length = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    @classmethod
+    def build(cls, docs):
+        docs = tuple(docs)
+        return _INDEX_CACHE.get_or_build(docs, lambda: cls(docs))
+
+    def scores(self, query):
+        scores = [0.0] * len(self.docs)
+        avg = self.avg_length or 1.0
+        for t in set(tokenize(query)):
+            postings = self.postings.get(t)
+            if not postings: continue
+            idf = self.idf[t]
+            for i, tf in postings:
+                norm = tf + self.K1 * (1 - self.B + self.B * self.lengths[i] / avg)
+                scores[i] += idf * tf * (self.K1 + 1) / norm
+        return scores
+
+    def top(self, query, max_items, token_budget):
+        """
+        Document ids, most relevant first, within max_items and token_budget.
+        Unmatched documents only fill leftover budget, in their original order.
+        """
+        scores = self.scores(query)
+        order = sorted(range(len(self.docs)), key=lambda i: (-scores[i], i))
+        picked, used = [], 0
+        for i in order:
+            if len(picked) >= max_items: break
+            cost = estimate_tokens(self.docs[i])
+            if used + cost > token_budget: continue
+            picked.append(i)
+            used += cost
+        return picked
+
+
+def select_context(checklist, errors, query):
+    """
+    Picks the checklist rules and past errors most relevant to the candidate (its extracted
+    text and filename), each list capped by count and by an approximate token budget.
+    """
+    rules = ContextIndex.build(r['requirement'] for r in checklist)
+    picked_rules = [checklist[i] for i in rules.top(query, Config.AI_CONTEXT_MAX_RULES, Config.AI_CONTEXT_RULE_TOKENS)]
+
+    # The tracker repeats the same issue many times; each description is sent once
+    unique = list(dict.fromkeys(str(e['issue description']).strip() for e in errors))
+    past = ContextIndex.build(unique)
+    picked_errors = [unique[i] for i in past.top(query, Config.AI_CONTEXT_MAX_ERRORS, Config.AI_CONTEXT_ERROR_TOKENS)]
+    return picked_rules, picked_errors
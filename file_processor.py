@@ -1,12 +1,230 @@
-import fitz  # PyMuPDF
 from PIL import Image
+import atexit
+import hashlib
 import io
-import streamlit as st
+import logging
+import mimetypes
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from models import PageImage
+from render_cache import RenderCache
+from text_index import WordIndex
+from tracing import annotate, trace_iter, traced
+
+logger = logging.getLogger(__name__)
+
+# --- Render workers ---
+# One pool per worker count, created on first use and shared by every document and session
+# asking for that many workers (in practice one size per process: Config.RENDER_WORKERS).
+# Workers are started with forkserver/spawn, never forked from the (threaded) server process.
+# Each document is spooled to a temp file; a worker opens it once per hash and keeps
+# the last few open for the chunks that follow.
+_pools = {}  # worker count -> ProcessPoolExecutor
+_pool_lock = threading.Lock()
+_worker_docs = OrderedDict()  # file hash -> open fitz document (inside a worker)
+_WORKER_DOCS_KEPT = 2
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _shared_pool(workers):
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        return pool
+
+def _reset_pool(workers):
+    # A crashed worker breaks the whole executor; the next document gets a fresh one
+    with _pool_lock:
+        pool = _pools.pop(workers, None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def _shutdown_pool():
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+atexit.register(_shutdown_pool)
+
+def _worker_doc(file_hash, path):
+    doc = _worker_docs.get(file_hash)
+    if doc is not None:
+        _worker_docs.move_to_end(file_hash)
+        return doc
+    import fitz  # PyMuPDF
+    # Read into memory so the spool file is not held open (it is deleted once the document is done)
+    with open(path, "rb") as f:
+        doc = fitz.open(stream=f.read(), filetype="pdf")
+    _worker_docs[file_hash] = doc
+    while len(_worker_docs) > _WORKER_DOCS_KEPT:
+        _worker_docs.popitem(last=False)[1].close()
+    return doc
+
+def _render_chunk(file_hash, path, page_nums, dpi):
+    doc = _worker_doc(file_hash, path)
+    return [_render_page(doc, n, dpi) for n in page_nums]
+
+def _render_page(doc, page_num, dpi):
+    # Text, word boxes and raster all come from the same page load
+    page = doc[page_num]
+    text = page.get_text()
+    img_data = page.get_pixmap(dpi=dpi).tobytes("png")
+    return page_num, text, img_data, _page_layout(page)
+
+def _page_layout(page):
+    return {
+        "size": [page.rect.width, page.rect.height],
+        # [x0, y0, x1, y1, word, block, line] in PDF points
+        "words": [[round(w[0], 2), round(w[1], 2), round(w[2], 2), round(w[3], 2), w[4], w[5], w[6]]
+                  for w in page.get_text("words")],
+    }
+
+def page_fingerprints(doc, page_nums):
+    """
+    {page index: digest} of what each page draws, without rendering: page box and rotation,
+    the content stream, and the raw streams of its images and form XObjects.
+    Streams shared between pages (logos, dielines) are read once.
+    """
+    streams = {}
+
+    def stream(xref):
+        if xref not in streams:
+            streams[xref] = hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest()
+        return streams[xref]
+
+    prints = {}
+    for n in page_nums:
+        page = doc[n]
+        h = hashlib.sha256(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+        h.update(page.read_contents())
+        for xref in sorted({img[0] for img in page.get_images(full=True)} | {x[0] for x in page.get_xobjects()}):
+            h.update(stream(xref))
+        prints[n] = h.hexdigest()
+    return prints
+
+def parse_page_selection(selection, page_count):
+    """
+    Turns a 1-based selection ("1-3,5" or [1, 2, 5]) into sorted 0-based page indexes.
+    None selects every page; out-of-range pages are ignored.
+    """
+    if selection is None or selection == "":
+        return list(range(page_count))
+
+    if isinstance(selection, str):
+        nums = set()
+        for part in selection.split(","):
+            part = part.strip()
+            if not part: continue
+            if "-" in part:
+                start, end = part.split("-", 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else page_count
+                nums.update(range(start, end + 1))
+            else:
+                nums.add(int(part))
+    else:
+        nums = set(int(n) for n in selection)
+
+    return sorted(n - 1 for n in nums if 1 <= n <= page_count)
+
+
+class LocalFile:
+    """Path-backed stand-in for Streamlit's UploadedFile (name / type / read), for headless runs."""
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class PageStream:
+    """
+    Lazily iterates page parts from FileProcessor.iter_pages.
+    Combined text, the word index and the preview image are collected as pages go by,
+    so no page bytes are retained.
+    """
+    def __init__(self, pages):
+        self._pages = pages
+        self.text = ""
+        self.index = WordIndex()
+        self.files = {}  # name -> SHA-256 of the uploaded bytes
+        self.fingerprints = {}  # name -> {page: fingerprint} (incremental mode)
+        self.unchanged = {}  # name -> pages matching the baseline, passed through without a render
+        self.preview = None
+        self.page_count = 0
+
+    def __iter__(self):
+        current_file = None
+        for page in self._pages:
+            # Same separator process_files puts between files
+            if page["file"] != current_file and page["text"]:
+                current_file = page["file"]
+                self.text += f"\n--- FILE: {current_file} ---\n"
+            self.text += page["text"]
+            self.index.add_part(page)
+            self.files.setdefault(page["file"], page.get("file_hash"))
+            self.page_count += 1
+
+            if page.get("fingerprint"):
+                self.fingerprints.setdefault(page["file"], {})[page["page"]] = page["fingerprint"]
+            if page.get("unchanged"):
+                self.unchanged.setdefault(page["file"], set()).add(page["page"])
+
+            if self.preview is None and page["data"] is not None:
+                self.preview = Image.open(io.BytesIO(page["data"]))
+            yield page
+
 
 class FileProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, dpi=None, pages=None, workers=None, max_inflight_bytes=None, use_cache=None,
+                 incremental=False, baseline=None):
+        """
+        incremental: fingerprint every PDF page (parts carry "fingerprint").
+        baseline: {file name: {page: fingerprint}} of a previous revision; pages that still match
+        are not rendered and come through as text-only parts with "unchanged": True and no "data".
+        """
+        self.incremental = incremental or bool(baseline)
+        self.baseline = baseline or {}
+        self.dpi = dpi or Config.RENDER_DPI
+        self.pages = pages
+        self.workers = workers or Config.RENDER_WORKERS or os.cpu_count() or 1
+        self.max_inflight_bytes = max_inflight_bytes or Config.MAX_INFLIGHT_BYTES
+        if use_cache is None:
+            use_cache = Config.RENDER_CACHE_ENABLED
+        self.cache = RenderCache() if use_cache else None
+        # (file name, message) for every file that failed; callers decide how to surface them
+        self.errors = []
+
+    def stream(self, uploaded_files):
+        """Streaming counterpart of process_files: iterate it once, then read .text / .preview."""
+        return PageStream(self.iter_pages(uploaded_files))
 
+    def iter_pages(self, uploaded_files):
+        """
+        Yields one image part per rendered page, across all files, in order.
+        Parts carry "file", "file_hash", "page" (1-based) and "text" alongside "mime_type" / "data".
+        PDF pages also carry "dpi", "page_size" (points) and "words" ([x0, y0, x1, y1, word, block, line] in points).
+        """
+        for uploaded_file in uploaded_files:
+            try:
+                yield from trace_iter("process_file", self._iter_file(uploaded_file), file=uploaded_file.name)
+            except Exception as e:
+                self._record_error(uploaded_file, e)
+
+    @traced("process_files")
     def process_files(self, uploaded_files):
         """
         Processes a LIST of uploaded files (PDFs or Images).
@@ -18,72 +236,175 @@ class FileProcessor:
 
         for uploaded_file in uploaded_files:
             text, parts, preview = self.process_file(uploaded_file)
-            
+
             # Append text with a separator
             if text:
                 all_text += f"\n--- FILE: {uploaded_file.name} ---\n{text}"
-            
+
             # Extend image parts
             if parts:
                 all_image_parts.extend(parts)
-            
+
             # Keep the first valid preview found
             if not preview_image and preview:
                 preview_image = preview
 
+        annotate(files=len(uploaded_files), pages=len(all_image_parts))
         return all_text, all_image_parts, preview_image
 
+    @traced("process_file")
     def process_file(self, uploaded_file):
         """
         Processes a SINGLE file.
         """
-        text_content = ""
-        image_parts = []
-        preview_image = None
-
         try:
-            file_bytes = uploaded_file.read()
-            file_type = uploaded_file.type
-
-            # 1. PDF Handling
-            if "pdf" in file_type:
-                doc = fitz.open(stream=file_bytes, filetype="pdf")
-                
-                # Extract text
-                for page in doc:
-                    text_content += page.get_text()
-
-                # Convert first page to image for AI/Preview
-                # (In production, you might want to convert ALL pages)
-                for page_num, page in enumerate(doc):
-                    pix = page.get_pixmap()
-                    img_data = pix.tobytes("png")
-                    
-                    image_parts.append({
-                        "mime_type": "image/png",
-                        "data": img_data
-                    })
-                    
-                    # Set preview if it's the first page of first file
-                    if page_num == 0:
-                        preview_image = Image.open(io.BytesIO(img_data))
-
-            # 2. Image Handling
-            elif "image" in file_type:
-                image = Image.open(io.BytesIO(file_bytes))
-                text_content = "[Image File - Text Extraction Not Enabled]"
-                preview_image = image
-                
-                # Convert to bytes
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format=image.format)
-                image_parts.append({
-                    "mime_type": file_type,
-                    "data": img_byte_arr.getvalue()
-                })
-
+            image_parts = list(self._iter_file(uploaded_file))
+            annotate(file=uploaded_file.name, items=len(image_parts), bytes=sum(len(p["data"] or b"") for p in image_parts))
+            text_content = "".join(p["text"] for p in image_parts)
+            first = next((p["data"] for p in image_parts if p["data"] is not None), None)
+            preview_image = Image.open(io.BytesIO(first)) if first else None
             return text_content, image_parts, preview_image
 
         except Exception as e:
-            st.error(f"Error processing {uploaded_file.name}: {e}")
+            self._record_error(uploaded_file, e)
             return "", [], None
+
+    def _record_error(self, uploaded_file, error):
+        logger.warning("Error processing %s: %s", uploaded_file.name, error)
+        self.errors.append((uploaded_file.name, str(error)))
+
+    def _iter_file(self, uploaded_file):
+        file_bytes = uploaded_file.read()
+        file_type = uploaded_file.type
+        file_hash = RenderCache.file_hash(file_bytes)
+        annotate(bytes_in=len(file_bytes))
+
+        # 1. PDF Handling
+        if "pdf" in file_type and self.incremental:
+            yield from self._iter_incremental(uploaded_file.name, file_bytes, file_hash)
+        elif "pdf" in file_type:
+            for page_num, text, img_data, layout in self._cached_render(file_bytes, file_hash):
+                yield self._pdf_part(uploaded_file.name, file_hash, page_num, text, img_data, layout)
+
+        # 2. Image Handling
+        elif "image" in file_type:
+            # Original bytes go through as-is; open only to reject unreadable uploads early
+            # and to read the resolution the artwork was saved at (None if it doesn't say)
+            dpi = Image.open(io.BytesIO(file_bytes)).info.get("dpi")
+            yield PageImage(
+                file=uploaded_file.name,
+                file_hash=file_hash,
+                page=1,
+                text="[Image File - Text Extraction Not Enabled]",
+                mime_type=file_type,
+                data=file_bytes,
+                dpi=round(dpi[0]) if dpi and dpi[0] >= 1 else None
+            )
+
+    def _pdf_part(self, name, file_hash, page_num, text, img_data, layout):
+        return PageImage(
+            file=name,
+            file_hash=file_hash,
+            page=page_num + 1,
+            text=text,
+            mime_type="image/png" if img_data is not None else None,
+            data=img_data,
+            dpi=self.dpi,
+            page_size=layout["size"],
+            words=layout["words"]
+        )
+
+    def _iter_incremental(self, name, file_bytes, file_hash):
+        """Fingerprints every selected page, then renders only those that differ from the baseline."""
+        import fitz
+        doc = fitz.open(stream=file_bytes, filetype="pdf")
+        try:
+            selected = parse_page_selection(self.pages, doc.page_count)
+            prints = page_fingerprints(doc, selected)
+            baseline = self.baseline.get(name, {})
+            changed = [n for n in selected if baseline.get(n + 1) != prints[n]]
+            annotate(pages_unchanged=len(selected) - len(changed))
+
+            rendered = iter(self._cached_render(file_bytes, file_hash, pages=[n + 1 for n in changed]) if changed else ())
+            changed = set(changed)
+            for n in selected:
+                if n in changed:
+                    part = self._pdf_part(name, file_hash, *next(rendered))
+                else:
+                    # Text and word boxes are cheap next to a raster; the validator still sees every page
+                    page = doc[n]
+                    part = self._pdf_part(name, file_hash, n, page.get_text(), None, _page_layout(page))
+                    part["unchanged"] = True
+                part["fingerprint"] = prints[n]
+                yield part
+        finally:
+            doc.close()
+
+    def _cached_render(self, file_bytes, file_hash, pages=None):
+        # Repeat inputs (golden samples, re-uploaded proofs) skip PyMuPDF entirely
+        pages = self.pages if pages is None else pages
+        if not self.cache:
+            return self._render_pdf(file_bytes, pages, file_hash)
+
+        key = self.cache.key(file_hash, dpi=self.dpi, pages=pages, format="png", layout=1)
+        cached = self.cache.load(key)
+        annotate(render_cache_hit=cached is not None)
+        if cached is not None:
+            return iter(cached)
+        return self.cache.write_through(key, self._render_pdf(file_bytes, pages, file_hash))
+
+    def _render_pdf(self, file_bytes, pages=None, file_hash=None):
+        """
+        Yields (page_num, text, png_bytes, layout) in page order.
+        Short documents render in-process; longer ones fan out across a shared pool of
+        `workers` processes (at most two chunks per worker in flight), with no more than
+        max_inflight_bytes of rendered pages queued ahead of the consumer.
+        """
+        import fitz  # PyMuPDF; lazy so cache hits and image-only runs never load it
+        doc = fitz.open(stream=file_bytes, filetype="pdf")
+        page_nums = parse_page_selection(self.pages if pages is None else pages, doc.page_count)
+        workers = min(self.workers, len(page_nums))
+
+        if workers < 2 or len(page_nums) < Config.PARALLEL_MIN_PAGES:
+            try:
+                for n in page_nums:
+                    yield _render_page(doc, n, self.dpi)
+            finally:
+                doc.close()
+            return
+        doc.close()
+        file_hash = file_hash or RenderCache.file_hash(file_bytes)
+
+        # Several chunks per worker keeps the pool balanced when some pages are heavier
+        size = max(1, -(-len(page_nums) // (workers * 2)))
+        chunks = deque(page_nums[i:i + size] for i in range(0, len(page_nums), size))
+        pending = deque()
+        chunk_bytes = Config.PAGE_BYTES_ESTIMATE * size  # Refined from real chunks as they finish
+
+        # Workers read the document from a spool file instead of one pickled copy per task
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_bytes)
+        pool = _shared_pool(self.workers)
+        try:
+            while chunks or pending:
+                # Top up the window while the estimated in-flight bytes stay under the cap
+                while chunks and len(pending) < workers * 2 and (
+                        not pending or (len(pending) + 1) * chunk_bytes <= self.max_inflight_bytes):
+                    pending.append(pool.submit(_render_chunk, file_hash, path, chunks.popleft(), self.dpi))
+
+                try:
+                    results = pending.popleft().result()
+                except BrokenProcessPool:
+                    _reset_pool(self.workers)
+                    raise
+                done_bytes = sum(len(r[2]) for r in results)
+                chunk_bytes = max(chunk_bytes, done_bytes)
+                yield from results
+        finally:
+            for future in pending:
+                future.cancel()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,84 @@
+import json
+import time
+
+
+class FindingsParser:
+    """
+    Incremental parser for a streamed {"findings": [{...}, ...]} response.
+    feed() scans only the newly arrived characters and returns every findings entry
+    whose closing brace has arrived, so each can be used before the response ends.
+    result() parses the whole body, or keeps the entries already seen if it is broken.
+    """
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.last_string = None   # Last complete string directly inside the top-level object (keys)
+        self.array_depth = None   # Depth of the findings array once it has opened; -1 after it closes
+        self.item_start = None
+        self.findings = []
+        self.started = time.perf_counter()
+
+    def feed(self, text):
+        self.buf += text
+        found = []
+        buf = self.buf
+        for i in range(self.pos, len(buf)):
+            c = buf[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_string = buf[self.string_start + 1:i]
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c in "{[":
+                self.depth += 1
+                if c == "[" and self.depth == 2 and self.array_depth is None and self.last_string == "findings":
+                    self.array_depth = 2
+                elif c == "{" and self.array_depth and self.depth == self.array_depth + 1:
+                    self.item_start = i
+            elif c in "}]":
+                if c == "}" and self.item_start is not None and self.depth == self.array_depth + 1:
+                    try:
+                        item = json.loads(buf[self.item_start:i + 1])
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        found.append(item)
+                    self.item_start = None
+                elif c == "]" and self.depth == self.array_depth:
+                    self.array_depth = -1
+                self.depth -= 1
+        self.pos = len(buf)
+        self.findings.extend(found)
+        return found
+
+    def result(self, error=None):
+        """The full response; if it never completed or does not parse, the findings seen so far plus a warning."""
+        if error is None:
+            try:
+                result = json.loads(self.buf)
+                if isinstance(result, dict):
+                    return result
+                error = "response is not a JSON object"
+            except ValueError as e:
+                error = f"invalid JSON ({e})"
+        return {
+            "findings": self.findings + [{
+                "check": "AI Processing",
+                "status": "WARNING",
+                "observation": f"Response incomplete: {error}. Kept {len(self.findings)} findings received before it stopped."
+            }],
+            "partial": True,
+        }
@@ -0,0 +1,270 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from config import Config
+from validator import extract_sku
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        sku TEXT,
+        status TEXT NOT NULL,
+        pass INTEGER NOT NULL,
+        fail INTEGER NOT NULL,
+        warn INTEGER NOT NULL,
+        model TEXT,
+        seconds REAL,
+        files TEXT,
+        timings TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS checks (
+        run_id INTEGER NOT NULL REFERENCES runs (id),
+        ts REAL NOT NULL,
+        sku TEXT,
+        status TEXT NOT NULL,
+        name TEXT,
+        observation TEXT,
+        file TEXT,
+        page INTEGER
+    )""",
+    # Page fingerprints and findings of each verified file, for incremental re-verification
+    """CREATE TABLE IF NOT EXISTS revisions (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        document TEXT NOT NULL,
+        sku TEXT,
+        file TEXT,
+        file_hash TEXT,
+        context TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS revision_pages (
+        revision_id INTEGER NOT NULL REFERENCES revisions (id),
+        page INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        findings TEXT,
+        PRIMARY KEY (revision_id, page)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_revisions_document_ts ON revisions (document, ts)",
+    # Every dashboard query filters on some of (sku, status, ts) and sorts by ts
+    "CREATE INDEX IF NOT EXISTS idx_runs_ts ON runs (ts)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_sku_ts ON runs (sku, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_status_ts ON runs (status, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_checks_ts ON checks (ts)",
+    "CREATE INDEX IF NOT EXISTS idx_checks_sku_status_ts ON checks (sku, status, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_checks_status_ts ON checks (status, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_checks_run ON checks (run_id)",
+]
+
+# One writer thread per database file, shared by every session of the server process
+_writers = {}
+_writers_lock = threading.Lock()
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe under WAL; a crash can lose only the last commits
+    return conn
+
+# "_v7", "-rev3", " R2" before the extension
+_VERSION = re.compile(r"[\s_\-.]*(?:v|ver|rev|r)\d+$", re.IGNORECASE)
+
+def document_key(filename):
+    """One key for every revision of a document: DMD1001BLK_box_v7.pdf -> dmd1001blk_box."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return _VERSION.sub("", stem).lower()
+
+def _status(value):
+    value = str(value or "").upper()
+    return "WARNING" if value == "WARN" else value
+
+
+class _Writer(threading.Thread):
+    """Drains queued runs and revisions into SQLite, one transaction per batch, off the UI thread."""
+
+    def __init__(self, path):
+        super().__init__(name="history-writer", daemon=True)
+        self.path = path
+        self.queue = queue.Queue()
+
+    def run(self):
+        conn = _connect(self.path)
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for run in batch:
+                        self._insert(conn, run)
+            except sqlite3.Error as e:
+                logger.warning("History write failed (%d runs dropped): %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _insert(self, conn, run):
+        if run.get("kind") == "revision":
+            return self._insert_revision(conn, run)
+        cur = conn.execute(
+            "INSERT INTO runs (ts, sku, status, pass, fail, warn, model, seconds, files, timings) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run["ts"], run["sku"], run["status"], run["pass"], run["fail"], run["warn"], run["model"],
+             run["seconds"], json.dumps(run["files"]), json.dumps(run["timings"])))
+        conn.executemany(
+            "INSERT INTO checks (run_id, ts, sku, status, name, observation, file, page) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(cur.lastrowid, run["ts"], c["sku"], c["status"], c["name"], c["observation"], c["file"], c["page"])
+             for c in run["checks"]])
+
+    def _insert_revision(self, conn, rev):
+        cur = conn.execute(
+            "INSERT INTO revisions (ts, document, sku, file, file_hash, context) VALUES (?, ?, ?, ?, ?, ?)",
+            (rev["ts"], rev["document"], rev["sku"], rev["file"], rev["file_hash"], rev["context"]))
+        conn.executemany(
+            "INSERT INTO revision_pages (revision_id, page, fingerprint, findings) VALUES (?, ?, ?, ?)",
+            [(cur.lastrowid, page, fp, json.dumps(rev["findings"].get(page, []), default=str))
+             for page, fp in rev["fingerprints"].items()])
+
+    def flush(self, timeout=None):
+        """Waits until everything queued so far is written (or timeout seconds pass)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+class HistoryStore:
+    """
+    Durable verification history: one row per run (files + hashes, SKU, counts, model, timings)
+    and one per check, in SQLite (WAL). record() only enqueues; a background thread does the
+    writes, so the UI never waits on the disk. Reads use their own short-lived connections.
+    """
+    def __init__(self, path=None):
+        self.path = path or Config.HISTORY_DB_PATH
+        with _writers_lock:
+            writer = _writers.get(self.path)
+            if writer is None:
+                folder = os.path.dirname(self.path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                with closing(_connect(self.path)) as conn, conn:
+                    for statement in _SCHEMA:
+                        conn.execute(statement)
+                writer = _Writer(self.path)
+                writer.start()
+                atexit.register(writer.flush, 5)
+                _writers[self.path] = writer
+        self._writer = writer
+
+    def record(self, report, files, model=None, sku=None, seconds=None, timings=None):
+        """
+        Queues one run. files: [(name, sha256)]; sku: the run's SKU (per-check SKUs come
+        from each check's file name when it has one).
+        """
+        summary = report["summary"]
+        status = "FAIL" if summary["fail"] else "WARNING" if summary["warn"] else "PASS"
+        checks = []
+        for c in report["checks"]:
+            checks.append({
+                "sku": (extract_sku(c["file"]) if c.get("file") else None) or sku,
+                "status": _status(c.get("status")),
+                "name": c.get("name"),
+                "observation": c.get("observation"),
+                "file": c.get("file"),
+                "page": c.get("page"),
+            })
+        self._writer.queue.put({
+            "ts": time.time(), "sku": sku, "status": status,
+            "pass": summary["pass"], "fail": summary["fail"], "warn": summary["warn"],
+            "model": model, "seconds": seconds, "files": [list(f) for f in files],
+            "timings": timings or [], "checks": checks,
+        })
+
+    def record_revision(self, file, file_hash, fingerprints, findings, context=None):
+        """
+        Queues one file's page fingerprints ({page: digest}) and the findings of each page
+        ({page: [finding]}), the baseline for the next revision of the same document
+        verified under the same context (see incremental.revision_context).
+        """
+        self._writer.queue.put({
+            "kind": "revision", "ts": time.time(), "document": document_key(file),
+            "sku": extract_sku(file), "file": file, "file_hash": file_hash, "context": context,
+            "fingerprints": fingerprints, "findings": findings,
+        })
+
+    def flush(self, timeout=None):
+        return self._writer.flush(timeout)
+
+    # --- Queries ---
+
+    def recent_runs(self, limit=20, sku=None):
+        sql = "SELECT id, ts, sku, status, pass, fail, warn, model, seconds, files FROM runs"
+        args = []
+        if sku:
+            sql += " WHERE sku = ?"
+            args.append(sku.upper())
+        sql += " ORDER BY ts DESC LIMIT ?"
+        rows = self._query(sql, args + [limit])
+        keys = ("id", "ts", "sku", "status", "pass", "fail", "warn", "model", "seconds", "files")
+        return [dict(zip(keys, r), files=json.loads(r[-1] or "[]")) for r in rows]
+
+    def checks(self, sku=None, status=None, days=None, limit=1000):
+        """e.g. checks(sku="DMD1001BLK", status="FAIL", days=90): newest first."""
+        where, args = self._filters(sku, status, days)
+        sql = ("SELECT ts, sku, status, name, observation, file, page, run_id FROM checks"
+               + where + " ORDER BY ts DESC LIMIT ?")
+        keys = ("ts", "sku", "status", "name", "observation", "file", "page", "run_id")
+        return [dict(zip(keys, r)) for r in self._query(sql, args + [limit])]
+
+    def status_counts(self, sku=None, days=None):
+        where, args = self._filters(sku, None, days)
+        return dict(self._query("SELECT status, COUNT(*) FROM checks" + where + " GROUP BY status", args))
+
+    def previous_revision(self, file, context=None):
+        """
+        Latest stored revision of the same document as file (version suffix ignored) verified
+        under the same context: {file, file_hash, fingerprints: {page: digest},
+        findings: {page: [finding]}}, or None.
+        """
+        row = self._query("SELECT id, file, file_hash FROM revisions WHERE document = ? AND context IS ? "
+                          "ORDER BY ts DESC LIMIT 1", [document_key(file), context])
+        if not row:
+            return None
+        rev_id, name, file_hash = row[0]
+        pages = self._query("SELECT page, fingerprint, findings FROM revision_pages WHERE revision_id = ?", [rev_id])
+        return {
+            "file": name, "file_hash": file_hash,
+            "fingerprints": {page: fp for page, fp, _ in pages},
+            "findings": {page: json.loads(f or "[]") for page, _, f in pages},
+        }
+
+    def _filters(self, sku, status, days):
+        clauses, args = [], []
+        if sku:
+            clauses.append("sku = ?")
+            args.append(sku.upper())
+        if status:
+            clauses.append("status = ?")
+            args.append(_status(status))
+        if days:
+            clauses.append("ts >= ?")
+            args.append(time.time() - days * 86400)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+    def _query(self, sql, args):
+        with closing(_connect(self.path)) as conn:
+            return conn.execute(sql, args).fetchall()
@@ -0,0 +1,129 @@
+import re
+from datetime import date
+
+# Compiled once per process. A single alternation so the text is scanned in one pass;
+# UDI element strings come first so their embedded GTIN/lot/dates are claimed by the UDI.
+_PATTERN = re.compile(r"""
+    (?P<udi>\(01\)\s?\d{14}(?:\s?\(\d{2,4}\)\s?[0-9A-Z\-./]+)*)
+  | \bLOT\b(?:\s+(?:NO\b\.?|NUMBER\b))?\s*[:#]?\s*(?P<lot>(?=[A-Z0-9\-/]*\d)[A-Z0-9\-/]{3,20}|X{3,20})
+  | \b(?:EXP(?:IRY|IRATION)?(?:\s+DATE)?|USE\s+BY)\b\s*[:.]?\s*
+      (?P<exp>\d{4}-\d{2}(?:-\d{2})?|\d{2}/\d{4}|\d{2}/\d{2}/\d{4}|YYYY-MM(?:-DD)?)
+  | \b(?:GTIN|UPC|EAN)(?:-?(?:8|12|13|14|A))?\s*[:#]?\s*
+      (?P<gtin_label>\d\ \d{5}\ \d{5}\ \d|\d\ \d{6}\ \d{6}|\d{4}\ \d{4}|\d{8,14})(?!\d)
+  | (?<!\d)(?P<gtin_spaced>\d\ \d{5}\ \d{5}\ \d|\d\ \d{6}\ \d{6})(?!\d)
+  | (?<!\d)(?P<gtin>\d{12,14})(?!\d)
+""", re.VERBOSE)
+
+# Bare numbers right after these are patent, model, part, phone ... numbers, never GTINs
+_NOT_GTIN_BEFORE = re.compile(r"\b(?:PAT(?:ENT)?S?|US|EP|MODEL|MOD|SERIAL|S/?N|REF|PART|P/N|ITEM|ORDER|TEL|PHONE|FAX)"
+                              r"\b[\s.:#]*(?:NO\b\.?|NUMBER\b)?[\s.:#]*$")
+
+_UDI_ELEMENT = re.compile(r"\((\d{2,4})\)\s?([0-9A-Z\-./]+)")
+
+# GS1 application identifiers we read out of a UDI
+_UDI_AIS = {"01": "gtin", "10": "lot", "11": "production date", "17": "expiry", "21": "serial"}
+
+
+def gtin_check_digit(digits):
+    """GS1 mod-10 check digit for the payload digits (everything but the check digit)."""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digits)))
+    return str((10 - total % 10) % 10)
+
+def gtin_valid(gtin):
+    return len(gtin) in (8, 12, 13, 14) and gtin.isdigit() and gtin_check_digit(gtin[:-1]) == gtin[-1]
+
+def gtin14(gtin):
+    """Zero-padded GTIN-14 form, so UPC-A / EAN-13 / GTIN-14 spellings of one item compare equal."""
+    return re.sub(r"\D", "", str(gtin)).zfill(14)
+
+
+class IdentifierScanner:
+    """
+    Structured identifier extraction: GTIN-8/12/13/14 (bare, labelled or in the spaced
+    human-readable form under a barcode), GS1 UDI element strings, and lot / expiry statements.
+    Check digits and dates are verified; GTINs are cross-checked against the SKU map.
+    Bare 8-digit numbers are only read as GTIN-8 when labelled (too easily a date or part number).
+    Bare 12-14 digit numbers have no GTIN context, so they only count when their check digit holds
+    and they don't follow a patent / model / part / phone label; otherwise they are ignored, not failed.
+    """
+    def __init__(self, gtin_map=None):
+        # SKU -> GTIN-14
+        self.gtin_map = {str(k).upper(): gtin14(v) for k, v in (gtin_map or {}).items()}
+
+    def scan(self, text):
+        """Returns [{kind, value, valid, problem}] in text order; kind is gtin/udi/lot/expiry."""
+        found = []
+        text = text.upper()
+        for m in _PATTERN.finditer(text):
+            kind = m.lastgroup
+            value = m.group(kind)
+            if kind == "udi":
+                found.append(self._udi(value))
+            elif kind == "lot":
+                found.append({"kind": "lot", "value": value, "valid": True,
+                              "problem": "placeholder" if set(value) == {"X"} else None})
+            elif kind == "exp":
+                problem = self._date_problem(value)
+                found.append({"kind": "expiry", "value": value, "valid": problem is None, "problem": problem})
+            elif kind == "gtin":
+                if gtin_valid(value) and not _NOT_GTIN_BEFORE.search(text, max(0, m.start() - 24), m.start()):
+                    found.append(self._gtin(value))
+            else:
+                digits = value.replace(" ", "")
+                found.append(self._gtin(digits))
+        return found
+
+    def expected_gtin(self, sku):
+        return self.gtin_map.get(sku.upper()) if sku else None
+
+    def _gtin(self, digits):
+        if len(digits) not in (8, 12, 13, 14):
+            return {"kind": "gtin", "value": digits, "valid": False, "problem": f"{len(digits)} digits is not a GTIN length"}
+        if not gtin_valid(digits):
+            return {"kind": "gtin", "value": digits, "valid": False,
+                    "problem": f"check digit {digits[-1]} should be {gtin_check_digit(digits[:-1])}"}
+        return {"kind": "gtin", "value": digits, "valid": True, "problem": None}
+
+    def _udi(self, value):
+        elements = {_UDI_AIS.get(ai, ai): data for ai, data in _UDI_ELEMENT.findall(value)}
+        problems = []
+        gtin = elements.get("gtin", "")
+        if not gtin_valid(gtin):
+            problems.append(f"(01) {gtin} fails its check digit")
+        for field in ("expiry", "production date"):
+            if field in elements and not self._yymmdd_valid(elements[field]):
+                problems.append(f"{field} {elements[field]} is not a YYMMDD date")
+        if "lot" in elements and len(elements["lot"]) > 20:
+            problems.append("(10) lot is longer than 20 characters")
+        return {"kind": "udi", "value": value, "valid": not problems, "problem": "; ".join(problems) or None,
+                "elements": elements}
+
+    def _yymmdd_valid(self, value):
+        if not re.fullmatch(r"\d{6}", value):
+            return False
+        yy, mm, dd = int(value[:2]), int(value[2:4]), int(value[4:])
+        # GS1: day 00 means "end of month"
+        return self._real_date(2000 + yy, mm, dd or 1)
+
+    def _date_problem(self, value):
+        if value.startswith("YYYY"):
+            return None  # Placeholder, filled at print time
+        parts = [int(p) for p in re.split(r"[-/]", value)]
+        if "-" in value:
+            year, month, day = (parts + [1])[:3]
+        elif len(parts) == 2:
+            month, year, day = parts[0], parts[1], 1
+        else:
+            # DD/MM/YYYY vs MM/DD/YYYY is ambiguous; accept either reading
+            a, b, year = parts
+            if self._real_date(year, b, a) or self._real_date(year, a, b):
+                return None
+            return f"{value} is not a valid date"
+        return None if self._real_date(year, month, day) else f"{value} is not a valid date"
+
+    def _real_date(self, year, month, day):
+        try:
+            date(year, month, day)
+            return True
+        except ValueError:
+            return False
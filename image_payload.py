@@ -0,0 +1,100 @@
+import io
+import math
+from PIL import Image
+from config import Config
+
+class PayloadOptimizer:
+    """
+    Prepares page images for the vision request.
+    - Downscales to what the model actually looks at (fit 2048px, then shortest side 768px)
+    - Tiles very elongated dielines so each strip keeps legible detail
+    - Re-encodes large PNGs to JPEG/WebP; small or already-fitting images pass through untouched
+    Also keeps a running estimate of image tokens for the request.
+    """
+    def __init__(self, max_side=None, short_side=None, tile_aspect=None, image_format=None, quality=None,
+                 passthrough_max_bytes=None):
+        self.max_side = max_side or Config.AI_IMAGE_MAX_SIDE
+        self.short_side = short_side or Config.AI_IMAGE_SHORT_SIDE
+        self.tile_aspect = tile_aspect or Config.AI_IMAGE_TILE_ASPECT
+        self.image_format = (image_format or Config.AI_IMAGE_FORMAT).upper()
+        self.quality = quality or Config.AI_IMAGE_QUALITY
+        self.passthrough_max_bytes = passthrough_max_bytes or Config.AI_IMAGE_PASSTHROUGH_BYTES
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"images": 0, "bytes_in": 0, "bytes_out": 0, "passthrough": 0, "est_image_tokens": 0}
+
+    def prepare(self, parts):
+        """Lazily yields request-ready parts; extra keys on each part (file, page, ...) are kept."""
+        for part in parts:
+            self.stats["bytes_in"] += len(part['data'])
+            for out in self._prepare_one(part):
+                self.stats["images"] += 1
+                self.stats["bytes_out"] += len(out['data'])
+                self.stats["est_image_tokens"] += self.estimate_tokens(*out['size'])
+                yield out
+
+    @staticmethod
+    def estimate_tokens(width, height):
+        # OpenAI high-detail accounting: fit 2048, shortest side 768, then 170 tokens per 512px tile + 85 base
+        scale = min(1.0, 2048 / max(width, height), 768 / min(width, height))
+        width, height = width * scale, height * scale
+        return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+    def _prepare_one(self, part):
+        image = Image.open(io.BytesIO(part['data']))  # Header only; pixels decode on demand
+        width, height = image.size
+        long_side, short = max(width, height), min(width, height)
+
+        tiles = 1
+        if long_side > self.max_side and long_side / short > self.tile_aspect:
+            tiles = math.ceil(long_side / short / self.tile_aspect)
+
+        needs_resize = tiles > 1 or self._target_size(width, height) != (width, height)
+
+        # 1. Nothing to do: original bytes go straight through
+        if not needs_resize and (part['mime_type'] == self._mime or len(part['data']) <= self.passthrough_max_bytes):
+            self.stats["passthrough"] += 1
+            out = part.copy()  # Keeps a PageImage a PageImage
+            out['size'] = (width, height)
+            yield out
+            return
+
+        # 2. Tile along the long axis, then scale and re-encode each piece
+        for i in range(tiles):
+            if width >= height:
+                box = (round(i * width / tiles), 0, round((i + 1) * width / tiles), height)
+            else:
+                box = (0, round(i * height / tiles), width, round((i + 1) * height / tiles))
+            piece = image.crop(box) if tiles > 1 else image
+            size = self._target_size(*piece.size)
+            if size != piece.size:
+                piece = piece.resize(size, Image.LANCZOS)
+
+            out = part.copy()
+            out['mime_type'] = self._mime
+            out['data'] = self._encode(piece)
+            out['size'] = size
+            if tiles > 1:
+                out['tile'] = (i + 1, tiles)
+            yield out
+
+    def _target_size(self, width, height):
+        # Only ever downscale: fit the long side, then cap the short side
+        scale = min(1.0, self.max_side / max(width, height), self.short_side / min(width, height))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    @property
+    def _mime(self):
+        return "image/webp" if self.image_format == "WEBP" else "image/jpeg"
+
+    def _encode(self, image):
+        if image.mode != "RGB":
+            # JPEG has no alpha: flatten onto white like the printed proof
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        buf = io.BytesIO()
+        image.save(buf, format="WEBP" if self.image_format == "WEBP" else "JPEG", quality=self.quality)
+        return buf.getvalue()
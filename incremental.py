@@ -0,0 +1,79 @@
+import hashlib
+import json
+from history_store import HistoryStore
+from models import Rule
+
+
+def revision_context(rules, model, reference_hashes=()):
+    """
+    Digest of what a page's findings depend on besides the page itself: the checklist,
+    the model and the golden sample. A stored revision is only a baseline under the same one.
+    """
+    raw = json.dumps({
+        "rules": [list(Rule.from_dict(r).key) for r in rules],
+        "model": model,
+        "references": sorted(reference_hashes),
+    }, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class RevisionTracker:
+    """
+    Incremental re-verification: a new revision of a document is compared page by page
+    (by fingerprint) with the last stored revision of the same document and context
+    (revision_context). Unchanged pages are not rendered or sent to the AI; their stored
+    findings are carried over instead.
+    """
+    def __init__(self, history=None, context=None):
+        self.history = history or HistoryStore()
+        self.context = context
+        self.previous = {}  # file name -> previous revision (see HistoryStore.previous_revision)
+
+    def baseline(self, uploaded_files):
+        """{file name: {page: fingerprint}} for FileProcessor(baseline=...)."""
+        self.previous = {}
+        for f in uploaded_files:
+            rev = self.history.previous_revision(f.name, self.context)
+            if rev:
+                self.previous[f.name] = rev
+        return {name: rev["fingerprints"] for name, rev in self.previous.items()}
+
+    def reused_findings(self, stream):
+        """Stored findings of the pages the stream passed through unchanged, once per check."""
+        reused = []
+        for name, pages in stream.unchanged.items():
+            rev = self.previous.get(name)
+            if not rev: continue
+            seen = set()
+            for page in sorted(pages):
+                for finding in rev["findings"].get(page, []):
+                    key = (finding.get('check'), finding.get('observation'))
+                    if key in seen: continue
+                    seen.add(key)
+                    # Check names often embed the file name ("Brand Color ... (box_v6.pdf p3)")
+                    check = str(finding.get('check', '')).replace(rev["file"], name)
+                    finding = dict(finding, check=check, file=name, reused_from=rev["file"])
+                    if finding.get('page') is None:
+                        # Findings of a multi-page request: keep only the pages still unchanged
+                        finding['pages'] = [p for p in finding.get('pages', []) if p in pages]
+                    reused.append(finding)
+        return reused
+
+    def commit(self, stream, findings, incomplete=None):
+        """
+        Stores every fingerprinted file of the stream with its findings, by page.
+        Pages of AI requests that failed or were cut short ({file: pages}) are left out,
+        so they have no baseline and are verified again next time.
+        """
+        incomplete = incomplete or {}
+        for name, prints in stream.fingerprints.items():
+            skip = incomplete.get(name, ())
+            prints = {page: fp for page, fp in prints.items() if page not in skip}
+            by_page = {page: [] for page in prints}
+            for finding in findings:
+                if finding.get('file') != name: continue
+                pages = [finding['page']] if finding.get('page') else finding.get('pages') or []
+                for page in pages:
+                    if page in by_page:
+                        by_page[page].append(finding)
+            self.history.record_revision(name, stream.files.get(name), prints, by_page, self.context)
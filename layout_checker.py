@@ -0,0 +1,203 @@
+import io
+import numpy as np
+from PIL import Image
+from config import Config
+from page_check import PageCheck
+from pixel_diff import changed_boxes
+from text_index import WordIndex
+
+class LayoutChecker(PageCheck):
+    """
+    Deterministic barcode quiet-zone and edge-clearance checks.
+    - Barcodes: stripe regions found by run-length analysis of the page raster (many dark/light
+      transitions along a row, repeated identically down the rows, bars tall relative to the
+      narrowest bar and running the full symbol height, not under a PDF word), then the blank
+      margin either side of the bars is measured against the required quiet zone.
+      Images without resolution metadata have no mm scale, so their quiet zones are not measured.
+    - Edge clearance: PyMuPDF word boxes closer than the safety distance to the page edge.
+    All boxes in findings are page-raster pixels.
+    """
+    def __init__(self, quiet_zone_mm=None, min_bars=None, safety_margin_pt=None, min_height_modules=None,
+                 min_bar_span=None):
+        self.quiet_zone_mm = quiet_zone_mm or Config.BARCODE_QUIET_ZONE_MM
+        self.min_bars = min_bars or Config.BARCODE_MIN_BARS
+        self.min_height_modules = min_height_modules or Config.BARCODE_MIN_HEIGHT_MODULES
+        self.min_bar_span = min_bar_span or Config.BARCODE_MIN_BAR_SPAN
+        self.safety_margin_pt = safety_margin_pt if safety_margin_pt is not None else Config.SAFETY_MARGIN_PT
+
+    def check_page(self, part):
+        gray = np.asarray(Image.open(io.BytesIO(part['data'])).convert("L"))
+        dpi = part.get('dpi')  # PDF render DPI, or the image's own metadata; None if it has none
+        findings = self._check_barcodes(gray < 128, dpi, part)
+        if part.get('words') is not None and part.get('page_size'):
+            findings.extend(self._check_edges(part, dpi))
+        return findings
+
+    # --- Barcodes ---
+
+    def find_barcodes(self, dark, word_boxes=()):
+        """
+        Returns [(box, vertical_bars)] with box = (x0, y0, x1, y1) for stripe regions.
+        word_boxes: text boxes in page-raster pixels; stripes lying on text are not barcodes.
+        """
+        found = [(box, True) for box in self._stripe_boxes(dark, word_boxes)]
+        # Rotated barcodes: same analysis on the transposed page, boxes swapped back
+        swapped = [(b[1], b[0], b[3], b[2]) for b in word_boxes]
+        found += [((b[1], b[0], b[3], b[2]), False) for b in self._stripe_boxes(dark.T, swapped)]
+        return found
+
+    def _stripe_boxes(self, dark, word_boxes=()):
+        h, w = dark.shape
+        if h < 2 or w < 2:
+            return []
+        # A bar edge: colour flips along the row and the pixel below matches (bars run vertically)
+        edges = np.zeros_like(dark)
+        edges[:-1, 1:] = (dark[:-1, 1:] != dark[:-1, :-1]) & (dark[1:, 1:] == dark[:-1, 1:])
+
+        # Edge density per cell; one cell of horizontal dilation bridges the widest bars/spaces
+        cell = max(8, h // 200, w // 200)
+        gh, gw = -(-h // cell), -(-w // cell)
+        padded = np.zeros((gh * cell, gw * cell), dtype=bool)
+        padded[:h, :w] = edges
+        grid = padded.reshape(gh, cell, gw, cell).mean(axis=(1, 3)) > 0.05
+        grid[:, 1:] |= grid[:, :-1].copy()
+        grid[:, :-1] |= grid[:, 1:].copy()
+
+        boxes = []
+        for gx0, gy0, gx1, gy1 in changed_boxes(grid, 1, 0.5):
+            box = self._tighten(dark, (gx0 * cell, gy0 * cell, min(gx1 * cell, w), min(gy1 * cell, h)))
+            if box is None: continue
+            x0, y0, x1, y1 = box
+            # Run-length check on the middle rows: a real symbol has min_bars bars edge to edge
+            rows = dark[y0 + (y1 - y0) // 4:y1 - (y1 - y0) // 4, x0:x1]
+            if rows.shape[0] < 2: continue
+            transitions = np.count_nonzero(rows[:, 1:] != rows[:, :-1], axis=1)
+            if np.median(transitions) < 2 * self.min_bars: continue
+            # Bars repeat down the symbol; text lines don't
+            if (rows[1:] == rows[:-1]).mean() < 0.9: continue
+            if not self._bar_shaped(dark[y0:y1, x0:x1]): continue
+            if any(self._covered(box, word) for word in word_boxes): continue
+            boxes.append(box)
+        return boxes
+
+    def _bar_shaped(self, region):
+        """
+        Bars are tall for their width and run the full symbol height: at least min_height_modules
+        narrowest-bar widths high, and nearly every column dark in the middle row dark over
+        min_bar_span of the height. Glyph strokes in a line of text are short and ragged.
+        """
+        height = region.shape[0]
+        middle = region[height // 2]
+        flips = np.nonzero(middle[1:] != middle[:-1])[0]
+        runs = np.diff(flips)
+        if runs.size == 0:
+            return False
+        module = max(1, int(np.percentile(runs, 10)))
+        if height < self.min_height_modules * module:
+            return False
+        span = region[:, middle].mean(axis=0)
+        return (span >= self.min_bar_span).mean() >= 0.9
+
+    def _covered(self, box, word):
+        """True when most of the word box lies inside the stripe box."""
+        x0, y0 = max(box[0], word[0]), max(box[1], word[1])
+        x1, y1 = min(box[2], word[2]), min(box[3], word[3])
+        area = (word[2] - word[0]) * (word[3] - word[1])
+        return x1 > x0 and y1 > y0 and area > 0 and (x1 - x0) * (y1 - y0) > 0.5 * area
+
+    def _tighten(self, dark, box):
+        """
+        Snaps a cell-rounded box to the bars: rows/columns spanned by full-height dark columns.
+        Neighbouring text (partial columns) stays outside, so it counts against the quiet zone.
+        Rows are the contiguous run repeating the middle bar row, so HRI digits set close
+        under the bars don't break up the columns.
+        """
+        x0, y0, x1, y1 = box
+        region = dark[y0:y1, x0:x1]
+        rows = np.nonzero(region.mean(axis=1) > 0.2)[0]
+        if rows.size < 2:
+            return None
+        middle = int(rows[rows.size // 2])
+        same = (region == region[middle]).mean(axis=1) >= 0.9
+        top = bottom = middle
+        while top > 0 and same[top - 1]: top -= 1
+        while bottom + 1 < len(same) and same[bottom + 1]: bottom += 1
+        if bottom == top:
+            return None
+        y0, y1 = y0 + top, y0 + bottom + 1
+        cols = np.nonzero(dark[y0:y1, x0:x1].mean(axis=0) > 0.9)[0]
+        if cols.size < 2:
+            return None
+        return (x0 + int(cols[0]), y0, x0 + int(cols[-1]) + 1, y1)
+
+    def _quiet_zones(self, dark, box, vertical_bars):
+        """Blank run (px) before and after the bars, measured along the scan direction."""
+        x0, y0, x1, y1 = box
+        if vertical_bars:
+            band = dark[y0:y1, :]
+            before, after, start, end = band[:, :x0], band[:, x1:], x0, x1
+            axis = 0
+        else:
+            band = dark[:, x0:x1]
+            before, after, start, end = band[:y0, :], band[y1:, :], y0, y1
+            axis = 1
+        hit_before = np.nonzero(before.any(axis=axis))[0]
+        hit_after = np.nonzero(after.any(axis=axis))[0]
+        left = start - (int(hit_before[-1]) + 1) if hit_before.size else start
+        right = int(hit_after[0]) if hit_after.size else (dark.shape[1] if vertical_bars else dark.shape[0]) - end
+        return left, right
+
+    def _check_barcodes(self, dark, dpi, part):
+        findings = []
+        page = part.get('page', 1)
+        scale = (dpi or 72) / 72.0
+        word_boxes = [tuple(v * scale for v in w[:4]) for w in part.get('words') or []]
+        found = self.find_barcodes(dark, word_boxes)
+        if not dpi:
+            if found:
+                findings.append({"check": f"Barcode Quiet Zone ({part.get('file', '')} p{page})", "status": "WARNING",
+                                 "file": part.get('file'), "page": page, "boxes": [box for box, _ in found],
+                                 "observation": f"{len(found)} barcode(s) found, but the image has no resolution "
+                                                f"(DPI) metadata, so quiet zones cannot be measured in mm."})
+            return findings
+
+        required = self.quiet_zone_mm / 25.4 * dpi
+        for i, (box, vertical) in enumerate(found, 1):
+            left, right = self._quiet_zones(dark, box, vertical)
+            left_mm, right_mm = left / dpi * 25.4, right / dpi * 25.4
+            check = f"Barcode Quiet Zone ({part.get('file', '')} p{page} #{i})"
+            finding = {"check": check, "file": part.get('file'), "page": page, "boxes": [box]}
+            if min(left, right) < required:
+                finding.update(status="FAIL", observation=f"Quiet zone {min(left_mm, right_mm):.1f} mm "
+                                                          f"< required {self.quiet_zone_mm} mm "
+                                                          f"(before {left_mm:.1f} mm / after {right_mm:.1f} mm).")
+            else:
+                finding.update(status="PASS", observation=f"Quiet zones clear (before {left_mm:.1f} mm / after {right_mm:.1f} mm).")
+            findings.append(finding)
+        return findings
+
+    # --- Edge clearance ---
+
+    def _check_edges(self, part, dpi):
+        width, height = part['page_size']
+        page = part.get('page', 1)
+        check = f"Edge Clearance ({part.get('file', '')} p{page})"
+        # The word index only walks grid cells along the edge bands
+        index = WordIndex.from_pages([part])
+        flagged = [(*index.bbox(i), index.text[i]) for i in index.near_edge(self.safety_margin_pt)]
+        if not flagged:
+            return [{"check": check, "status": "PASS", "file": part.get('file'), "page": page,
+                     "observation": f"All text at least {self.safety_margin_pt} pt from the page edge."}]
+
+        cut = [w for w in flagged if w[0] < 0 or w[1] < 0 or w[2] > width or w[3] > height]
+        scale = dpi / 72.0
+        sample = ", ".join(f"'{w[4]}'" for w in flagged[:6]) + (" ..." if len(flagged) > 6 else "")
+        return [{
+            "check": check,
+            "status": "FAIL" if cut else "WARNING",
+            "file": part.get('file'),
+            "page": page,
+            "boxes": [tuple(round(v * scale) for v in w[:4]) for w in flagged],
+            "observation": (f"{len(cut)} word(s) cut off by the page edge; " if cut else "")
+                           + f"{len(flagged)} word(s) within {self.safety_margin_pt} pt of the edge: {sample}"
+        }]
@@ -1,20 +1,40 @@
 import streamlit as st
 import os
+import uuid
 import pandas as pd
+import report_view
 from config import Config, load_css
 from file_processor import FileProcessor
+from render_cache import RenderCache
 from checklist_manager import ChecklistManager
-from validator import ArtworkValidator
+from validator import ArtworkValidator, extract_sku
+from history_store import HistoryStore
+from incremental import RevisionTracker, revision_context
 from ai_analyzer import AIAnalyzer
+from pipeline import local_checks
+from tracing import Tracer, span, summarize, to_jsonl
 from datetime import datetime
 
 # --- Init ---
 st.set_page_config(page_title=Config.PAGE_TITLE, page_icon=Config.PAGE_ICON, layout=Config.LAYOUT)
 load_css()
 
+# --- Run History (persists across sessions and restarts) ---
+history = HistoryStore()
+
+@st.fragment
+def show_findings(report):
+    # Runs as a fragment: changing the filter or page reruns only this view, and each page's HTML is memoized
+    counts = report_view.status_counts(report['checks'])
+    status = st.radio("Show", report_view.STATUSES, horizontal=True, key="findings_status",
+                      format_func=lambda s: f"{s} ({counts.get(s, 0)})")
+    pages = report_view.page_count(counts.get(status, 0))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"findings_page_{report['id']}_{status}")
+    st.markdown(report_view.findings_page_html(report['id'], report['checks'], status, page), unsafe_allow_html=True)
+
 # --- Session State ---
-if 'history' not in st.session_state:
-    st.session_state.history = []
 if 'analysis_report' not in st.session_state:
     st.session_state.analysis_report = None
 if 'manual_report_text' not in st.session_state:
@@ -47,12 +67,15 @@ with st.sidebar:
     st.divider()
     
     # --- History Log ---
-    st.subheader("Session Log")
-    if st.session_state.history:
-        for item in reversed(st.session_state.history[-5:]):
-            st.text(f"{item['time']} - {item['result']}")
+    st.subheader("Recent Runs")
+    recent = history.recent_runs(5)
+    if recent:
+        for item in recent:
+            took = f" ({item['seconds']:.1f}s)" if item.get('seconds') else ""
+            when = datetime.fromtimestamp(item['ts']).strftime("%m-%d %H:%M")
+            st.text(f"{when} {item['sku'] or ''} - {item['fail']} Fails / {item['warn']} Warns{took}")
     else:
-        st.caption("No checks this session.")
+        st.caption("No checks recorded yet.")
 
 # --- Main Content ---
 st.title("Artwork Verification Dashboard")
@@ -61,6 +84,7 @@ st.title("Artwork Verification Dashboard")
 cm = ChecklistManager()
 rules = []
 common_errors = []
+gtin_map = {}
 
 # 1. Load Checklist
 if os.path.exists(Config.CHECKLIST_FILE):
@@ -73,11 +97,15 @@ else:
 if os.path.exists(Config.ERROR_TRACKER_FILE):
     common_errors = cm.get_common_errors(Config.ERROR_TRACKER_FILE)
 
+# 3. Load SKU -> GTIN map (optional)
+if os.path.exists(Config.GTIN_MAP_FILE):
+    gtin_map = cm.load_gtin_map(Config.GTIN_MAP_FILE)
+
 if not rules:
     st.stop()
 
 # --- Tabs ---
-tab_ai, tab_manual = st.tabs(["🤖 AI Inspection & Comparison", "📋 Manual Checklist"])
+tab_ai, tab_manual, tab_history = st.tabs(["🤖 AI Inspection & Comparison", "📋 Manual Checklist", "📈 History"])
 
 # ==========================================
 # TAB 1: AI INSPECTION (GOLDEN SAMPLE MODE)
@@ -100,34 +128,72 @@ with tab_ai:
 
         if art_files:
             if st.button("🚀 Run Verification Analysis", type="primary", use_container_width=True):
-                with st.spinner("Analyzing geometry, text, and compliance..."):
-                    processor = FileProcessor()
+                tracer = Tracer()
+                with st.status("Analyzing geometry, text, and compliance...", expanded=True) as live, \
+                        tracer.activate(), span("verify") as run:
+                    # New revision of a document verified before: only pages whose fingerprint
+                    # changed are rendered and checked; the rest pass through as text
+                    tracker = None
+                    if Config.INCREMENTAL_ENABLED:
+                        ref_hashes = [RenderCache.file_hash(f.getvalue()) for f in ref_files or []]
+                        tracker = RevisionTracker(history, revision_context(rules, Config.MODEL_NAME, ref_hashes))
+                    processor = FileProcessor(incremental=bool(tracker), baseline=tracker.baseline(art_files) if tracker else None)
                     
-                    # Process Reference
-                    ref_txt, ref_imgs, ref_prev = processor.process_files(ref_files) if ref_files else ("", [], None)
+                    # References always render in full: a plain processor, so a reference named like
+                    # a tracked artwork file never comes back as an unchanged, data-less page
+                    ref_processor = FileProcessor(dpi=processor.dpi)
+                    ref_pages = list(ref_processor.iter_pages(ref_files)) if ref_files else []
                     
-                    # Process Candidate
-                    art_txt, art_imgs, art_prev = processor.process_files(art_files)
+                    # Pages are rendered lazily and consumed straight into the AI payload
+                    art_stream = processor.stream(art_files)
                     
-                    # AI Analysis
+                    # Local checks (color, layout, golden-sample text and pixel diff) run on full pages
+                    # as they stream past; pages with no change never reach the AI, changed ones go as crops
+                    local_findings = []
+                    ai_ref, ai_art = local_checks(ref_pages, (p for p in art_stream if not p.get('unchanged')), local_findings)
+                    
+                    # AI Analysis (one concurrent request per candidate file); findings show as they stream in
                     ai = AIAnalyzer(api_key, Config.MODEL_NAME)
-                    ai_results = ai.analyze(
-                        ref_parts=ref_imgs,
-                        art_parts=art_imgs,
+                    ai_results = ai.analyze_files(
+                        ref_parts=ai_ref,
+                        art_parts=ai_art,
                         checklist=rules,
                         errors=common_errors,
-                        filename=", ".join([f.name for f in art_files])
+                        on_result=lambda file_name, label, result: live.markdown(report_view.result_line(label, result)),
+                        on_finding=lambda file_name, label, finding: live.markdown(
+                            report_view.finding_html(label, finding), unsafe_allow_html=True)
                     )
                     
-                    validator = ArtworkValidator(rules, common_errors)
-                    report = validator.validate(art_txt, "Batch", ai_results)
-                    st.session_state.analysis_report = report
+                    for name, err in ref_processor.errors + processor.errors:
+                        st.error(f"Error processing {name}: {err}")
                     
-                    # Log to History
-                    st.session_state.history.append({
-                        "time": datetime.now().strftime("%H:%M"),
-                        "result": f"{report['summary']['fail']} Fails / {report['summary']['warn']} Warns"
-                    })
+                    if tracker:
+                        local_findings.extend(tracker.reused_findings(art_stream))
+                        tracker.commit(art_stream, local_findings + ai_results['findings'], ai_results.get('incomplete'))
+                        run.set(pages_reused=sum(len(p) for p in art_stream.unchanged.values()))
+                    
+                    validator = ArtworkValidator(rules, common_errors, gtin_map)
+                    report = validator.validate(art_stream.text, "Batch", ai_results, local_findings, index=art_stream.index)
+                    report['payload'] = ai.last_payload_stats
+                    report['id'] = uuid.uuid4().hex
+                    run.set(pages=art_stream.page_count, checks=len(report['checks']))
+                    st.session_state.analysis_report = report
+                    s = report['summary']
+                    live.update(label=f"Done: {s['fail']} failures, {s['warn']} warnings, {s['pass']} passing",
+                                state="error" if s['fail'] else "complete", expanded=False)
+                
+                # Spans are recorded once they close, so collect after the run span ends
+                report['trace'] = tracer.records()
+                
+                # Log to History (queued; written by a background thread)
+                history.record(
+                    report,
+                    files=list(art_stream.files.items()),
+                    model=Config.MODEL_NAME,
+                    sku=next(filter(None, map(extract_sku, art_stream.files)), None),
+                    seconds=sum(r['ms'] for r in report['trace'] if r['parent'] is None) / 1000,
+                    timings=summarize(report['trace'])
+                )
 
             # --- RESULTS DISPLAY ---
             if st.session_state.analysis_report:
@@ -140,24 +206,25 @@ with tab_ai:
                 m2.metric("Critical Failures", s['fail'], delta_color="inverse")
                 m3.metric("Warnings", s['warn'], delta_color="off")
                 
+                payload = report.get('payload')
+                if payload:
+                    st.caption(f"AI payload: {payload['images']} images, {payload['bytes_out'] / 1024:.0f} KB "
+                               f"(from {payload['bytes_in'] / 1024:.0f} KB), ~{payload['est_image_tokens']:,} image tokens")
+                
+                trace = report.get('trace')
+                if trace:
+                    total = sum(r['ms'] for r in trace if r['parent'] is None)
+                    with st.expander(f"⏱️ Timing ({total / 1000:.2f}s)"):
+                        st.caption("Per stage: self_ms excludes time spent in nested stages.")
+                        st.dataframe(pd.DataFrame(summarize(trace)), use_container_width=True, hide_index=True)
+                        st.dataframe(pd.DataFrame(trace), use_container_width=True, hide_index=True)
+                        st.download_button("Download trace (JSONL)", to_jsonl(trace), file_name="trace.jsonl",
+                                           mime="application/x-ndjson")
+                
                 st.divider()
                 
                 # Findings
-                for check in report['checks']:
-                    status = check['status'].upper()
-                    css = "pass-box" if status == "PASS" else "fail-box" if status == "FAIL" else "warn-box"
-                    icon = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
-                    
-                    st.markdown(f"""
-                    <div class="{css}">
-                        <div style="display:flex; justify-content:space-between;">
-                            <strong>{icon} {check['name']}</strong>
-                            <span style="font-weight:bold; color:#555;">{status}</span>
-                        </div>
-                        <div style="margin-top:5px; font-size:0.95em;">{check['observation']}</div>
-                    </div>
-                    <div style="margin-bottom: 12px;"></div>
-                    """, unsafe_allow_html=True)
+                show_findings(report)
 
 # ==========================================
 # TAB 2: MANUAL CHECKLIST
@@ -229,3 +296,28 @@ with tab_manual:
             data=st.session_state.manual_report_text, 
             file_name=f"QC_Cert_{brand}_{datetime.now().strftime('%Y%m%d')}.txt"
         )
+
+# ==========================================
+# TAB 3: RUN HISTORY
+# ==========================================
+with tab_history:
+    h1, h2, h3 = st.columns([0.4, 0.3, 0.3])
+    sku_filter = h1.text_input("SKU", placeholder="e.g. DMD1001BLK").strip()
+    status_filter = h2.selectbox("Status", ["FAIL", "WARNING", "PASS", "All"])
+    days = h3.number_input("Last N days", min_value=1, value=Config.HISTORY_DEFAULT_DAYS)
+    
+    counts = history.status_counts(sku=sku_filter or None, days=days)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Passing Checks", counts.get("PASS", 0))
+    c2.metric("Failures", counts.get("FAIL", 0))
+    c3.metric("Warnings", counts.get("WARNING", 0))
+    
+    rows = history.checks(sku=sku_filter or None, status=None if status_filter == "All" else status_filter, days=days, limit=1000)
+    if rows:
+        df = pd.DataFrame(rows)
+        df['ts'] = pd.to_datetime(df['ts'], unit='s').dt.strftime("%Y-%m-%d %H:%M")
+        st.dataframe(df.rename(columns={'ts': 'time'}), use_container_width=True, hide_index=True)
+        if len(rows) == 1000:
+            st.caption("Showing the 1,000 most recent matches.")
+    else:
+        st.caption("No matching checks.")
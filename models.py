@@ -0,0 +1,172 @@
+class _Record:
+    """
+    Slotted record that still reads and writes like the dict it replaces:
+    record['key'], record.get('key'), 'key' in record, dict(record, ...) and json via to_dict().
+    Fields left at None count as absent; keys outside _fields go to a lazily created extra dict.
+    """
+    __slots__ = ("extra",)
+    _fields = ()
+
+    def __init__(self, **values):
+        for name in self._fields:
+            setattr(self, name, values.pop(name, None))
+        self.extra = values or None
+
+    @classmethod
+    def from_dict(cls, d):
+        return d if isinstance(d, cls) else cls(**d)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def copy(self):
+        return type(self)(**self.to_dict())
+
+    def keys(self):
+        keys = [name for name in self._fields if getattr(self, name) is not None]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        if key in self._fields:
+            setattr(self, key, value)
+        elif self.extra is None:
+            self.extra = {key: value}
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        if key in self._fields:
+            return getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__ if name != "extra"), self.extra
+
+    def __setstate__(self, state):
+        values, self.extra = state
+        for name, value in zip((n for n in self.__slots__ if n != "extra"), values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Rule(_Record):
+    """One checklist requirement."""
+    __slots__ = _fields = ("id", "requirement", "category", "tip")
+
+    @property
+    def key(self):
+        # Identity for de-duplication: the same requirement (case and spacing aside), category and tip.
+        # Not the id: ids are per sheet row, so a repeated row would never count as a duplicate
+        return (" ".join(str(self.requirement or "").split()).casefold(), self.category, self.tip)
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class Finding(_Record):
+    """One check in a report (validator output); extra keys (boxes, reused_from, ...) ride along."""
+    __slots__ = _fields = ("name", "status", "observation", "file", "page", "pages", "boxes")
+
+    @property
+    def key(self):
+        return (self.name, self.status, self.observation, self.file, self.page)
+
+    def to_dict(self):
+        # name/status/observation are always present (even if None): CSV and JSON readers index them
+        return dict({"name": self.name, "status": self.status, "observation": self.observation}, **super().to_dict())
+
+
+class PageImage(_Record):
+    """
+    One rendered page (or image) part. data is a read-only memoryview over the PNG/JPEG bytes
+    (zero-copy over render-cache mmaps), or None for pages passed through without a render.
+    """
+    __slots__ = _fields = ("file", "file_hash", "page", "text", "mime_type", "data", "dpi", "page_size", "words")
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        if self.data is not None and not isinstance(self.data, memoryview):
+            self.data = memoryview(self.data)
+
+    def __getstate__(self):
+        values, extra = super().__getstate__()
+        return tuple(bytes(v) if isinstance(v, memoryview) else v for v in values), extra
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if self.data is not None:
+            self.data = memoryview(self.data)
+
+
+class Report(_Record):
+    """Validator output: pass/fail/warn counters and the Finding list; payload, trace etc. go in extra."""
+    __slots__ = ("passed", "failed", "warned", "checks")
+    _fields = ("checks",)
+
+    def __init__(self, checks=None, **extra):
+        self.passed = self.failed = self.warned = 0
+        self.checks = []
+        self.extra = extra or None
+        for check in checks or []:
+            self.add(Finding.from_dict(check))
+
+    @property
+    def summary(self):
+        return {"pass": self.passed, "fail": self.failed, "warn": self.warned}
+
+    def add(self, finding):
+        self.checks.append(finding)
+        status = str(finding.status).upper()
+        if status == "PASS": self.passed += 1
+        elif status == "FAIL": self.failed += 1
+        else: self.warned += 1
+
+    def keys(self):
+        return ["summary", "checks"] + list(self.extra or ())
+
+    def __getitem__(self, key):
+        if key == "summary":
+            return self.summary
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        return key == "summary" or super().__contains__(key)
+
+    def to_dict(self):
+        return dict(self.items(), checks=[c.to_dict() for c in self.checks])
+
+    def __getstate__(self):
+        return (self.passed, self.failed, self.warned, self.checks), self.extra
+
+    def __setstate__(self, state):
+        (self.passed, self.failed, self.warned, self.checks), self.extra = state
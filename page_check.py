@@ -0,0 +1,13 @@
+class PageCheck:
+    """
+    Mixin for local checks that look at one page at a time. Subclasses implement
+    check_page(part) -> [finding]; check_pages turns that into a stream stage.
+    """
+    def check_page(self, part):
+        raise NotImplementedError
+
+    def check_pages(self, parts, findings):
+        """Pass-through stream stage: checks each page, appends findings, yields the page unchanged."""
+        for part in parts:
+            findings.extend(self.check_page(part))
+            yield part
@@ -0,0 +1,30 @@
+from color_checker import ColorChecker
+from config import Config
+from layout_checker import LayoutChecker
+from pixel_diff import PixelDiff
+from text_diff import TextDiff
+from tracing import trace_iter
+
+
+def local_checks(ref_pages, art_pages, findings):
+    """
+    The local check chain shared by the dashboard, batch_verify and the benchmark.
+    Color and layout checks run on full pages as they stream past, then the golden-sample
+    diff: text first, then pixels. Findings are appended to `findings` as pages are consumed.
+
+    Returns (ai_ref, ai_art): what the AI still needs to see. With the pixel diff on, pages with
+    neither a textual nor a visual change are dropped and changed ones go as crops (each carrying
+    its reference crop), so ai_ref is empty. ai_art is lazy: nothing runs until it is iterated.
+    """
+    ai_art = art_pages
+    if Config.COLOR_CHECK_ENABLED:
+        ai_art = trace_iter("color_check", ColorChecker().check_pages(ai_art, findings))
+    if Config.LAYOUT_CHECK_ENABLED:
+        ai_art = trace_iter("layout_check", LayoutChecker().check_pages(ai_art, findings))
+
+    ai_ref = ref_pages
+    if ref_pages and Config.TEXT_DIFF_ENABLED:
+        ai_art = trace_iter("text_diff", TextDiff().check_pages(ref_pages, ai_art, findings))
+    if ref_pages and Config.PIXEL_DIFF_ENABLED:
+        ai_ref, ai_art = [], trace_iter("pixel_diff", PixelDiff().filter_pages(ref_pages, ai_art, findings))
+    return ai_ref, ai_art
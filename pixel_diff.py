@@ -0,0 +1,218 @@
+import io
+import numpy as np
+from PIL import Image
+from config import Config
+from references import ReferenceSet
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+_DCT32 = _dct_matrix(32)
+
+def phash(image):
+    """64-bit perceptual hash (DCT of a 32x32 grayscale thumbnail) as a bool array."""
+    small = np.asarray(image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float32)
+    low = (_DCT32 @ small @ _DCT32.T)[:8, :8].ravel()[1:]  # Drop DC: overall brightness
+    return low > np.median(low)
+
+def label_regions(grid):
+    """
+    8-connected component labels of a boolean grid (-1 where False), all in numpy.
+    Vectorized union-find: every pair of neighbouring cells hooks the larger root under the
+    smaller, then pointers are jumped to their roots, until all pairs agree. A region ends up
+    labelled with the flat index of its first cell; a few rounds even for page-sized regions.
+    """
+    gh, gw = grid.shape
+    index = np.arange(gh * gw).reshape(gh, gw)
+    pairs = [(grid[:, :-1] & grid[:, 1:], index[:, :-1], index[:, 1:]),
+             (grid[:-1, :] & grid[1:, :], index[:-1, :], index[1:, :]),
+             (grid[:-1, :-1] & grid[1:, 1:], index[:-1, :-1], index[1:, 1:]),
+             (grid[:-1, 1:] & grid[1:, :-1], index[:-1, 1:], index[1:, :-1])]
+    u = np.concatenate([a[both] for both, a, _ in pairs])
+    v = np.concatenate([b[both] for both, _, b in pairs])
+
+    parent = index.ravel().copy()
+    while True:
+        pu, pv = parent[u], parent[v]
+        if np.array_equal(pu, pv): break
+        np.minimum.at(parent, pu, pv)
+        np.minimum.at(parent, pv, pu)
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent): break
+            parent = jumped
+    return np.where(grid, parent.reshape(gh, gw), -1)
+
+
+def changed_boxes(mask, cell, ratio, max_boxes=None):
+    """
+    Groups a boolean change mask into boxes (x0, y0, x1, y1).
+    The mask is pooled into cell x cell blocks; blocks over `ratio` changed pixels are joined
+    with their neighbours into connected regions (vectorized labelling, see label_regions).
+    """
+    h, w = mask.shape
+    gh, gw = -(-h // cell), -(-w // cell)
+    padded = np.zeros((gh * cell, gw * cell), dtype=bool)
+    padded[:h, :w] = mask
+    grid = padded.reshape(gh, cell, gw, cell).mean(axis=(1, 3)) > ratio
+    if not grid.any():
+        return []
+
+    labels = label_regions(grid)
+    gy, gx = np.nonzero(grid)
+    _, region = np.unique(labels[gy, gx], return_inverse=True)
+    n = region.max() + 1
+    y0 = np.full(n, gh); x0 = np.full(n, gw); y1 = np.zeros(n, int); x1 = np.zeros(n, int)
+    np.minimum.at(y0, region, gy); np.minimum.at(x0, region, gx)
+    np.maximum.at(y1, region, gy); np.maximum.at(x1, region, gx)
+    boxes = [(int(a * cell), int(b * cell), int(min((c + 1) * cell, w)), int(min((d + 1) * cell, h)))
+             for a, b, c, d in zip(x0, y0, x1, y1)]
+
+    # Largest regions first
+    boxes.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+    return boxes[:max_boxes] if max_boxes else boxes
+
+
+class PixelDiff:
+    """
+    Local golden-sample comparison of rendered pages.
+    Pages are aligned (scale + small translation), diffed per pixel and pooled into regions.
+    Matching pages produce a PASS finding and never reach the AI (unless an earlier stage tagged
+    them `text_changed`); changed pages are sent as crops.
+    """
+    def __init__(self, tolerance=None, cell=None, cell_ratio=None, max_shift=None, phash_tolerance=None,
+                 max_regions=None, crop_pad=None):
+        self.tolerance = tolerance or Config.PIXEL_DIFF_TOLERANCE
+        self.cell = cell or Config.PIXEL_DIFF_CELL
+        self.cell_ratio = cell_ratio or Config.PIXEL_DIFF_CELL_RATIO
+        self.max_shift = max_shift if max_shift is not None else Config.PIXEL_DIFF_MAX_SHIFT
+        self.phash_tolerance = phash_tolerance if phash_tolerance is not None else Config.PIXEL_DIFF_PHASH_TOLERANCE
+        self.max_regions = max_regions or Config.PIXEL_DIFF_MAX_REGIONS
+        self.crop_pad = crop_pad if crop_pad is not None else Config.PIXEL_DIFF_CROP_PAD
+
+    def compare(self, ref_part, art_part):
+        """
+        Returns {"match", "phash_distance", "changed_ratio", "boxes", "ref_boxes", "offset"}.
+        Boxes are in candidate pixel coordinates; ref_boxes are the same regions on the reference.
+        """
+        ref_img = Image.open(io.BytesIO(ref_part['data'])).convert("L")
+        art_img = Image.open(io.BytesIO(art_part['data'])).convert("L")
+        distance = int(np.count_nonzero(phash(ref_img) != phash(art_img)))
+
+        # 1. Scale: compare on the reference grid
+        scale = (art_img.width / ref_img.width, art_img.height / ref_img.height)
+        if art_img.size != ref_img.size:
+            art_img = art_img.resize(ref_img.size, Image.BILINEAR)
+        ref = np.asarray(ref_img, dtype=np.int16)
+        art = np.asarray(art_img, dtype=np.int16)
+
+        # 2. Translation: best shift of the row/column intensity profiles
+        dx = self._best_shift(ref.mean(axis=0), art.mean(axis=0))
+        dy = self._best_shift(ref.mean(axis=1), art.mean(axis=1))
+        h, w = ref.shape
+        ref_win = ref[max(-dy, 0):h - max(dy, 0), max(-dx, 0):w - max(dx, 0)]
+        art_win = art[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)]
+
+        # 3. Per-pixel difference, pooled into changed regions
+        mask = np.abs(ref_win - art_win) > self.tolerance
+        boxes = changed_boxes(mask, self.cell, self.cell_ratio)
+        if not boxes and distance > self.phash_tolerance:
+            boxes = [(0, 0, mask.shape[1], mask.shape[0])]  # Global change (tone/colour shift)
+
+        def to_art(b):
+            return (round((b[0] + max(dx, 0)) * scale[0]), round((b[1] + max(dy, 0)) * scale[1]),
+                    round((b[2] + max(dx, 0)) * scale[0]), round((b[3] + max(dy, 0)) * scale[1]))
+
+        def to_ref(b):
+            return (b[0] + max(-dx, 0), b[1] + max(-dy, 0), b[2] + max(-dx, 0), b[3] + max(-dy, 0))
+
+        return {
+            "match": not boxes,
+            "phash_distance": distance,
+            "changed_ratio": float(mask.mean()) if mask.size else 0.0,
+            "boxes": [to_art(b) for b in boxes],
+            "ref_boxes": [to_ref(b) for b in boxes],
+            "offset": (dx, dy),
+        }
+
+    def filter_pages(self, ref_parts, art_parts, findings):
+        """
+        Yields only what the AI still needs to see: crops of changed regions (each carrying its
+        reference crop under "reference"), or the full page when it has no matching reference page
+        or changed too broadly to crop. Structured findings for every page are appended to `findings`.
+        Pages are paired with references by (reference file, page); see ReferenceSet.
+        """
+        refs = ReferenceSet(ref_parts)
+
+        for part in art_parts:
+            page = part.get('page', 1)
+            name = f"Golden Sample Match ({part.get('file', '')} p{page})"
+            ref, missing = refs.match(part)
+            if ref is None:
+                findings.append({"check": name, "status": "WARNING", "file": part.get('file'), "page": page,
+                                 "observation": f"No matching reference ({missing}); sent for AI review."})
+                yield part
+                continue
+
+            result = self.compare(ref, part)
+            if result["match"] and part.get('text_changed'):
+                # Too small to show in the raster, but the text diff caught it
+                findings.append({"check": name, "status": "WARNING", "file": part.get('file'), "page": page,
+                                 "observation": "Visually matches the golden sample but the text changed; sent for AI review."})
+                yield part
+                continue
+            if result["match"]:
+                findings.append({"check": name, "status": "PASS", "file": part.get('file'), "page": page,
+                                 "observation": f"Matches golden sample locally (pHash distance {result['phash_distance']})."})
+                continue
+
+            boxes = result["boxes"]
+            findings.append({"check": name, "status": "WARNING", "file": part.get('file'), "page": page,
+                             "boxes": boxes,
+                             "observation": f"{len(boxes)} changed region(s), {result['changed_ratio']:.1%} of pixels "
+                                            f"(pHash distance {result['phash_distance']}); sent for AI review."})
+
+            if len(boxes) > self.max_regions or result["changed_ratio"] > 0.5:
+                yield part  # Too much changed for crops to help
+            else:
+                yield from self._crops(ref, part, result)
+
+    def _crops(self, ref_part, art_part, result):
+        art_img = Image.open(io.BytesIO(art_part['data']))
+        ref_img = Image.open(io.BytesIO(ref_part['data']))
+        for i, (box, ref_box) in enumerate(zip(result["boxes"], result["ref_boxes"]), 1):
+            crop = art_part.copy()  # Stays a PageImage; dict(art_part, ...) would not
+            crop['data'] = self._crop_png(art_img, box)
+            crop['mime_type'] = "image/png"
+            crop['region'] = i
+            crop['box'] = box
+            crop['reference'] = {"mime_type": "image/png", "data": self._crop_png(ref_img, ref_box)}
+            yield crop
+
+    def _crop_png(self, image, box):
+        p = self.crop_pad
+        box = (max(box[0] - p, 0), max(box[1] - p, 0), min(box[2] + p, image.width), min(box[3] + p, image.height))
+        buf = io.BytesIO()
+        image.crop(box).save(buf, format="PNG")
+        return buf.getvalue()
+
+    def _best_shift(self, a, b):
+        # s such that b[i + s] best matches a[i], searched over +/- max_shift
+        n = min(len(a), len(b))
+        a, b = a[:n], b[:n]
+
+        def err(s):
+            return np.abs(a[max(-s, 0):n - max(s, 0)] - b[max(s, 0):n + min(s, 0)]).mean()
+
+        # Zero wins ties, so blank or uniform pages never get a spurious offset
+        best, best_err = 0, err(0)
+        for s in range(-self.max_shift, self.max_shift + 1):
+            if s == 0 or abs(s) >= n: continue
+            e = err(s)
+            if e < best_err - 1e-9:
+                best, best_err = s, e
+        return best
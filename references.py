@@ -0,0 +1,45 @@
+from history_store import document_key
+from validator import extract_sku
+
+
+class ReferenceSet:
+    """
+    Golden-sample pages, paired with candidate pages by (reference file, page).
+    A single reference file applies to every candidate unless both names carry different SKUs;
+    with several, a candidate takes the reference of the same document (version suffix ignored),
+    else the only reference with its SKU. Candidates that match none get no reference.
+    """
+    def __init__(self, ref_parts):
+        self.pages = {}  # reference file -> {page: part}
+        for part in ref_parts:
+            self.pages.setdefault(part.get('file'), {}).setdefault(part.get('page', 1), part)
+        self._files = {}
+
+    def file_for(self, name):
+        if name not in self._files:
+            self._files[name] = self._match_file(name)
+        return self._files[name]
+
+    def match(self, part):
+        """(reference part or None, reason): reason is None, "no reference file" or "no reference page"."""
+        ref_file = self.file_for(part.get('file'))
+        if ref_file is None:
+            return None, "no reference file"
+        ref = self.pages[ref_file].get(part.get('page', 1))
+        return (ref, None) if ref is not None else (None, "no reference page")
+
+    def _match_file(self, name):
+        if not self.pages or name is None:
+            return None
+        sku = extract_sku(name)
+        if len(self.pages) == 1:
+            ref_file = next(iter(self.pages))
+            ref_sku = extract_sku(ref_file) if ref_file else None
+            return None if sku and ref_sku and sku != ref_sku else ref_file
+
+        key = document_key(name)
+        for ref_file in self.pages:
+            if ref_file and document_key(ref_file) == key:
+                return ref_file
+        same_sku = [f for f in self.pages if sku and f and extract_sku(f) == sku]
+        return same_sku[0] if len(same_sku) == 1 else None
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import uuid
+from config import Config
+
+class RenderCache:
+    """
+    Content-addressed disk cache of rendered pages and their text.
+    One directory per (file bytes, render settings): meta.json plus one image file per page.
+    Entries are LRU-evicted by last access once the cache grows past max_bytes.
+    """
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or Config.RENDER_CACHE_DIR
+        self.max_bytes = max_bytes or Config.RENDER_CACHE_MAX_BYTES
+
+    @staticmethod
+    def file_hash(file_bytes):
+        return hashlib.sha256(file_bytes).hexdigest()
+
+    def key(self, file_hash, **settings):
+        raw = file_hash + json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        """Returns cached [(page_num, text, data, layout)] with page data memory-mapped, or None on a miss."""
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            pages = [(p["page_num"], p["text"], self._map(os.path.join(entry, p["image"])), p["layout"])
+                     for p in meta["pages"]]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Directory mtime doubles as the LRU clock
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return pages
+
+    def write_through(self, key, pages):
+        """
+        Passes (page_num, text, data, layout) tuples through unchanged while writing them to a temp entry.
+        The entry is only published once every page has been seen.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp)
+        meta = {"pages": []}
+        try:
+            for page_num, text, data, layout in pages:
+                name = f"p{page_num:05d}.png"
+                with open(os.path.join(tmp, name), "wb") as f:
+                    f.write(data)
+                meta["pages"].append({"page_num": page_num, "text": text, "image": name, "layout": layout})
+                yield page_num, text, data, layout
+
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            try:
+                os.rename(tmp, os.path.join(self.cache_dir, key))
+            except OSError:
+                pass  # Another session published the same entry first
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self.evict()
+
+    def evict(self):
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if not n.startswith(".")]
+        except OSError:
+            return
+
+        entries = []
+        total = 0
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                size = sum(e.stat().st_size for e in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                continue
+            total += size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _map(self, path):
+        with open(path, "rb") as f:
+            try:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files can't be mapped
+                return f.read()
@@ -0,0 +1,65 @@
+import html
+from config import Config
+from cache import LRUCache
+
+# Rendered pages of findings, keyed by (report id, status filter, page); reruns reuse them
+_HTML_CACHE = LRUCache(max_entries=Config.REPORT_HTML_CACHE_SIZE)
+
+STATUSES = ["All", "FAIL", "WARNING", "PASS"]
+
+def status_of(check):
+    status = str(check.get('status', '')).upper()
+    return "WARNING" if status == "WARN" else status
+
+def status_counts(checks):
+    counts = {s: 0 for s in STATUSES}
+    counts["All"] = len(checks)
+    for check in checks:
+        status = status_of(check)
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+def filter_checks(checks, status):
+    if status == "All":
+        return checks
+    return [c for c in checks if status_of(c) == status]
+
+def page_count(n_items, page_size=None):
+    page_size = page_size or Config.RESULTS_PAGE_SIZE
+    return max(1, -(-n_items // page_size))
+
+def check_html(check):
+    status = status_of(check)
+    css = "pass-box" if status == "PASS" else "fail-box" if status == "FAIL" else "warn-box"
+    icon = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
+    reused = ""
+    if check.get('reused_from'):
+        reused = (f'<div style="margin-top:3px; font-size:0.8em; color:#777;">'
+                  f'♻️ Unchanged since {html.escape(str(check["reused_from"]))}</div>')
+    return (f'<div class="{css}">'
+            f'<div style="display:flex; justify-content:space-between;">'
+            f'<strong>{icon} {html.escape(str(check.get("name")))}</strong>'
+            f'<span style="font-weight:bold; color:#555;">{status}</span></div>'
+            f'<div style="margin-top:5px; font-size:0.95em;">{html.escape(str(check.get("observation")))}</div>'
+            f'{reused}</div><div style="margin-bottom: 12px;"></div>')
+
+def finding_html(label, finding):
+    """A raw AI finding ({check, status, observation}) as it arrives, before the report is built."""
+    return check_html(dict(finding, name=f"[{label}] {finding.get('check')}"))
+
+def findings_page_html(report_id, checks, status="All", page=1, page_size=None):
+    """One HTML block for a page of (filtered) checks, built once per report/filter/page."""
+    page_size = page_size or Config.RESULTS_PAGE_SIZE
+
+    def build():
+        rows = filter_checks(checks, status)
+        start = (page - 1) * page_size
+        return "".join(check_html(c) for c in rows[start:start + page_size])
+
+    return _HTML_CACHE.get_or_build((report_id, status, page, page_size), build)
+
+def result_line(label, result):
+    """Markdown line for one completed AI request, shown while the rest are still running."""
+    counts = status_counts(result.get('findings', []))
+    icon = "❌" if counts["FAIL"] else "⚠️" if counts["WARNING"] else "✅"
+    return f"{icon} **{label}**: {counts['FAIL']} fail, {counts['WARNING']} warning, {counts['PASS']} pass"
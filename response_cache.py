@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from config import Config
+
+class ResponseCache:
+    """
+    Persistent cache of parsed AI responses, keyed on a digest of the full request payload
+    (model, messages incl. every image, sampling params). Entries expire after ttl seconds and
+    the least recently used ones are dropped past max_entries.
+    """
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or Config.AI_CACHE_PATH
+        self.ttl = ttl if ttl is not None else Config.AI_CACHE_TTL
+        self.max_entries = max_entries or Config.AI_CACHE_MAX_ENTRIES
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    body TEXT NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)")
+
+    @staticmethod
+    def request_key(request):
+        """
+        Digest of a chat.completions request.
+        Message content is hashed piece by piece so multi-MB image payloads are never re-serialized whole.
+        """
+        h = hashlib.sha256()
+        for name in sorted(request):
+            h.update(name.encode('utf-8'))
+            if name != "messages":
+                h.update(json.dumps(request[name], sort_keys=True).encode('utf-8'))
+                continue
+            for message in request[name]:
+                h.update(message["role"].encode('utf-8'))
+                content = message["content"]
+                items = content if isinstance(content, list) else [content]
+                for item in items:
+                    h.update(json.dumps(item, sort_keys=True).encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT created, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and now - row[0] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[1])
+
+    def put(self, key, value):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, created, accessed, body) VALUES (?, ?, ?, ?)",
+                         (key, now, now, json.dumps(value)))
+            if self.ttl:
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entries,))
+
+    def _connect(self):
+        # Short-lived connections: Streamlit runs each session on its own thread
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
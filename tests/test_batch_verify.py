@@ -0,0 +1,54 @@
+import json
+import os
+
+import fitz
+
+import batch_verify
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text, fontsize=12)
+    doc.save(str(path))
+    doc.close()
+
+
+def run(tmp_path, *extra):
+    proofs = tmp_path / "proofs"
+    proofs.mkdir(exist_ok=True)
+    make_pdf(proofs / "LVA1001BLK.pdf", "Vive Health LVA1001BLK")
+    report = tmp_path / "report.json"
+    argv = [str(proofs), "--checklist", os.path.join(REPO, "Artwork Checklist.xlsx"),
+            "--tracker", str(tmp_path / "no-tracker.xlsx"), "--gtin-map", str(tmp_path / "no-map.csv"),
+            "--no-ai", "--no-history", "--workers", "1", "--json", str(report), *extra]
+    return batch_verify.main(argv), report
+
+
+def test_missing_reference_fails_before_any_proof_is_verified(tmp_path):
+    code, report = run(tmp_path, "--reference", str(tmp_path / "missing.pdf"))
+    assert code == 2
+    assert not report.exists()
+
+
+def test_corrupt_reference_fails(tmp_path):
+    bad = tmp_path / "golden.pdf"
+    bad.write_bytes(b"not a pdf")
+    code, report = run(tmp_path, "--reference", str(bad))
+    assert code == 2
+    assert not report.exists()
+
+
+def test_reference_is_rendered_once_and_shared(tmp_path):
+    golden = tmp_path / "golden.pdf"
+    make_pdf(golden, "Vive Health LVA1001BLK")
+    parts, errors = batch_verify.render_references([str(golden)], 72)
+    assert not errors
+    assert [p["page"] for p in parts] == [1]
+    code, report = run(tmp_path, "--reference", str(golden))
+    assert code in (0, 1)
+    results = json.loads(report.read_text())["results"]
+    assert [r.get("error") for r in results] == [None]
+    checks = {c["name"] for c in results[0]["checks"]}
+    assert "Golden Sample Match (LVA1001BLK.pdf p1)" in checks
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from checklist_manager import ChecklistManager
+from models import Rule
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_duplicate_checklist_rows_are_dropped(tmp_path):
+    path = tmp_path / "checklist.csv"
+    path.write_text("\n".join([
+        "Product Name Consistency",
+        "- SKU ID",
+        "Outlined Texts",
+        "product name  consistency",
+        "• SKU ID",
+        "Made in China statement",
+        "Outlined Texts",
+    ]), encoding="utf-8")
+    rules = ChecklistManager().load_checklist(str(path), "Vive Health")
+    assert [r.requirement for r in rules] == ["Product Name Consistency", "SKU ID", "Outlined Texts",
+                                              "Made in China statement"]
+    assert [r.id for r in rules] == ["r_0", "r_1", "r_2", "r_5"]  # First occurrence kept, in sheet order
+
+
+def test_rule_identity_ignores_row_id_case_and_spacing():
+    a = Rule(id="r_0", requirement="SKU  ID", category="General")
+    assert a == Rule(id="r_7", requirement="sku id", category="General")
+    assert hash(a) == hash(Rule(id="r_7", requirement="sku id", category="General"))
+    assert a != Rule(id="r_0", requirement="SKU ID", category="Compliance")
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(ROOT, "Artwork Checklist.xlsx")), reason="no shipped checklist")
+def test_shipped_checklist_has_no_repeated_requirements():
+    rules = ChecklistManager().load_checklist(os.path.join(ROOT, "Artwork Checklist.xlsx"), "Vive Health")
+    keys = [" ".join(r.requirement.split()).casefold() for r in rules]
+    assert rules and len(keys) == len(set(keys))
@@ -0,0 +1,30 @@
+import fitz
+
+import file_processor
+from config import Config
+from file_processor import FileProcessor, LocalFile
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {i + 1}", fontsize=12)
+    doc.save(str(path))
+    doc.close()
+    return LocalFile(str(path))
+
+
+def test_workers_sets_the_render_pool_size(tmp_path):
+    proof = make_pdf(tmp_path / "box.pdf", Config.PARALLEL_MIN_PAGES + 2)
+    pages = list(FileProcessor(dpi=36, workers=2, use_cache=False).iter_pages([proof]))
+    assert [p["page"] for p in pages] == list(range(1, Config.PARALLEL_MIN_PAGES + 3))
+    assert file_processor._pools[2]._max_workers == 2
+
+
+def test_single_worker_renders_in_process(tmp_path, monkeypatch):
+    def no_pool(workers):
+        raise AssertionError("a single worker should not start a pool")
+    monkeypatch.setattr(file_processor, "_shared_pool", no_pool)
+    proof = make_pdf(tmp_path / "box.pdf", Config.PARALLEL_MIN_PAGES + 2)
+    pages = list(FileProcessor(dpi=36, workers=1, use_cache=False).iter_pages([proof]))
+    assert len(pages) == Config.PARALLEL_MIN_PAGES + 2
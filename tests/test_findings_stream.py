@@ -0,0 +1,70 @@
+import json
+import random
+
+import pytest
+
+from findings_stream import FindingsParser
+
+FINDINGS = [
+    {"check": "Brand Color", "status": "PASS", "observation": "Teal {#2CCCD3} matches"},
+    {"check": "Warning \"Choking\" Hazard", "status": "FAIL", "observation": "Missing ] bracket\\ and }"},
+    {"check": "Nested", "status": "WARNING", "observation": "ok", "boxes": [[1, 2, 3, 4]], "meta": {"page": 2}},
+]
+BODY = json.dumps({"summary": "3 checks {findings: []}", "findings": FINDINGS, "notes": [{"check": "not a finding"}]})
+
+
+def feed_in_chunks(body, sizes):
+    parser, seen = FindingsParser(), []
+    pos = 0
+    for size in sizes:
+        seen.append(parser.feed(body[pos:pos + size]))
+        pos += size
+    seen.append(parser.feed(body[pos:]))
+    return parser, seen
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_fixed_chunk_sizes(size):
+    parser, seen = feed_in_chunks(BODY, [size] * (len(BODY) // size))
+    assert [f for chunk in seen for f in chunk] == FINDINGS
+    assert parser.result() == json.loads(BODY)
+
+
+def test_random_chunk_boundaries():
+    rng = random.Random(3)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(BODY)), rng.randint(1, 30)))
+        sizes = [b - a for a, b in zip([0] + cuts, cuts)]
+        _, seen = feed_in_chunks(BODY, sizes)
+        assert [f for chunk in seen for f in chunk] == FINDINGS
+
+
+def test_finding_is_handed_on_as_soon_as_it_closes():
+    parser = FindingsParser()
+    first = json.dumps(FINDINGS[0])
+    assert parser.feed('{"findings": [' + first[:-1]) == []
+    assert parser.feed("}") == [FINDINGS[0]]
+    assert parser.feed(", ") == []
+
+
+def test_findings_key_inside_a_string_is_not_the_array():
+    parser = FindingsParser()
+    found = parser.feed('{"note": "findings", "other": [{"check": "x"}], "findings": [{"check": "y"}]}')
+    assert found == [{"check": "y"}]
+
+
+def test_broken_stream_keeps_what_arrived():
+    parser = FindingsParser()
+    parser.feed(BODY[:BODY.index(FINDINGS[2]["check"])])
+    result = parser.result(error="connection reset")
+    assert result["partial"] is True
+    assert result["findings"][:2] == FINDINGS[:2]
+    assert result["findings"][-1]["check"] == "AI Processing" and result["findings"][-1]["status"] == "WARNING"
+    assert "Kept 2 findings" in result["findings"][-1]["observation"]
+
+
+def test_invalid_json_is_partial():
+    parser = FindingsParser()
+    parser.feed('{"findings": [{"check": "a"}], oops')
+    result = parser.result()
+    assert result["partial"] and result["findings"][0] == {"check": "a"}
@@ -0,0 +1,129 @@
+import pytest
+
+from identifiers import IdentifierScanner, gtin14, gtin_check_digit, gtin_valid
+
+
+@pytest.mark.parametrize("payload, check", [
+    ("03600029145", "2"),      # UPC-A 036000291452
+    ("400638133393", "1"),     # EAN-13 4006381333931
+    ("9638507", "4"),          # EAN-8 96385074
+    ("1001234500001", "7"),    # GTIN-14 10012345000017
+    ("0001234560001", "2"),
+])
+def test_check_digit(payload, check):
+    assert gtin_check_digit(payload) == check
+    assert gtin_valid(payload + check)
+
+
+@pytest.mark.parametrize("gtin", ["036000291453", "4006381333930", "96385075", "1234567", "03600029145X"])
+def test_invalid_gtins(gtin):
+    assert not gtin_valid(gtin)
+
+
+def test_gtin14_pads_every_spelling_alike():
+    assert gtin14("036000291452") == gtin14("0036000291452") == gtin14("0 36000 29145 2") == "00036000291452"
+
+
+def scan(text):
+    return IdentifierScanner().scan(text)
+
+
+def test_labelled_gtin_with_bad_check_digit_fails():
+    [item] = scan("UPC: 036000291453")
+    assert item["kind"] == "gtin" and not item["valid"]
+    assert item["problem"] == "check digit 3 should be 2"
+
+
+@pytest.mark.parametrize("text, gtin", [
+    ("UPC: 036000291452 2 PCS", "036000291452"),
+    ("UPC 036000291452 1 EA", "036000291452"),
+    ("EAN 4006381333931 12 x 50 g", "4006381333931"),
+    ("GTIN-14: 10012345000017 6", "10012345000017"),
+    ("UPC 0 36000 29145 2 3 PACK", "036000291452"),
+    ("EAN-8 9638 5074 1 UNIT", "96385074"),
+])
+def test_labelled_gtin_stops_before_a_quantity(text, gtin):
+    [item] = scan(text)
+    assert (item["kind"], item["value"], item["valid"]) == ("gtin", gtin, True)
+
+
+def test_labelled_number_of_wrong_length_fails():
+    [item] = scan("UPC 03600029145")
+    assert not item["valid"] and item["problem"] == "11 digits is not a GTIN length"
+
+
+def test_human_readable_gtin_under_barcode_is_read():
+    [item] = scan("4 006381 333931")
+    assert (item["value"], item["valid"]) == ("4006381333931", True)
+    assert not scan("4 006381 333932")[0]["valid"]
+
+
+def test_bare_valid_gtin_is_read():
+    assert [(i["kind"], i["valid"]) for i in scan("Contents 036000291452 Made in China")] == [("gtin", True)]
+
+
+@pytest.mark.parametrize("text", [
+    "Patent US 10123456789012",
+    "Model 20231105123456",
+    "Order 123456789012",
+    "Tel 036000291452",
+    "Patent No. 4006381333931",
+])
+def test_bare_numbers_outside_gtin_context_are_ignored(text):
+    assert scan(text) == []
+
+
+@pytest.mark.parametrize("text, lot", [
+    ("LOT NUMBER: ABC123", "ABC123"),
+    ("Lot Number ABC123", "ABC123"),
+    ("LOT NO. 4411-B", "4411-B"),
+    ("Lot: 2024/07", "2024/07"),
+    ("LOT# XXXXXX", "XXXXXX"),
+])
+def test_lot_statements(text, lot):
+    [item] = scan(text)
+    assert (item["kind"], item["value"]) == ("lot", lot)
+
+
+def test_lot_placeholder_is_flagged():
+    assert scan("LOT XXXXXX")[0]["problem"] == "placeholder"
+
+
+@pytest.mark.parametrize("text, valid", [
+    ("EXP 2026-02", True),
+    ("EXP: 2026-02-29", False),
+    ("Expiry Date 2028-02-29", True),
+    ("USE BY 13/2026", False),
+    ("EXP 31/12/2026", True),      # DD/MM/YYYY
+    ("EXP 12/31/2026", True),      # MM/DD/YYYY
+    ("EXP 31/31/2026", False),
+    ("EXP YYYY-MM-DD", True),
+])
+def test_expiry_dates(text, valid):
+    [item] = scan(text)
+    assert item["kind"] == "expiry" and item["valid"] is valid
+
+
+def test_udi_elements_and_dates():
+    [item] = scan("(01)00012345600012(11)240115(17)261231(10)AB123(21)9")
+    assert item["valid"], item["problem"]
+    assert item["elements"] == {"gtin": "00012345600012", "production date": "240115", "expiry": "261231",
+                                "lot": "AB123", "serial": "9"}
+
+
+def test_udi_day_00_means_end_of_month():
+    assert scan("(01)00012345600012(17)260200")[0]["valid"]
+
+
+@pytest.mark.parametrize("udi, problem", [
+    ("(01)00012345600013(17)261231", "(01) 00012345600013 fails its check digit"),
+    ("(01)00012345600012(17)261331", "expiry 261331 is not a YYMMDD date"),
+    ("(01)00012345600012(11)230230", "production date 230230 is not a YYMMDD date"),
+])
+def test_udi_problems(udi, problem):
+    [item] = scan(udi)
+    assert not item["valid"] and item["problem"] == problem
+
+
+def test_udi_claims_its_embedded_gtin():
+    assert [i["kind"] for i in scan("UDI (01)00012345600012(10)A1")] == ["udi"]
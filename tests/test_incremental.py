@@ -0,0 +1,180 @@
+import fitz
+import pytest
+
+from file_processor import FileProcessor, LocalFile
+from history_store import HistoryStore
+from incremental import RevisionTracker
+from pixel_diff import PixelDiff
+from text_diff import TextDiff
+
+
+def make_pdf(path, pages):
+    """One page per entry of `pages` (a line of text each)."""
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text, fontsize=12)
+    doc.save(str(path))
+    doc.close()
+    return LocalFile(str(path))
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.flush(5)
+
+
+def verify(tracker, files, findings=()):
+    """One incremental run: baseline, stream every page, commit."""
+    processor = FileProcessor(use_cache=False, incremental=True, baseline=tracker.baseline(files))
+    stream = processor.stream(files)
+    pages = list(stream)
+    tracker.commit(stream, list(findings))
+    tracker.history.flush(5)
+    return stream, pages
+
+
+def test_reference_named_like_tracked_artwork_still_renders(tmp_path, history):
+    # Reported case: "box.pdf" uploaded as both the artwork and the golden sample
+    v1 = tmp_path / "v1"
+    v1.mkdir()
+    verify(RevisionTracker(history), [make_pdf(v1 / "box.pdf", ["Net Wt 500 g", "Made in China"])])
+
+    v2 = tmp_path / "v2"
+    v2.mkdir()
+    art = make_pdf(v2 / "box.pdf", ["Net Wt 500 g", "Made in Vietnam"])
+    ref = make_pdf(tmp_path / "box.pdf", ["Net Wt 500 g", "Made in China"])
+    tracker = RevisionTracker(history)
+    processor = FileProcessor(use_cache=False, incremental=True, baseline=tracker.baseline([art]))
+
+    # Through the artwork's incremental processor the reference would come back without rasters
+    assert all(p.get("unchanged") and p["data"] is None for p in processor.iter_pages([LocalFile(ref.path)]))
+
+    ref_pages = list(FileProcessor(dpi=processor.dpi, use_cache=False).iter_pages([ref]))
+    assert [p["page"] for p in ref_pages] == [1, 2]
+    assert all(p["data"] is not None and not p.get("fingerprint") for p in ref_pages)
+
+    findings = []
+    changed = (p for p in processor.stream([art]) if not p.get("unchanged"))
+    stages = PixelDiff().filter_pages(ref_pages, TextDiff().check_pages(ref_pages, changed, findings), findings)
+    sent = list(stages)
+    assert [p["page"] for p in sent] and all(p["page"] == 2 for p in sent)
+    assert any("Vietnam" in f["observation"] for f in findings)
+
+
+# --- Fingerprints ---
+
+def test_page_fingerprints_follow_page_content(tmp_path):
+    from file_processor import page_fingerprints
+    a = make_pdf(tmp_path / "a.pdf", ["one", "two", "three"])
+    b = make_pdf(tmp_path / "b.pdf", ["one", "TWO", "three"])
+    with fitz.open(a.path) as doc_a, fitz.open(b.path) as doc_b:
+        prints_a, prints_b = page_fingerprints(doc_a, [0, 1, 2]), page_fingerprints(doc_b, [0, 1, 2])
+        assert page_fingerprints(doc_a, [1]) == {1: prints_a[1]}
+    assert prints_a[0] == prints_b[0] and prints_a[2] == prints_b[2]
+    assert prints_a[1] != prints_b[1]
+    assert len(set(prints_a.values())) == 3
+
+
+# --- RevisionTracker ---
+
+def test_unchanged_changed_and_new_pages(tmp_path, history):
+    verify(RevisionTracker(history), [make_pdf(tmp_path / "box_v1.pdf", ["alpha", "beta"])])
+
+    stream, pages = verify(RevisionTracker(history), [make_pdf(tmp_path / "box_v2.pdf", ["alpha", "BETA", "gamma"])])
+    assert [(p["page"], bool(p.get("unchanged")), p["data"] is None) for p in pages] == [
+        (1, True, True), (2, False, False), (3, False, False)]
+    assert stream.unchanged == {"box_v2.pdf": {1}}
+    assert set(stream.fingerprints["box_v2.pdf"]) == {1, 2, 3}
+    # Text of unchanged pages still reaches the validator
+    assert "alpha" in stream.text
+
+
+def test_baseline_is_looked_up_by_document_name(tmp_path, history):
+    verify(RevisionTracker(history), [make_pdf(tmp_path / "DMD1001BLK_box_v6.pdf", ["alpha"])])
+    tracker = RevisionTracker(history)
+    baseline = tracker.baseline([LocalFile(str(tmp_path / "DMD1001BLK_box-rev7.pdf")),
+                                 LocalFile(str(tmp_path / "DMD1001BLK_insert_v1.pdf"))])
+    assert list(baseline) == ["DMD1001BLK_box-rev7.pdf"]
+    assert tracker.previous["DMD1001BLK_box-rev7.pdf"]["file"] == "DMD1001BLK_box_v6.pdf"
+
+
+def test_baseline_needs_the_same_context(tmp_path, history):
+    verify(RevisionTracker(history, "checklist-a"), [make_pdf(tmp_path / "box_v1.pdf", ["alpha"])])
+    v2 = [LocalFile(str(tmp_path / "box_v2.pdf"))]
+    assert RevisionTracker(history, "checklist-a").baseline(v2)
+    assert RevisionTracker(history, "checklist-b").baseline(v2) == {}
+    assert RevisionTracker(history).baseline(v2) == {}
+
+
+def test_findings_reused_only_for_unchanged_pages(tmp_path, history):
+    v1 = make_pdf(tmp_path / "box_v1.pdf", ["alpha", "beta", "gamma"])
+    verify(RevisionTracker(history), [v1], findings=[
+        {"check": "Brand Color (box_v1.pdf p1)", "status": "PASS", "observation": "ok", "file": "box_v1.pdf", "page": 1},
+        {"check": "Font Size (box_v1.pdf p2)", "status": "FAIL", "observation": "6pt", "file": "box_v1.pdf", "page": 2},
+        {"check": "Warnings", "status": "PASS", "observation": "present", "file": "box_v1.pdf", "pages": [1, 2, 3]},
+        {"check": "Other file", "status": "FAIL", "observation": "x", "file": "insert.pdf", "page": 1},
+    ])
+
+    tracker = RevisionTracker(history)
+    stream, _ = verify(tracker, [make_pdf(tmp_path / "box_v2.pdf", ["alpha", "BETA", "gamma"])])
+    reused = tracker.reused_findings(stream)
+    assert [(f["check"], f.get("page"), f.get("pages")) for f in reused] == [
+        ("Brand Color (box_v2.pdf p1)", 1, None),
+        ("Warnings", None, [1, 3]),
+    ]
+    assert all(f["file"] == "box_v2.pdf" and f["reused_from"] == "box_v1.pdf" for f in reused)
+
+
+def test_incomplete_ai_pages_get_no_baseline(tmp_path, history):
+    tracker = RevisionTracker(history)
+    files = [make_pdf(tmp_path / "box_v1.pdf", ["alpha", "beta"])]
+    processor = FileProcessor(use_cache=False, incremental=True, baseline=tracker.baseline(files))
+    stream = processor.stream(files)
+    list(stream)
+    tracker.commit(stream, [{"check": "AI Processing", "status": "FAIL", "observation": "timeout",
+                             "file": "box_v1.pdf", "pages": [2]}], incomplete={"box_v1.pdf": {2}})
+    history.flush(5)
+
+    rev = history.previous_revision("box_v2.pdf")
+    assert set(rev["fingerprints"]) == {1}
+    assert rev["findings"] == {1: []}
+
+
+# --- HistoryStore ---
+
+def test_revision_round_trip(history):
+    findings = {1: [{"check": "x", "status": "PASS", "observation": "ok", "page": 1}], 2: []}
+    history.record_revision("DMD1001BLK_box_v3.pdf", "abc123", {1: "fp1", 2: "fp2"}, findings, context="ctx")
+    history.record_revision("DMD1001BLK_box_v4.pdf", "def456", {1: "fp1b"}, {1: []}, context="other")
+    history.flush(5)
+
+    rev = history.previous_revision("DMD1001BLK_box_v9.pdf", "ctx")
+    assert rev == {"file": "DMD1001BLK_box_v3.pdf", "file_hash": "abc123",
+                   "fingerprints": {1: "fp1", 2: "fp2"}, "findings": findings}
+    assert history.previous_revision("DMD1001BLK_box_v9.pdf", "other")["file"] == "DMD1001BLK_box_v4.pdf"
+    assert history.previous_revision("unknown.pdf", "ctx") is None
+
+
+def test_run_round_trip(tmp_path):
+    from models import Report
+    path = str(tmp_path / "runs.db")
+    report = Report([{"name": "GTIN Match", "status": "FAIL", "observation": "wrong", "file": "DMD1001BLK_box.pdf", "page": 2},
+                     {"name": "Brand Color", "status": "WARN", "observation": "close"},
+                     {"name": "Warnings", "status": "PASS"}])
+    store = HistoryStore(path)
+    store.record(report, files=[("DMD1001BLK_box.pdf", "abc")], model="m", sku="DMD9999BLK", seconds=1.5)
+    store.flush(5)
+
+    # A fresh store on the same file reads what the first one wrote
+    reopened = HistoryStore(path)
+    [run] = reopened.recent_runs()
+    assert (run["sku"], run["status"], run["pass"], run["fail"], run["warn"], run["model"]) == \
+           ("DMD9999BLK", "FAIL", 1, 1, 1, "m")
+    assert run["files"] == [["DMD1001BLK_box.pdf", "abc"]]
+    checks = {c["name"]: c for c in reopened.checks()}
+    assert checks["GTIN Match"]["sku"] == "DMD1001BLK" and checks["GTIN Match"]["page"] == 2
+    assert checks["Brand Color"]["status"] == "WARNING" and checks["Brand Color"]["sku"] == "DMD9999BLK"
+    assert reopened.status_counts() == {"FAIL": 1, "WARNING": 1, "PASS": 1}
+    assert [c["name"] for c in reopened.checks(sku="DMD1001BLK", status="FAIL")] == ["GTIN Match"]
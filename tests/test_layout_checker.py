@@ -0,0 +1,124 @@
+import io
+import random
+
+import fitz
+import pytest
+from PIL import Image
+
+from file_processor import FileProcessor
+from layout_checker import LayoutChecker
+
+MM = 72 / 25.4
+
+_L = ["0001101", "0011001", "0010011", "0111101", "0100011", "0110001", "0101111", "0111011", "0110111", "0001011"]
+_G = ["0100111", "0110011", "0011011", "0100001", "0011101", "0111001", "0000101", "0010001", "0001001", "0010111"]
+_R = ["".join("1" if b == "0" else "0" for b in code) for code in _L]
+_PARITY = ["LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG", "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL"]
+
+WORDS = "lorem ipsum dolor sit amet illum lilli minimum 1111 IIII |||| Made in China 0.33 mm".split()
+
+
+def ean13_modules(digits):
+    d = [int(c) for c in digits]
+    left = "".join((_L if p == "L" else _G)[n] for p, n in zip(_PARITY[d[0]], d[1:7]))
+    return "101" + left + "01010" + "".join(_R[n] for n in d[7:]) + "101"
+
+
+def make_page(text_lines=40, barcode=False, quiet_mm=None):
+    """One A4-ish PDF page: lines of body text and optionally a 100% EAN-13 at (300, 650) pt."""
+    doc = fitz.open()
+    page = doc.new_page()
+    rng = random.Random(1)
+    for i in range(text_lines):
+        page.insert_text((48, 60 + i * 14), " ".join(rng.choice(WORDS) for _ in range(12)), fontsize=9)
+    if barcode:
+        x, top, module, height = 300, 650, 0.33 * MM, 22.85 * MM
+        for i, bit in enumerate(ean13_modules("4006381333931")):
+            if bit == "1":
+                page.draw_rect(fitz.Rect(x + i * module, top, x + (i + 1) * module, top + height),
+                               color=None, fill=(0, 0, 0))
+        page.insert_text((x, top + height + 9), "4 006381 333931", fontsize=8)
+        if quiet_mm is not None:
+            # Copy set too close to the left of the bars
+            width = fitz.get_text_length("LOT 42", fontsize=9)
+            page.insert_text((x - quiet_mm * MM - width, top + height / 2), "LOT 42", fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+    def __init__(self, data, name, type):
+        super().__init__(data)
+        self.name, self.type = name, type
+
+
+def process(data, name, type, dpi=None):
+    _, parts, _ = FileProcessor(dpi=dpi, use_cache=False).process_file(Upload(data, name, type))
+    return parts[0]
+
+
+def render(pdf_bytes, dpi):
+    return process(pdf_bytes, "label.pdf", "application/pdf", dpi=dpi)
+
+
+def barcode_findings(findings):
+    return [f for f in findings if f["check"].startswith("Barcode Quiet Zone")]
+
+
+@pytest.mark.parametrize("dpi", [72, 300])
+def test_text_only_page_has_no_barcodes(dpi):
+    part = render(make_page(text_lines=50), dpi)
+    assert barcode_findings(LayoutChecker().check_page(part)) == []
+
+
+@pytest.mark.parametrize("dpi", [72, 300])
+def test_text_is_not_a_barcode_even_without_word_boxes(dpi):
+    part = render(make_page(text_lines=50), dpi)
+    part["words"] = None
+    assert barcode_findings(LayoutChecker().check_page(part)) == []
+
+
+@pytest.mark.parametrize("dpi", [72, 300])
+def test_ean13_found_with_clear_quiet_zones(dpi):
+    part = render(make_page(barcode=True), dpi)
+    found = barcode_findings(LayoutChecker().check_page(part))
+    assert [f["status"] for f in found] == ["PASS"]
+    x0, y0, x1, y1 = found[0]["boxes"][0]
+    scale = dpi / 72
+    assert abs(x0 - 300 * scale) <= 2 and abs(y0 - 650 * scale) <= 2
+    assert abs((x1 - x0) - 95 * 0.33 * MM * scale) <= 3
+
+
+@pytest.mark.parametrize("dpi", [72, 300])
+def test_ean13_quiet_zone_too_small(dpi):
+    part = render(make_page(barcode=True, quiet_mm=1.0), dpi)
+    found = barcode_findings(LayoutChecker().check_page(part))
+    assert [f["status"] for f in found] == ["FAIL"]
+    assert "< required" in found[0]["observation"]
+
+
+def _png(part, dpi=None):
+    img = Image.open(io.BytesIO(part["data"]))
+    out = io.BytesIO()
+    img.save(out, format="PNG", **({"dpi": (dpi, dpi)} if dpi else {}))
+    return out.getvalue()
+
+
+def test_image_upload_uses_its_dpi_metadata():
+    png = _png(render(make_page(barcode=True), 300), dpi=300)
+    part = process(png, "label.png", "image/png")
+    assert part["dpi"] == 300
+    found = barcode_findings(LayoutChecker().check_page(part))
+    assert [f["status"] for f in found] == ["PASS"]
+    assert "before 105." in found[0]["observation"]
+
+
+def test_image_without_dpi_skips_the_mm_check():
+    png = _png(render(make_page(barcode=True), 300))
+    part = process(png, "label.png", "image/png")
+    assert part.get("dpi") is None
+    found = barcode_findings(LayoutChecker().check_page(part))
+    assert [f["status"] for f in found] == ["WARNING"]
+    assert "no resolution" in found[0]["observation"]
@@ -0,0 +1,43 @@
+import csv
+import pickle
+
+from batch_verify import write_csv
+from models import Finding, PageImage, Report
+
+
+def test_finding_to_dict_always_has_name_status_observation():
+    assert Finding(name="Brand Color", status="PASS").to_dict() == {"name": "Brand Color", "status": "PASS",
+                                                                   "observation": None}
+    d = Finding(name="x", status="FAIL", observation="o", page=2, reused_from="a_v1.pdf").to_dict()
+    assert d == {"name": "x", "status": "FAIL", "observation": "o", "page": 2, "reused_from": "a_v1.pdf"}
+
+
+def test_report_counts_and_dict():
+    report = Report([{"name": "a", "status": "PASS"}, {"name": "b", "status": "FAIL"}, {"name": "c", "status": "WARN"}])
+    assert report["summary"] == {"pass": 1, "fail": 1, "warn": 1}
+    assert [c["observation"] for c in report.to_dict()["checks"]] == [None, None, None]
+
+
+def test_write_csv_with_sparse_checks(tmp_path):
+    path = tmp_path / "results.csv"
+    write_csv(path, [{"file": "a.pdf", "checks": [Finding(name="x", status="PASS").to_dict(), {"name": "y"}]},
+                     {"file": "b.pdf", "error": "unreadable"}])
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[1:] == [["a.pdf", "x", "PASS", ""], ["a.pdf", "y", "", ""], ["b.pdf", "Processing", "FAIL", "unreadable"]]
+
+
+def test_page_image_copy_stays_a_page_image():
+    part = PageImage(file="a.pdf", page=3, data=b"png", dpi=72)
+    copy = part.copy()
+    copy["text_changed"] = True
+    assert isinstance(copy, PageImage) and copy["text_changed"]
+    assert "text_changed" not in part
+    assert bytes(copy["data"]) == b"png" and copy.get("words") is None
+
+
+def test_page_image_pickles_with_its_extras():
+    part = PageImage(file="a.pdf", page=1, data=b"png", region=2)
+    restored = pickle.loads(pickle.dumps(part))
+    assert isinstance(restored["data"], memoryview) and bytes(restored["data"]) == b"png"
+    assert restored["region"] == 2 and restored["page"] == 1
@@ -0,0 +1,47 @@
+import fitz
+
+from file_processor import FileProcessor, LocalFile
+from pipeline import local_checks
+
+
+def make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text, fontsize=12)
+    doc.save(str(path))
+    doc.close()
+    return LocalFile(str(path))
+
+
+def render(*files):
+    return list(FileProcessor(use_cache=False).iter_pages(list(files)))
+
+
+def test_unchanged_page_never_reaches_the_ai(tmp_path):
+    ref = render(make_pdf(tmp_path / "golden.pdf", "Vive Health LVA1001BLK"))
+    art = render(make_pdf(tmp_path / "box.pdf", "Vive Health LVA1001BLK"))
+    findings = []
+    ai_ref, ai_art = local_checks(ref, art, findings)
+    assert list(ai_art) == []
+    assert ai_ref == []
+    assert {f["check"].split(" (")[0] for f in findings} >= {"Edge Clearance", "Text Diff", "Golden Sample Match"}
+
+
+def test_changed_page_goes_as_a_crop_with_its_reference(tmp_path):
+    ref = render(make_pdf(tmp_path / "golden.pdf", "Vive Health LVA1001BLK"))
+    art = render(make_pdf(tmp_path / "box.pdf", "Vive Health LVA1002BLK"))
+    findings = []
+    _, ai_art = local_checks(ref, art, findings)
+    crops = list(ai_art)
+    assert len(crops) == 1
+    assert crops[0]["reference"] and crops[0]["box"]
+    statuses = {f["check"]: f["status"] for f in findings}
+    assert statuses["Text Diff (box.pdf p1)"] == "FAIL"
+
+
+def test_without_references_every_page_passes_through(tmp_path):
+    art = render(make_pdf(tmp_path / "box.pdf", "Vive Health LVA1001BLK"))
+    findings = []
+    ai_ref, ai_art = local_checks([], art, findings)
+    assert ai_ref == []
+    assert [p["page"] for p in ai_art] == [1]
+    assert not any(f["check"].startswith(("Text Diff", "Golden Sample Match")) for f in findings)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from pixel_diff import changed_boxes, label_regions
+
+
+def test_label_regions_is_8_connected():
+    grid = np.array([[1, 0, 0, 1],
+                     [0, 1, 0, 1],
+                     [0, 0, 0, 0],
+                     [1, 1, 0, 1]], dtype=bool)
+    labels = label_regions(grid)
+    assert (labels[~grid] == -1).all()
+    assert labels[0, 0] == labels[1, 1]                  # Diagonal neighbours join
+    assert labels[0, 3] == labels[1, 3] != labels[0, 0]
+    assert len({labels[3, 0], labels[3, 3], labels[0, 0], labels[0, 3]}) == 4
+
+
+def test_label_regions_serpentine_is_one_region():
+    n = 60
+    grid = np.zeros((n, n), dtype=bool)
+    grid[::2] = True
+    for row in range(1, n, 2):
+        grid[row, n - 1 if row % 4 == 1 else 0] = True
+    labels = label_regions(grid)
+    assert len(np.unique(labels[grid])) == 1
+
+
+def test_changed_boxes_pools_and_sorts_by_area():
+    mask = np.zeros((100, 120), dtype=bool)
+    mask[5:15, 5:15] = True          # Small region
+    mask[40:90, 60:118] = True       # Large region
+    boxes = changed_boxes(mask, cell=10, ratio=0.1)
+    assert boxes == [(60, 40, 120, 90), (0, 0, 20, 20)]
+    assert changed_boxes(mask, cell=10, ratio=0.1, max_boxes=1) == [(60, 40, 120, 90)]
+
+
+def test_changed_boxes_full_page_and_empty():
+    assert changed_boxes(np.ones((330, 255), dtype=bool), cell=16, ratio=0.02) == [(0, 0, 255, 330)]
+    assert changed_boxes(np.zeros((50, 50), dtype=bool), cell=8, ratio=0.02) == []
@@ -0,0 +1,52 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from pixel_diff import PixelDiff
+from references import ReferenceSet
+
+
+def part(file, page=1, **extra):
+    return dict({"file": file, "page": page}, **extra)
+
+
+def test_single_reference_applies_to_every_candidate():
+    refs = ReferenceSet([part("golden.pdf", 1), part("golden.pdf", 2)])
+    assert refs.match(part("box_v7.pdf", 2))[0]["file"] == "golden.pdf"
+    assert refs.match(part("insert.pdf", 1))[0]["file"] == "golden.pdf"
+    assert refs.match(part("box_v7.pdf", 3)) == (None, "no reference page")
+
+
+def test_single_reference_with_another_sku_does_not_apply():
+    refs = ReferenceSet([part("DMD1001BLK_golden.pdf")])
+    assert refs.match(part("DMD1001BLK_proof.pdf"))[0] is not None
+    assert refs.match(part("DMD2001BLK_label.png")) == (None, "no reference file")
+
+
+def test_several_references_match_by_document_then_sku():
+    refs = ReferenceSet([part("DMD1001BLK_box_v6.pdf"), part("DMD1001BLK_insert_v2.pdf"), part("DMD2001BLK_label.png")])
+    assert refs.match(part("DMD1001BLK_box_v7.pdf"))[0]["file"] == "DMD1001BLK_box_v6.pdf"
+    assert refs.match(part("DMD1001BLK_insert-rev3.pdf"))[0]["file"] == "DMD1001BLK_insert_v2.pdf"
+    assert refs.match(part("DMD2001BLK_label_final.png"))[0]["file"] == "DMD2001BLK_label.png"
+    # Two references carry DMD1001BLK: the SKU alone is ambiguous
+    assert refs.match(part("DMD1001BLK_sticker.pdf")) == (None, "no reference file")
+    assert refs.match(part("other.pdf")) == (None, "no reference file")
+
+
+def _png(width=40, height=40):
+    out = io.BytesIO()
+    Image.fromarray(np.full((height, width), 255, np.uint8)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_pixel_diff_sends_unmatched_pages_with_a_warning():
+    refs = [part("DMD1001BLK_golden.pdf", data=_png())]
+    arts = [part("DMD1001BLK_proof.pdf", data=_png()), part("DMD2001BLK_label.png", data=_png())]
+    findings = []
+    out = list(PixelDiff().filter_pages(refs, arts, findings))
+    assert [p["file"] for p in out] == ["DMD2001BLK_label.png"]
+    by_file = {f["file"]: f for f in findings}
+    assert by_file["DMD1001BLK_proof.pdf"]["status"] == "PASS"
+    assert by_file["DMD2001BLK_label.png"]["status"] == "WARNING"
+    assert "No matching reference" in by_file["DMD2001BLK_label.png"]["observation"]
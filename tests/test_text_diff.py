@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from text_diff import TextDiff, _bisect, diff
+
+
+def lcs_length(a, b):
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = 0
+        for j, y in enumerate(b, 1):
+            prev, row[j] = row[j], prev + 1 if x == y else max(row[j], row[j - 1])
+    return row[-1]
+
+
+def apply(ops, a, b):
+    """Rebuilds b from a and the opcodes, checking they tile both sequences in order."""
+    out, i, j = [], 0, 0
+    for tag, i1, i2, j1, j2 in ops:
+        assert (i1, j1) == (i, j)
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+        out.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return out
+
+
+def edits(ops):
+    return sum((i2 - i1) + (j2 - j1) for tag, i1, i2, j1, j2 in ops if tag != "equal")
+
+
+@pytest.mark.parametrize("a, b", [
+    ("", ""), ("abc", ""), ("", "abc"), ("abc", "abc"),
+    ("abcabba", "cbabac"),                    # Myers' paper example, D = 5
+    ("abcdef", "abXdef"), ("abcdef", "azcdxf"), ("aaaa", "aa"), ("abc", "xyz"),
+])
+def test_diff_is_a_shortest_edit_script(a, b):
+    ops = diff(a, b)
+    assert apply(ops, list(a), list(b)) == list(b)
+    assert edits(ops) == len(a) + len(b) - 2 * lcs_length(a, b)
+
+
+def test_diff_random_sequences():
+    rng = random.Random(7)
+    for _ in range(300):
+        alphabet = "ab" if rng.random() < 0.5 else "abcdefgh"
+        a = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+        b = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+        ops = diff(a, b)
+        assert apply(ops, a, b) == b
+        assert edits(ops) == len(a) + len(b) - 2 * lcs_length(a, b), (a, b)
+
+
+def test_diff_merges_runs_like_difflib():
+    assert diff("abcdef", "abXYef") == [("equal", 0, 2, 0, 2), ("replace", 2, 4, 2, 4), ("equal", 4, 6, 4, 6)]
+    assert diff("abc", "abxc") == [("equal", 0, 2, 0, 2), ("insert", 2, 2, 2, 3), ("equal", 2, 3, 3, 4)]
+
+
+@pytest.mark.parametrize("a, b", [("abcabba", "cbabac"), ("xaxbx", "ab"), ("ab", "xaxbx")])
+def test_middle_snake_splits_on_a_shortest_path(a, b):
+    x, y = _bisect(a, b)
+    assert 0 <= x <= len(a) and 0 <= y <= len(b)
+    d = len(a) + len(b) - 2 * lcs_length(a, b)
+    halves = (len(a[:x]) + len(b[:y]) - 2 * lcs_length(a[:x], b[:y])
+              + len(a[x:]) + len(b[y:]) - 2 * lcs_length(a[x:], b[y:]))
+    assert halves == d
+
+
+def test_middle_snake_none_when_nothing_shared():
+    assert _bisect("abc", "xyz") is None
+
+
+def page(words, file="a.pdf", page_no=1):
+    """A page part with one text block per line of words, boxes 10pt per word."""
+    out = []
+    for block, line in enumerate(words):
+        for i, w in enumerate(line.split()):
+            out.append([i * 10, block * 12, i * 10 + 8, block * 12 + 10, w, block, 0])
+    return {"file": file, "page": page_no, "dpi": 72, "words": out}
+
+
+def test_compare_reports_only_changed_words():
+    ref = page(["Net Wt 500 g", "Made in China", "Keep dry"])
+    art = page(["Net Wt 450 g", "Made in China", "Keep dry"])
+    [(tag, old, new)] = TextDiff().compare(ref, art)
+    assert tag == "replace" and [w for w, _ in old] == ["500"] and [w for w, _ in new] == ["450"]
+    assert TextDiff().compare(ref, page(["Net Wt 500 g", "Made in China", "Keep dry"])) == []
+
+
+def test_check_pages_tags_pages_and_finds_changes():
+    refs = [page(["Warning choking hazard"], "box_v1.pdf", 1), page(["Made in China"], "box_v1.pdf", 2)]
+    arts = [page(["Warning choking hazard"], "box_v2.pdf", 1), page(["Made in Vietnam"], "box_v2.pdf", 2)]
+    findings = []
+    out = list(TextDiff().check_pages(refs, arts, findings))
+    assert [p["text_changed"] for p in out] == [False, True]
+    assert "text_changed" not in arts[0]
+    assert any("Vietnam" in f["observation"] for f in findings)
@@ -0,0 +1,82 @@
+from layout_checker import LayoutChecker
+from text_index import WordIndex, normalize
+
+PAGE = (612, 792)
+
+
+def words(*entries):
+    """(x0, y0, text) -> word rows 40 x 10 pt, one block, one line per distinct y."""
+    return [[x, y, x + 40, y + 10, text, 0, int(y)] for x, y, text in entries]
+
+
+def index_of(pages):
+    index = WordIndex(cell=72)
+    for key, rows in pages.items():
+        index.add_page(key, rows, PAGE)
+    return index
+
+
+def test_normalize_strips_punctuation_and_case():
+    assert normalize("(Warning:)") == "WARNING"
+    assert normalize("•") == ""
+
+
+def test_token_lookup():
+    index = index_of({("a.pdf", 1): words((100, 100, "Made"), (150, 100, "in"), (200, 100, "China."))})
+    assert len(index) == 3
+    assert index.has_token("china") and index.has_token("CHINA,")
+    assert not index.has_token("Vietnam")
+    assert set(index.token_set()) == {"MADE", "IN", "CHINA"}
+    assert index.page_of(2) == ("a.pdf", 1)
+    assert index.bbox(0) == (100, 100, 140, 110)
+
+
+def test_phrase_containment_and_location():
+    index = index_of({
+        ("a.pdf", 1): words((100, 100, "Made"), (150, 100, "in"), (200, 100, "China")),
+        ("a.pdf", 2): words((100, 500, "MADE"), (150, 500, "IN"), (200, 500, "Vietnam"), (250, 500, "china")),
+    })
+    assert index.find_phrase("made in china") == [(("a.pdf", 1), (100, 100, 240, 110))]
+    assert index.contains("Made in China")
+    assert index.contains("made in", page=("a.pdf", 2))
+    assert not index.contains("made in china", page=("a.pdf", 2))
+    assert not index.contains("made in china", page=("b.pdf", 1))
+    # Region restricted: the phrase has to lie inside the rectangle
+    assert index.contains("in china", page=("a.pdf", 1), rect=(145, 90, 260, 120))
+    assert not index.contains("made in china", page=("a.pdf", 1), rect=(145, 90, 260, 120))
+    assert not index.contains("")
+
+
+def test_phrase_does_not_run_across_pages():
+    index = index_of({("a.pdf", 1): words((100, 700, "Made"), (150, 700, "in")),
+                      ("a.pdf", 2): words((100, 50, "China"))})
+    assert not index.contains("made in china")
+
+
+def test_region_query():
+    index = index_of({("a.pdf", 1): words((10, 10, "top"), (300, 400, "middle"), (560, 770, "corner"))})
+    assert [index.text[i] for i in index.within(("a.pdf", 1), (250, 350, 400, 450))] == ["middle"]
+    assert index.within(("b.pdf", 1), (0, 0, 612, 792)) == []
+
+
+def test_near_edge_includes_words_past_the_page():
+    index = index_of({
+        ("a.pdf", 1): words((10, 300, "left"), (300, 400, "middle"), (590, 300, "right"),
+                            (700, 300, "bleed"), (300, -40, "above"), (300, 780, "bottom")),
+        ("a.pdf", 2): words((300, 400, "safe")),
+    })
+    assert [index.text[i] for i in index.near_edge(18, page=("a.pdf", 1))] == ["left", "right", "bleed", "above", "bottom"]
+    assert index.near_edge(18, page=("a.pdf", 2)) == []
+    assert [index.text[i] for i in index.near_edge(18)] == ["left", "right", "bleed", "above", "bottom"]
+
+
+def test_edge_clearance_uses_the_index():
+    part = {"file": "a.pdf", "page": 1, "page_size": PAGE, "dpi": 144,
+            "words": words((300, 400, "middle"), (590, 300, "right"), (700, 300, "bleed"))}
+    [finding] = LayoutChecker(safety_margin_pt=18)._check_edges(part, 144)
+    assert finding["status"] == "FAIL"
+    assert finding["observation"].startswith("2 word(s) cut off")  # 'right' runs past 612 too
+    assert finding["boxes"] == [(1180, 600, 1260, 620), (1400, 600, 1480, 620)]
+
+    part["words"] = words((300, 400, "middle"))
+    assert LayoutChecker(safety_margin_pt=18)._check_edges(part, 144)[0]["status"] == "PASS"
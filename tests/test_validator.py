@@ -0,0 +1,62 @@
+import random
+import time
+
+from models import Rule
+from text_index import KeywordMatcher
+from validator import ArtworkValidator
+
+
+def test_keyword_matcher_has_substring_semantics():
+    matcher = KeywordMatcher(["LABEL", "LABELS", "ABEL", "WARNING", "CHOKING", "ARNI"])
+    assert matcher.find("CHILD LABELSWARNING") == {"LABEL", "LABELS", "ABEL", "WARNING", "ARNI"}
+    assert matcher.find("") == set()
+    assert KeywordMatcher([]).find("ANYTHING") == set()
+
+
+def test_keyword_matcher_random_against_in():
+    rng = random.Random(5)
+    for _ in range(300):
+        keywords = {"".join(rng.choice("ABC") for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, 15))}
+        text = "".join(rng.choice("ABC .") for _ in range(rng.randint(0, 80)))
+        assert KeywordMatcher(keywords).find(text) == {k for k in keywords if k in text}
+
+
+def rule_passes(report):
+    return {c.name for c in report.checks if c.observation == "Keywords found in text."}
+
+
+def test_rules_pass_on_keywords_inside_longer_words():
+    rules = [Rule(id=1, requirement="Choking hazard warning present"),
+             Rule(id=2, requirement="Latex statement printed"),
+             Rule(id=3, requirement="Recycling symbols shown clearly")]
+    text = "WARNING: CHOKING HAZARD - Small parts. Not made with natural rubber latex; statements printed in black."
+    report = ArtworkValidator(rules, []).validate(text, "box.pdf", None)
+    assert rule_passes(report) == {"Choking hazard warning present", "Latex statement printed"}
+
+
+def test_rule_matching_scales_to_large_checklists():
+    # 500 rules against ~5,000 lines of extracted dieline text
+    rng = random.Random(11)
+    vocab = ["".join(rng.choice("ABCDEFGHIKLMNOPRSTUVWY") for _ in range(rng.randint(3, 12))) for _ in range(4000)]
+    rules = [Rule(id=i, requirement=" ".join(rng.choice(vocab) for _ in range(rng.randint(3, 10))), category="C")
+             for i in range(500)]
+    text = "\n".join(" ".join(rng.choice(vocab) for _ in range(14)) for _ in range(5000))
+    validator = ArtworkValidator(rules, [])
+
+    def timed(v):
+        started = time.perf_counter()
+        result = v.validate(text, "DMD1001BLK_box.pdf", None)
+        return result, time.perf_counter() - started
+
+    # Rule matching cost = the same validation with and without the checklist
+    report, elapsed = timed(validator)
+    _, baseline = timed(ArtworkValidator([], []))
+
+    upper = text.upper()
+    expected = set()
+    for rule in rules:
+        words = [w.upper() for w in rule.requirement.split() if len(w) > 4]
+        if words and sum(w in upper for w in words) / len(words) > 0.6:
+            expected.add(rule.requirement)
+    assert rule_passes(report) == expected
+    assert elapsed - baseline < 0.15, f"rule matching took {elapsed - baseline:.3f}s"
@@ -0,0 +1,238 @@
+from config import Config
+from text_index import normalize
+from references import ReferenceSet
+
+def _bisect(a, b):
+    """
+    Myers' middle snake: an (x, y) split point on some shortest edit path of a -> b,
+    found in O((N+M)D) time and O(N+M) space. None when the sequences share nothing.
+    """
+    n, m = len(a), len(b)
+    max_d = (n + m + 1) // 2
+    offset, size = max_d, 2 * max_d + 2
+    vf, vb = [-1] * size, [-1] * size
+    vf[offset + 1] = vb[offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    # Diagonals that ran off the grid are trimmed from later sweeps
+    kf_start = kf_end = kb_start = kb_end = 0
+
+    for d in range(max_d):
+        # Forward sweep
+        for k in range(-d + kf_start, d + 1 - kf_end, 2):
+            i = offset + k
+            x = vf[i + 1] if k == -d or (k != d and vf[i - 1] < vf[i + 1]) else vf[i - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            vf[i] = x
+            if x > n:
+                kf_end += 2
+            elif y > m:
+                kf_start += 2
+            elif front:
+                j = offset + delta - k
+                if 0 <= j < size and vb[j] != -1 and x >= n - vb[j]:
+                    return x, y
+
+        # Reverse sweep (distances measured from the end of both sequences)
+        for k in range(-d + kb_start, d + 1 - kb_end, 2):
+            i = offset + k
+            x = vb[i + 1] if k == -d or (k != d and vb[i - 1] < vb[i + 1]) else vb[i - 1] + 1
+            y = x - k
+            while x < n and y < m and a[n - x - 1] == b[m - y - 1]:
+                x += 1
+                y += 1
+            vb[i] = x
+            if x > n:
+                kb_end += 2
+            elif y > m:
+                kb_start += 2
+            elif not front:
+                j = offset + delta - k
+                if 0 <= j < size and vf[j] != -1:
+                    fx = vf[j]
+                    if fx >= n - x:
+                        return fx, offset + fx - j
+    return None
+
+def diff(a, b):
+    """
+    Linear-space Myers diff of two sequences of hashables.
+    Returns opcodes (tag, i1, i2, j1, j2) like difflib, tag in equal/delete/insert/replace.
+    """
+    ops = []
+    _diff(list(a), list(b), 0, 0, ops)
+
+    # Merge neighbouring runs and fold delete+insert pairs into replace
+    merged = []
+    for op in ops:
+        if op[1] == op[2] and op[3] == op[4]: continue
+        if merged:
+            tag, i1, i2, j1, j2 = merged[-1]
+            if tag == op[0] or (tag != "equal" and op[0] != "equal"):
+                new_tag = tag if tag == op[0] else "replace"
+                merged[-1] = (new_tag, i1, op[2], j1, op[4])
+                continue
+        merged.append(op)
+    return merged
+
+def _diff(a, b, ai, bj, ops):
+    # Common prefix / suffix first: cheap, and guarantees the bisect split makes progress
+    n, m = len(a), len(b)
+    p = 0
+    while p < n and p < m and a[p] == b[p]:
+        p += 1
+    s = 0
+    while s < n - p and s < m - p and a[n - s - 1] == b[m - s - 1]:
+        s += 1
+    if p:
+        ops.append(("equal", ai, ai + p, bj, bj + p))
+    a, b = a[p:n - s], b[p:m - s]
+    ai, bj = ai + p, bj + p
+
+    if not a:
+        ops.append(("insert", ai, ai, bj, bj + len(b)))
+    elif not b:
+        ops.append(("delete", ai, ai + len(a), bj, bj))
+    else:
+        split = _bisect(a, b)
+        if split is None:
+            ops.append(("delete", ai, ai + len(a), bj, bj))
+            ops.append(("insert", ai + len(a), ai + len(a), bj, bj + len(b)))
+        else:
+            x, y = split
+            _diff(a[:x], b[:y], ai, bj, ops)
+            _diff(a[x:], b[y:], ai + x, bj + y, ops)
+
+    if s:
+        ops.append(("equal", ai + len(a), ai + len(a) + s, bj + len(b), bj + len(b) + s))
+
+
+class TextDiff:
+    """
+    Local reference-vs-candidate text comparison.
+    Each page is tokenized per text block (normalized words); block sequences are aligned first,
+    so untouched blocks cost one tuple comparison, and only the blocks that differ are diffed word
+    by word. Changes become findings with word boxes; pages are tagged with `text_changed` so
+    later stages can skip the AI on pages that changed neither textually nor visually.
+    """
+    def __init__(self, max_changes=None, critical_words=None):
+        self.max_changes = max_changes or Config.TEXT_DIFF_MAX_CHANGES
+        self.critical_words = set(critical_words or Config.TEXT_DIFF_CRITICAL_WORDS)
+
+    def tokenize(self, part):
+        """Returns (blocks, words): blocks as tuples of normalized tokens, words as [(text, bbox)] per block."""
+        if part.get('words') is None:
+            tokens = [(w, None) for w in part.get('text', '').split()]
+            groups = [tokens]
+        else:
+            by_block = {}
+            for w in part['words']:
+                by_block.setdefault(w[5] if len(w) > 5 else 0, []).append((w[4], tuple(w[:4])))
+            groups = list(by_block.values())
+
+        blocks, words = [], []
+        for group in groups:
+            kept = [(normalize(t), t, box) for t, box in group]
+            kept = [k for k in kept if k[0]]
+            if kept:
+                blocks.append(tuple(k[0] for k in kept))
+                words.append([(k[1], k[2]) for k in kept])
+        return blocks, words
+
+    def compare(self, ref_part, art_part):
+        """Returns [(tag, ref_words, art_words)] for every changed span; empty when the text matches."""
+        ref_blocks, ref_words = self.tokenize(ref_part)
+        art_blocks, art_words = self.tokenize(art_part)
+        if ref_blocks == art_blocks:
+            return []
+
+        changes = []
+        for tag, i1, i2, j1, j2 in diff(ref_blocks, art_blocks):
+            if tag == "equal": continue
+            # Word-level diff inside the changed block range only
+            a = [t for block in ref_blocks[i1:i2] for t in block]
+            b = [t for block in art_blocks[j1:j2] for t in block]
+            a_words = [w for block in ref_words[i1:i2] for w in block]
+            b_words = [w for block in art_words[j1:j2] for w in block]
+            for wtag, w1, w2, v1, v2 in diff(a, b):
+                if wtag != "equal":
+                    changes.append((wtag, a_words[w1:w2], b_words[v1:v2]))
+        return changes
+
+    def check_pages(self, ref_parts, art_parts, findings):
+        """
+        Pass-through stream stage: diffs each candidate page against its reference page
+        (paired by reference file and page, see ReferenceSet), appends findings, and yields
+        the page tagged with `text_changed`.
+        """
+        refs = ReferenceSet(ref_parts)
+
+        matched = {}
+        for part in art_parts:
+            ref, _ = refs.match(part)
+            if ref is None or ref.get('words') is None or part.get('words') is None:
+                # Nothing to compare against (or an image upload with no extracted text)
+                yield self._tagged(part, True)
+                continue
+
+            changes = self.compare(ref, part)
+            counts = matched.setdefault(part.get('file'), [0, 0])
+            counts[1] += 1
+            if not changes:
+                counts[0] += 1
+                yield self._tagged(part, False)
+                continue
+
+            findings.append(self._finding(part, changes))
+            yield self._tagged(part, True)
+
+        for name, (same, total) in matched.items():
+            if same:
+                findings.append({"check": f"Text Diff ({name or ''})", "status": "PASS", "file": name,
+                                 "observation": f"{same} of {total} page(s) match the golden sample text."})
+
+    def _tagged(self, part, changed):
+        # copy() keeps a PageImage a PageImage; dict(part, ...) would turn it into a plain dict
+        part = part.copy()
+        part['text_changed'] = changed
+        return part
+
+    def _finding(self, part, changes):
+        page = part.get('page', 1)
+        scale = (part.get('dpi') or Config.RENDER_DPI) / 72.0
+        critical = False
+        notes, boxes = [], []
+        for tag, old, new in changes:
+            old_text = " ".join(t for t, _ in old)
+            new_text = " ".join(t for t, _ in new)
+            if tag == "replace":
+                notes.append(f"changed '{old_text}' → '{new_text}'")
+            elif tag == "delete":
+                notes.append(f"removed '{old_text}'")
+            else:
+                notes.append(f"added '{new_text}'")
+            # Codes, quantities and regulatory wording are never cosmetic
+            critical = critical or any(self._is_critical(t) for t, _ in old + new)
+            # Removed text has no candidate box; its reference position is the best locator
+            for _, box in (new or old):
+                if box is not None:
+                    boxes.append(tuple(round(v * scale) for v in box))
+
+        shown = "; ".join(notes[:self.max_changes])
+        if len(notes) > self.max_changes:
+            shown += f"; ... {len(notes) - self.max_changes} more"
+        return {
+            "check": f"Text Diff ({part.get('file', '')} p{page})",
+            "status": "FAIL" if critical else "WARNING",
+            "file": part.get('file'),
+            "page": page,
+            "boxes": boxes,
+            "observation": f"{len(changes)} text change(s) vs golden sample: {shown}."
+        }
+
+    def _is_critical(self, word):
+        token = normalize(word)
+        return token in self.critical_words or any(c.isdigit() for c in token)
@@ -0,0 +1,192 @@
+import re
+import sys
+from array import array
+from config import Config
+
+_STRIP = ".,;:!?()[]{}\"'*•·|"
+
+def normalize(word):
+    return sys.intern(word.strip(_STRIP).upper())
+
+
+class KeywordMatcher:
+    """
+    Finds which of many keywords occur anywhere in a text (substring semantics), in one pass.
+    The keywords are compiled once into a trie-shaped regex inside a lookahead, so the C regex
+    engine tries every text position against all keywords at once and reports the longest
+    keyword starting there; shorter keywords that are prefixes of it are read off the trie.
+    """
+    def __init__(self, keywords):
+        self.keywords = set(keywords)
+        trie = {}
+        for kw in self.keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        self._pattern = re.compile("(?=(" + self._trie_pattern(trie) + "))") if self.keywords else None
+
+    def _trie_pattern(self, node):
+        alts = [re.escape(ch) + self._trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # A keyword ends here: the longer continuations are optional (greedy, so longest first)
+        return f"(?:{body})?" if "" in node else body
+
+    def find(self, text):
+        """The set of keywords occurring in text."""
+        if self._pattern is None:
+            return set()
+        found = set()
+        for longest in {m.group(1) for m in self._pattern.finditer(text)}:
+            found.update(longest[:n] for n in range(1, len(longest) + 1) if longest[:n] in self.keywords)
+        return found
+
+
+class WordIndex:
+    """
+    Positional word store for extracted PDF text.
+    Words live in parallel arrays (page slot, bbox in points, block/line) in reading order,
+    with a per-page uniform grid for region queries and a token -> ids map for phrase lookups.
+    Pages are keyed by any hashable, typically (file, page).
+    """
+    def __init__(self, cell=None):
+        self.cell = cell or Config.WORD_INDEX_CELL_PT
+        self.tokens = []
+        self.text = []
+        self.slot = array('i')
+        self.x0, self.y0, self.x1, self.y1 = array('f'), array('f'), array('f'), array('f')
+        self.block, self.line = array('i'), array('i')
+        self.pages = []          # slot -> page key
+        self.page_sizes = []     # slot -> (width, height)
+        self.extents = []        # slot -> [x0, y0, x1, y1] around every word (may lie past the page)
+        self._slots = {}         # page key -> slot
+        self._grid = {}          # (slot, cx, cy) -> [ids]
+        self._by_token = {}      # token -> [ids]
+
+    @classmethod
+    def from_pages(cls, parts):
+        index = cls()
+        for part in parts:
+            index.add_part(part)
+        return index
+
+    def add_part(self, part):
+        if part.get('words') is not None:
+            self.add_page((part.get('file'), part.get('page', 1)), part['words'], part.get('page_size'))
+
+    def add_page(self, key, words, page_size):
+        slot = self._slots.setdefault(key, len(self.pages))
+        if slot == len(self.pages):
+            self.pages.append(key)
+            self.page_sizes.append(tuple(page_size) if page_size else None)
+            self.extents.append([0.0, 0.0, 0.0, 0.0])
+        cell = self.cell
+        extent = self.extents[slot]
+
+        for w in words:
+            i = len(self.tokens)
+            token = normalize(w[4])
+            self.tokens.append(token)
+            self.text.append(w[4])
+            self.slot.append(slot)
+            self.x0.append(w[0]); self.y0.append(w[1]); self.x1.append(w[2]); self.y1.append(w[3])
+            extent[0], extent[1] = min(extent[0], w[0]), min(extent[1], w[1])
+            extent[2], extent[3] = max(extent[2], w[2]), max(extent[3], w[3])
+            self.block.append(w[5] if len(w) > 5 else 0)
+            self.line.append(w[6] if len(w) > 6 else 0)
+            if token:
+                self._by_token.setdefault(token, []).append(i)
+            for cx in range(int(w[0] // cell), int(w[2] // cell) + 1):
+                for cy in range(int(w[1] // cell), int(w[3] // cell) + 1):
+                    self._grid.setdefault((slot, cx, cy), []).append(i)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def bbox(self, i):
+        return (self.x0[i], self.y0[i], self.x1[i], self.y1[i])
+
+    def page_of(self, i):
+        return self.pages[self.slot[i]]
+
+    def has_token(self, token):
+        return normalize(token) in self._by_token
+
+    def token_set(self):
+        return self._by_token.keys()
+
+    # --- Region queries ---
+
+    def within(self, page, rect):
+        """Ids of words on `page` whose box intersects rect (x0, y0, x1, y1), in reading order."""
+        slot = self._slots.get(page)
+        if slot is None:
+            return []
+        x0, y0, x1, y1 = rect
+        cell = self.cell
+        found = set()
+        for cx in range(int(x0 // cell), int(x1 // cell) + 1):
+            for cy in range(int(y0 // cell), int(y1 // cell) + 1):
+                for i in self._grid.get((slot, cx, cy), ()):
+                    if self.x0[i] <= x1 and self.x1[i] >= x0 and self.y0[i] <= y1 and self.y1[i] >= y0:
+                        found.add(i)
+        return sorted(found)
+
+    def near_edge(self, distance, page=None):
+        """Ids of words within `distance` pt of (or past) their page edge; only edge-band cells are scanned."""
+        slots = [self._slots[page]] if page is not None else range(len(self.pages))
+        found = []
+        for slot in slots:
+            size = self.page_sizes[slot]
+            if not size: continue
+            width, height = size
+            key = self.pages[slot]
+            bands = [(-1e6, -1e6, 1e6, distance), (-1e6, height - distance, 1e6, 1e6),
+                     (-1e6, -1e6, distance, 1e6), (width - distance, -1e6, 1e6, 1e6)]
+            hits = set()
+            ex0, ey0, ex1, ey1 = self.extents[slot]
+            for band in bands:
+                # Clamp the band to the words' extent (bleed included) so the cell walk stays bounded
+                bx0, by0 = max(band[0], ex0), max(band[1], ey0)
+                bx1, by1 = min(band[2], ex1), min(band[3], ey1)
+                if bx0 > bx1 or by0 > by1: continue
+                hits.update(i for i in self.within(key, (bx0, by0, bx1, by1))
+                            if self.x0[i] < distance or self.y0[i] < distance
+                            or self.x1[i] > width - distance or self.y1[i] > height - distance)
+            found.extend(sorted(hits))
+        return found
+
+    # --- Phrase queries ---
+
+    def find_phrase(self, phrase, page=None, rect=None):
+        """
+        Occurrences of phrase as consecutive words (reading order, may wrap lines).
+        Returns [(page key, (x0, y0, x1, y1))] with the union box of each occurrence.
+        """
+        wanted = [normalize(t) for t in phrase.split()]
+        wanted = [t for t in wanted if t]
+        if not wanted:
+            return []
+        allowed = set(self.within(page, rect)) if rect is not None else None
+        slot = self._slots.get(page) if page is not None else None
+        if page is not None and slot is None:
+            return []
+
+        matches = []
+        n = len(self.tokens)
+        for start in self._by_token.get(wanted[0], ()):
+            end = start + len(wanted)
+            if end > n or self.tokens[start:end] != wanted: continue
+            ids = range(start, end)
+            if any(self.slot[i] != self.slot[start] for i in ids): continue
+            if slot is not None and self.slot[start] != slot: continue
+            if allowed is not None and not all(i in allowed for i in ids): continue
+            box = (min(self.x0[i] for i in ids), min(self.y0[i] for i in ids),
+                   max(self.x1[i] for i in ids), max(self.y1[i] for i in ids))
+            matches.append((self.pages[self.slot[start]], box))
+        return matches
+
+    def contains(self, phrase, page=None, rect=None):
+        return bool(self.find_phrase(phrase, page, rect))
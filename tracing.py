@@ -0,0 +1,172 @@
+import contextvars
+import functools
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+# Active tracer / span for the current thread or task (copied into asyncio tasks and to_thread calls)
+_tracer = contextvars.ContextVar("tracer", default=None)
+_span = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "start", "duration", "attrs")
+
+    def __init__(self, span_id, parent, name, attrs):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+_NULL = _NullSpan()
+
+
+class Tracer:
+    """
+    Collects timing spans for one verification run.
+    Spans are plain records appended under a lock; with no active tracer every
+    span() / annotate() / trace_iter() call is a no-op, so instrumentation can stay in place.
+    """
+    def __init__(self, enabled=None):
+        self.enabled = Config.TRACE_ENABLED if enabled is None else enabled
+        self.spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def activate(self):
+        if not self.enabled:
+            yield self
+            return
+        token = _tracer.set(self)
+        try:
+            yield self
+        finally:
+            _tracer.reset(token)
+
+    def _start(self, name, attrs):
+        parent = _span.get()
+        return Span(next(self._ids), parent.id if parent else None, name, attrs)
+
+    def _finish(self, span):
+        if span.duration is None:
+            span.duration = time.perf_counter() - span.start
+        with self._lock:
+            self.spans.append(span)
+
+    def records(self):
+        """One dict per span: id, parent, name, start/ms/self_ms (milliseconds) plus its attributes."""
+        children = {}
+        for s in self.spans:
+            if s.parent is not None:
+                children[s.parent] = children.get(s.parent, 0.0) + s.duration
+        out = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            out.append({
+                "id": s.id,
+                "parent": s.parent,
+                "name": s.name,
+                "start": round((s.start - self._t0) * 1000, 2),
+                "ms": round(s.duration * 1000, 2),
+                "self_ms": round(max(s.duration - children.get(s.id, 0.0), 0.0) * 1000, 2),
+                **s.attrs,
+            })
+        return out
+
+    def summary(self):
+        return summarize(self.records())
+
+
+def summarize(records):
+    """Per span name: count, total and self milliseconds, and sums of numeric attributes."""
+    totals = {}
+    for r in records:
+        t = totals.setdefault(r["name"], {"name": r["name"], "count": 0})
+        t["count"] += 1
+        for k, v in r.items():
+            if k in ("id", "parent", "name", "start"): continue
+            if isinstance(v, bool):
+                t[k] = t.get(k, 0) + int(v)
+            elif isinstance(v, (int, float)):
+                t[k] = round(t.get(k, 0) + v, 2)
+    return sorted(totals.values(), key=lambda t: -t.get("self_ms", 0))
+
+def to_jsonl(records):
+    return "".join(json.dumps(r, default=str) + "\n" for r in records)
+
+
+@contextmanager
+def span(name, **attrs):
+    tracer = _tracer.get()
+    if tracer is None:
+        yield _NULL
+        return
+    s = tracer._start(name, attrs)
+    token = _span.set(s)
+    try:
+        yield s
+    finally:
+        _span.reset(token)
+        tracer._finish(s)
+
+def annotate(**attrs):
+    """Adds attributes to the innermost open span, if any."""
+    s = _span.get()
+    if s is not None:
+        s.set(**attrs)
+
+def traced(name):
+    """Decorator: runs the function inside a span of the given name."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+def trace_iter(name, iterable, **attrs):
+    """
+    Wraps a lazy stage. The span only counts time spent producing items (not the consumer's time
+    between them), plus the number of items and their 'data' bytes.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield from iterable
+        return
+    s = tracer._start(name, attrs)
+    s.duration = 0.0
+    items = size = 0
+    it = iter(iterable)
+    try:
+        while True:
+            token = _span.set(s)
+            t = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                break
+            finally:
+                s.duration += time.perf_counter() - t
+                _span.reset(token)
+            items += 1
+            if hasattr(item, 'get') and item.get('data') is not None:
+                size += len(item['data'])
+            yield item
+    finally:
+        s.set(items=items, bytes=size)
+        tracer._finish(s)
@@ -1,22 +1,59 @@
 import re
+from identifiers import IdentifierScanner, gtin14
+from models import Finding, Report
+from text_index import KeywordMatcher
+from tracing import annotate, traced
+
+_SKU = re.compile(r'([A-Z]{3,4}\d{3,4}[A-Z]*)')
+
+def extract_sku(filename):
+    """SKU embedded in a file name (e.g. DMD1001BLK_v2.pdf -> DMD1001BLK), or None."""
+    match = _SKU.search(str(filename).upper())
+    return match.group(1) if match else None
 
 class ArtworkValidator:
-    def __init__(self, rules, errors):
+    def __init__(self, rules, errors, gtin_map=None):
         self.rules = rules
         self.errors = errors
+        self._keywords, self._rule_index = self._compile_rules(rules)
+        self._matcher = KeywordMatcher(self._keywords)
+        self._scanner = IdentifierScanner(gtin_map)
+
+    def _compile_rules(self, rules):
+        """
+        Compiles rule keywords once into a shared keyword table (matched by one KeywordMatcher).
+        Each rule keeps the ids of its keywords (duplicates included, so scoring is unchanged).
+        """
+        keywords = {}
+        rule_index = []
+        for rule in rules:
+            # Only check rules that have distinct keywords (longer than 4 chars)
+            words = [w.upper() for w in rule['requirement'].split() if len(w) > 4]
+            if not words: continue
+            ids = tuple(keywords.setdefault(w, len(keywords)) for w in words)
+            rule_index.append((rule, ids))
+        return list(keywords), rule_index
 
-    def validate(self, text, filename, ai_results):
-        report = {
-            "summary": {"pass": 0, "fail": 0, "warn": 0},
-            "checks": []
-        }
+    @traced("validate")
+    def validate(self, text, filename, ai_results, local_findings=None, index=None):
+        """
+        index: optional WordIndex over the artwork's words; when present, presence checks
+        are answered from it (with page locations) before falling back to substring search.
+        """
+        if index is not None and not len(index):
+            index = None  # Image-only uploads carry no word positions
+        report = Report()
+
+        upper_text = text.upper()
 
         # 1. Logic: SKU Match (Critical)
         # Extracts SKU from filename (e.g., DMD1001BLK) and looks for it in the text
-        filename_sku = re.search(r'([A-Z]{3,4}\d{3,4}[A-Z]*)', filename.upper())
-        if filename_sku:
-            sku = filename_sku.group(1)
-            if sku in text.upper():
+        sku = extract_sku(filename)
+        if sku:
+            hits = index.find_phrase(sku) if index else []
+            if hits:
+                self._add_result(report, "SKU Consistency", "PASS", f"SKU {sku} found in artwork ({self._where(hits)}).")
+            elif sku in upper_text:
                 self._add_result(report, "SKU Consistency", "PASS", f"SKU {sku} found in artwork.")
             else:
                 self._add_result(report, "SKU Consistency", "FAIL", f"Filename is {sku}, but not found in artwork text.")
@@ -24,35 +61,81 @@ class ArtworkValidator:
             self._add_result(report, "SKU Consistency", "WARN", "Could not detect SKU in filename.")
 
         # 2. Logic: Country of Origin
-        if "MADE IN CHINA" in text.upper() or "ORIGIN: CHINA" in text.upper():
+        hits = (index.find_phrase("MADE IN CHINA") or index.find_phrase("ORIGIN: CHINA")) if index else []
+        if hits:
+            self._add_result(report, "Country of Origin", "PASS", f"Origin statement found ({self._where(hits)}).")
+        elif "MADE IN CHINA" in upper_text or "ORIGIN: CHINA" in upper_text:
             self._add_result(report, "Country of Origin", "PASS", "Origin statement found.")
         else:
             self._add_result(report, "Country of Origin", "FAIL", "Missing 'Made in China' text.")
 
-        # 3. Logic: Text Search for Checklist Items
-        for rule in self.rules:
-            # Only check rules that have distinct keywords (longer than 4 chars)
-            words = [w for w in rule['requirement'].split() if len(w) > 4]
-            if not words: continue
-            
+        # 3. Logic: Structured Identifiers (GTIN/UPC, UDI, lot, expiry)
+        self._check_identifiers(report, text, sku)
+
+        # 4. Logic: Text Search for Checklist Items
+        # One pass resolves every distinct keyword, then each rule is scored from the hit table. Keywords
+        # hold no whitespace, so scanning each distinct token of the text once finds the same matches.
+        found = self._matcher.find("\n".join(set(upper_text.split())))
+        hits = [kw in found for kw in self._keywords]
+        for rule, ids in self._rule_index:
             # If >60% of the unique keywords in the rule are found in the text, we assume it's present
-            found_count = sum(1 for w in words if w.upper() in text.upper())
-            if found_count / len(words) > 0.6:
+            found_count = sum(hits[i] for i in ids)
+            if found_count / len(ids) > 0.6:
                 self._add_result(report, rule['requirement'], "PASS", "Keywords found in text.")
 
-        # 4. Merge AI Results
+        # 5. Merge Local Analyzer Findings (pixel diff, etc.)
+        for finding in local_findings or []:
+            self._add_finding(report, finding)
+
+        # 6. Merge AI Results
         if ai_results and 'findings' in ai_results:
             for finding in ai_results['findings']:
-                self._add_result(report, finding.get('check'), finding.get('status'), finding.get('observation'))
+                self._add_finding(report, finding)
 
+        annotate(checks=len(report['checks']))
         return report
 
-    def _add_result(self, report, name, status, obs):
-        report['checks'].append({
-            "name": name,
-            "status": status,
-            "observation": obs
-        })
-        if status.upper() == "PASS": report['summary']['pass'] += 1
-        elif status.upper() == "FAIL": report['summary']['fail'] += 1
-        else: report['summary']['warn'] += 1
+    def _check_identifiers(self, report, text, sku):
+        found = {}
+        for item in self._scanner.scan(text):
+            found.setdefault((item['kind'], item['value']), item)  # Repeated on every page: report once
+        items = list(found.values())
+
+        for item in items:
+            if not item['valid']:
+                self._add_result(report, f"{item['kind'].upper()} {item['value']}", "FAIL", f"Invalid {item['kind']}: {item['problem']}.")
+
+        valid = [i for i in items if i['valid']]
+        if valid:
+            counts = {}
+            for i in valid:
+                counts[i['kind']] = counts.get(i['kind'], 0) + 1
+            summary = ", ".join(f"{n} {kind.upper()}" for kind, n in counts.items())
+            placeholders = [i['value'] for i in valid if i['problem'] == "placeholder"]
+            note = f" (lot placeholder {placeholders[0]})" if placeholders else ""
+            self._add_result(report, "Structured Identifiers", "PASS", f"{summary} verified (check digits / dates){note}.")
+
+        # GTIN cross-check against the supplied SKU map
+        expected = self._scanner.expected_gtin(sku)
+        if expected:
+            gtins = {gtin14(i['value']) for i in items if i['kind'] == "gtin"}
+            gtins |= {gtin14(i['elements']['gtin']) for i in items if i['kind'] == "udi" and 'gtin' in i['elements']}
+            if expected in gtins:
+                self._add_result(report, "GTIN Match", "PASS", f"GTIN {expected} matches SKU {sku}.")
+            elif gtins:
+                shown = ", ".join(sorted(gtins))
+                self._add_result(report, "GTIN Match", "FAIL", f"SKU {sku} maps to GTIN {expected}, artwork shows {shown}.")
+            else:
+                self._add_result(report, "GTIN Match", "FAIL", f"SKU {sku} maps to GTIN {expected}, but no GTIN found in artwork text.")
+
+    def _where(self, hits):
+        pages = sorted({f"{key[0]} p{key[1]}" if isinstance(key, tuple) else str(key) for key, _ in hits})
+        return ", ".join(pages[:3]) + (" ..." if len(pages) > 3 else "")
+
+    def _add_finding(self, report, finding):
+        # Structured extras (file, page, boxes, ...) ride along on the check
+        extra = {k: v for k, v in finding.items() if k not in ("check", "status", "observation")}
+        self._add_result(report, finding.get('check'), finding.get('status'), finding.get('observation'), **extra)
+
+    def _add_result(self, report, name, status, obs, **extra):
+        report.add(Finding(**dict({"name": name, "status": status, "observation": obs}, **extra)))